@@ -0,0 +1,140 @@
+"""Caché de resultados de ajuste direccionada por contenido."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import logging
+
+import numpy as np
+
+logger = logging.getLogger("attribution_cache")
+
+# Se incrementa cuando cambia el formato de los resultados cacheados
+CACHE_VERSION = 4
+
+
+def fit_cache_key(X: np.ndarray, y: np.ndarray, columns: list, params: Dict[str, Any]) -> str:
+    """
+    Clave de caché: hash de la matriz de regresión, la partición de columnas
+    (features/controles) y los parámetros del ajuste.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(json.dumps({'version': CACHE_VERSION, 'columns': columns, 'params': params,
+                              'shape': list(X.shape)}, sort_keys=True).encode('utf-8'))
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class FitCache:
+    """
+    Caché LRU con expiración (TTL) de los resultados de `RegressionFitter`.
+
+    Opcionalmente persiste cada entrada como JSON en `disk_dir`, de modo que
+    sobrevive a reinicios del worker; al leer de disco la entrada se promueve
+    a memoria.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl_seconds: float = 3600,
+                 disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retorna los resultados cacheados o None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                entry = self._read_disk(key)
+                if entry is not None:
+                    self._store(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, results: Dict[str, Any]) -> None:
+        """Guarda resultados en memoria (y en disco si está configurado)."""
+        entry = (time.time(), results)
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self) -> None:
+        """Vacía la caché en memoria y reinicia contadores."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos/fallos y ocupación."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'disk': bool(self.disk_dir),
+            }
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def _store(self, key: str, entry: tuple) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as fh:
+                payload = json.load(fh)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception(f"Entrada de caché corrupta: {path}")
+            return None
+        if self._expired(payload['created']):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return payload['created'], payload['results']
+
+    def _write_disk(self, key: str, entry: tuple) -> None:
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as fh:
+                json.dump({'created': entry[0], 'results': entry[1]}, fh)
+            os.replace(tmp_path, path)
+        except Exception:
+            logger.exception(f"No se pudo escribir la caché en disco: {path}")
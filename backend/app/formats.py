@@ -0,0 +1,78 @@
+"""Formatos de respuesta para series largas: JSON, buffers binarios y Arrow IPC."""
+
+import json
+import struct
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # dependencia opcional: sin pyarrow no se ofrece Arrow IPC
+    pa = None
+
+JSON = "application/json"
+BINARY = "application/octet-stream"
+ARROW = "application/vnd.apache.arrow.stream"
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Elige el formato de respuesta a partir del header Accept (JSON por defecto)."""
+    accept = (accept or "").lower()
+    if ARROW in accept:
+        return ARROW
+    if BINARY in accept:
+        return BINARY
+    return JSON
+
+
+def encode_binary(summary: dict, arrays: Dict[str, np.ndarray]) -> bytes:
+    """
+    Serializa resumen + series sin pasar por listas de Python.
+
+    Estructura (como safetensors): 8 bytes little-endian con la longitud N de
+    la cabecera, N bytes de cabecera JSON (rellenada con espacios hasta un
+    múltiplo de 8) y los buffers little-endian contiguos. La cabecera trae
+    `summary` y, en `series`, para cada array su `dtype`, `offset` en bytes
+    (relativo al final de la cabecera) y `length` en elementos.
+    """
+    series = {}
+    buffers = []
+    offset = 0
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        values = values.astype(values.dtype.newbyteorder("<"), copy=False)
+        data = values.tobytes()
+        series[name] = {"dtype": values.dtype.str, "offset": offset, "length": int(len(values))}
+        buffers.append(data)
+        offset += len(data)
+    header = json.dumps({"summary": summary, "series": series}).encode("utf-8")
+    header += b" " * (-len(header) % 8)
+    return struct.pack("<Q", len(header)) + header + b"".join(buffers)
+
+
+def decode_binary(payload: bytes) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Inverso de `encode_binary` (para clientes Python y tests)."""
+    (header_size,) = struct.unpack_from("<Q", payload)
+    header = json.loads(payload[8:8 + header_size])
+    body = memoryview(payload)[8 + header_size:]
+    arrays = {
+        name: np.frombuffer(body, dtype=np.dtype(meta["dtype"]), count=meta["length"], offset=meta["offset"])
+        for name, meta in header["series"].items()
+    }
+    return header["summary"], arrays
+
+
+def encode_arrow(summary: dict, arrays: Dict[str, np.ndarray]) -> bytes:
+    """
+    Serializa las series como un stream Arrow IPC (una tabla, una columna por
+    serie) con el resumen en JSON en los metadatos del schema (`summary`).
+    """
+    if pa is None:
+        raise RuntimeError("Formato Arrow no disponible: pyarrow no está instalado")
+    table = pa.table({name: pa.array(values) for name, values in arrays.items()},
+                     metadata={"summary": json.dumps(summary)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
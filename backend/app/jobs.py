@@ -0,0 +1,138 @@
+"""Cola de jobs en background para tareas largas (p. ej. /fit con bootstrap)."""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import logging
+
+logger = logging.getLogger("attribution_jobs")
+
+TERMINAL_STATES = ('succeeded', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    """Se lanza desde el callback de progreso cuando se pidió cancelar el job."""
+
+
+class QueueFull(Exception):
+    """No se aceptan más jobs hasta que terminen los pendientes."""
+
+
+class JobManager:
+    """
+    Ejecuta jobs en un pool de hilos propio, separado del threadpool de los
+    endpoints síncronos, para que un bootstrap largo no retrase `/simulate`.
+
+    La cola está acotada: con `max_pending` jobs en espera o ejecución,
+    `submit` lanza `QueueFull`. Cada job recibe un callback
+    `progress(done, total, **info)` que publica su avance y lanza
+    `JobCancelled` si se pidió cancelarlo. Los jobs terminados se conservan
+    (hasta `max_finished`) para poder consultarlos.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 16, max_finished: int = 256):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[[Callable], Any], kind: str = 'job') -> str:
+        """Encola `fn(progress)` y retorna el id del job. Lanza QueueFull si la cola está llena."""
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job['status'] not in TERMINAL_STATES)
+            if active >= self.max_pending:
+                raise QueueFull(f"Cola de jobs llena ({active} pendientes)")
+            job_id = f"job_{uuid.uuid4().hex}"
+            job = {
+                'job_id': job_id,
+                'kind': kind,
+                'status': 'queued',
+                'progress': None,
+                'result': None,
+                'error': None,
+                'created': time.time(),
+                'started': None,
+                'finished': None,
+                'version': 0,
+                '_cancel': threading.Event(),
+            }
+            self._jobs[job_id] = job
+            self._prune()
+            job['_future'] = self._executor.submit(self._run, job, fn)
+        return job_id
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        """Estado público del job. Lanza KeyError si no existe."""
+        with self._lock:
+            return self._snapshot(self._jobs[job_id])
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """
+        Pide cancelar un job. Si aún está en cola no llega a ejecutarse; si
+        está en ejecución se detiene en el siguiente aviso de progreso.
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+            if job['status'] not in TERMINAL_STATES:
+                job['_cancel'].set()
+                if job['_future'].cancel():
+                    self._set(job, status='cancelled', finished=time.time())
+            return self._snapshot(job)
+
+    def stats(self) -> Dict[str, Any]:
+        """Número de jobs por estado y capacidad de la cola."""
+        with self._lock:
+            counts = {state: 0 for state in ('queued', 'running') + TERMINAL_STATES}
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+            return {**counts, 'max_pending': self.max_pending, 'workers': self.max_workers}
+
+    def shutdown(self) -> None:
+        """Cancela los jobs en cola y detiene el pool sin esperar."""
+        with self._lock:
+            for job in self._jobs.values():
+                job['_cancel'].set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Dict[str, Any], fn: Callable[[Callable], Any]) -> None:
+        with self._lock:
+            if job['_cancel'].is_set():
+                self._set(job, status='cancelled', finished=time.time())
+                return
+            self._set(job, status='running', started=time.time())
+
+        def progress(done: int, total: int, **info) -> None:
+            if job['_cancel'].is_set():
+                raise JobCancelled()
+            with self._lock:
+                self._set(job, progress={'done': int(done), 'total': int(total), **info})
+
+        try:
+            result = fn(progress)
+        except JobCancelled:
+            update = {'status': 'cancelled'}
+        except Exception as e:
+            logger.exception(f"Job {job['job_id']} falló")
+            update = {'status': 'failed', 'error': str(e)}
+        else:
+            update = {'status': 'succeeded', 'result': result}
+        with self._lock:
+            self._set(job, finished=time.time(), **update)
+
+    def _set(self, job: Dict[str, Any], **fields) -> None:
+        job.update(fields)
+        job['version'] += 1
+
+    def _snapshot(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in job.items() if not key.startswith('_')}
+
+    def _prune(self) -> None:
+        """Olvida los jobs terminados más antiguos por encima de `max_finished`."""
+        finished = [key for key, job in self._jobs.items() if job['status'] in TERMINAL_STATES]
+        for key in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[key]
@@ -1,23 +1,47 @@
 """API FastAPI para calculadora de atribución marketing."""
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, status
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-import io
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from typing import Optional
+import asyncio
+import json
 import logging
 import math
+import os
+import numpy as np
 
 from .models import (
-    ColumnMapping, FitRequest, ScenarioRequest, RegressionResults, SimulationResult
+    ColumnMapping, FitRequest, RidgePathRequest, TransformSearchRequest, BacktestRequest,
+    ScenarioRequest, BatchScenarioRequest, CurvesRequest, OptimizeRequest, RegressionResults, SimulationResult,
+    PredictionResult
 )
-from .utils import DataProcessor, RegressionFitter, Simulator
+from .utils import (
+    CI_METHODS, MAX_BOOTSTRAP, DataProcessor, RegressionFitter, Simulator, detect_file_format, iter_mapped_file, read_mapped_file, normalize_transforms,
+    expand_transform_grid, search_transforms, shutdown_search_pool, lttb_indices
+)
+from .registry import SessionRegistry
+from .cache import FitCache, fit_cache_key
+from .storage import DatasetStore
+from .jobs import JobManager, QueueFull, TERMINAL_STATES
+from .formats import JSON, ARROW, negotiate, encode_arrow, encode_binary
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Detiene la cola de jobs y el pool de la búsqueda al apagar el servidor."""
+    yield
+    app.state.jobs.shutdown()
+    shutdown_search_pool()
+
 
 # Inicializar FastAPI
 app = FastAPI(
     title="Marketing Attribution Calculator",
     description="MVP para atribución de marketing basada en regresión lineal",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -29,19 +53,157 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-#"""Estado de la aplicación guardado en app.state para evitar variables globales sueltas."""
-app.state.processor = None
-app.state.fitter = None
-app.state.simulator = None
-
 # Seguridad / límites
-MAX_UPLOAD_SIZE = 5_000_000  # bytes (aprox 5MB)
-MAX_BOOTSTRAP = 5000
+MAX_UPLOAD_SIZE = 500_000_000  # bytes (aprox 500MB); el CSV se lee por bloques
+MAX_BOOTSTRAP_WORKERS = os.cpu_count() or 1
+MAX_RIDGE_PATH_ALPHAS = 500
+MAX_BATCH_SCENARIOS = 100_000
+MAX_CURVE_POINTS = 1000
+MAX_SEARCH_CANDIDATES = 5000
+MAX_SEARCH_WORKERS = os.cpu_count() or 1
+MAX_BACKTEST_FOLDS = 200
+MAX_BACKTEST_WORKERS = os.cpu_count() or 1
+REGISTRY_MEMORY_BUDGET = 1_000_000_000  # bytes (aprox 1GB) para datasets y modelos en memoria
+FIT_CACHE_MAX_ENTRIES = 128
+FIT_CACHE_TTL = 3600  # segundos
+FIT_CACHE_DIR = os.getenv("FIT_CACHE_DIR")  # directorio opcional para persistir la caché
+DATASET_STORE_DIR = os.getenv("DATASET_STORE_DIR")  # directorio opcional compartido por los workers
+JOB_WORKERS = 2  # hilos dedicados a jobs (separados del threadpool de los endpoints)
+JOB_MAX_PENDING = 16  # jobs en cola o en ejecución antes de responder 429
+JOB_RETRY_AFTER = 5  # segundos sugeridos al cliente cuando la cola está llena
+JOB_EVENTS_POLL = 0.25  # segundos entre comprobaciones del stream SSE
+MAX_SERIES_PAGE = 100_000  # puntos por página en /models/{model_id}/series
+
+#"""Estado de la aplicación guardado en app.state para evitar variables globales sueltas."""
+# Datasets y modelos por handle; cada /upload y /fit crea una entrada nueva.
+app.state.registry = SessionRegistry(REGISTRY_MEMORY_BUDGET)
+# Resultados de /fit por hash de datos + parámetros
+app.state.fit_cache = FitCache(FIT_CACHE_MAX_ENTRIES, FIT_CACHE_TTL, FIT_CACHE_DIR)
+# Datasets persistidos en disco y mapeados en memoria (opcional)
+app.state.store = DatasetStore(DATASET_STORE_DIR) if DATASET_STORE_DIR else None
+# Jobs en background (/fit con background=true)
+app.state.jobs = JobManager(JOB_WORKERS, JOB_MAX_PENDING)
 
 logger = logging.getLogger("attribution_api")
 logging.basicConfig(level=logging.INFO)
 
 
+def _get_dataset(dataset_id: Optional[str]):
+    """
+    Obtiene (handle, DataProcessor) del registro o lanza 404.
+    
+    Si el handle no está en memoria (otro worker, reinicio o expulsión LRU)
+    y existe en el almacén persistente, se reabre mapeado en memoria. Si
+    está en memoria pero otro worker publicó una generación más nueva (p. ej.
+    tras /append), se reabre la vigente; los modelos ya ajustados conservan
+    los datos con los que se ajustaron y /append ya no los actualiza.
+    """
+    store = app.state.store
+    try:
+        handle, processor = app.state.registry.get_dataset(dataset_id)
+    except KeyError:
+        if dataset_id and store is not None:
+            try:
+                processor = store.load(dataset_id)
+            except KeyError:
+                pass
+            else:
+                return app.state.registry.add_dataset(processor, dataset_id), processor
+        if dataset_id:
+            raise HTTPException(status_code=404, detail=f"Dataset no encontrado: {dataset_id}")
+        raise HTTPException(status_code=400, detail="No hay datos cargados. Use /upload primero")
+
+    if store is not None and processor.store_generation is not None:
+        current = store.generation(handle)
+        if current is not None and current != processor.store_generation:
+            try:
+                processor = store.load(handle)
+            except KeyError:
+                pass
+            else:
+                app.state.registry.add_dataset(processor, handle)
+    return handle, processor
+
+
+def _get_model(model_id: Optional[str]):
+    """Obtiene (handle, (RegressionFitter, Simulator)) del registro o lanza 404."""
+    try:
+        return app.state.registry.get_model(model_id)
+    except KeyError:
+        if model_id:
+            raise HTTPException(status_code=404, detail=f"Modelo no encontrado: {model_id}")
+        raise HTTPException(status_code=400, detail="Modelo no ajustado. Use /fit primero")
+
+
+def _get_job(job_id: str) -> dict:
+    """Estado de un job o 404."""
+    try:
+        return app.state.jobs.get(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job no encontrado: {job_id}")
+
+
+def _encoded_response(media_type: str, summary: dict, arrays: dict) -> Response:
+    """Respuesta binaria (float64 little-endian) o Arrow IPC; 406 si falta pyarrow."""
+    try:
+        content = encode_arrow(summary, arrays) if media_type == ARROW else encode_binary(summary, arrays)
+    except RuntimeError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    return Response(content=content, media_type=media_type)
+
+
+def _series_response(request: Optional[Request], summary: dict, fitter, series_points: Optional[int]):
+    """
+    Resumen + series `fitted_values`/`residuals` en el formato pedido por el
+    header Accept: JSON (por defecto), buffers float64 little-endian
+    (`application/octet-stream`, ver `formats.encode_binary`) o Arrow IPC.
+    Con `series_points` las series se reducen con LTTB para graficar: los
+    puntos se eligen sobre los valores ajustados y los residuos se toman en
+    los mismos índices, de modo que la respuesta tiene exactamente
+    `series_points` puntos. Los índices originales van en `series_index`
+    (JSON) o en la columna `index`.
+    """
+    media_type = negotiate(request.headers.get("accept") if request is not None else None)
+    fitted = np.asarray(fitter.fitted_values if fitter.fitted_values is not None else [], dtype=float)
+    residuals = np.asarray(fitter.residuals if fitter.residuals is not None else [], dtype=float)
+    index = np.arange(len(fitted))
+    if series_points is not None:
+        if series_points < 3:
+            raise HTTPException(status_code=400, detail="series_points debe ser al menos 3")
+        if len(fitted) > series_points:
+            index = lttb_indices(fitted, series_points)
+            fitted, residuals = fitted[index], residuals[index]
+
+    summary = _json_safe(summary)
+    if media_type == JSON:
+        body = {**summary, "fitted_values": fitted.tolist(), "residuals": residuals.tolist()}
+        if series_points is not None:
+            body["series_index"] = index.tolist()
+        return _json_safe(body)
+
+    arrays = {"index": index.astype(np.int64), "fitted_values": fitted, "residuals": residuals}
+    return _encoded_response(media_type, summary, arrays)
+
+
+def _json_safe(value):
+    """Convierte floats no finitos (NaN/inf) en None para que la respuesta sea JSON válido."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def _transform_spec(transforms, processor) -> dict:
+    """Especificación canónica de transformaciones a partir del request (dict vacío si no hay)."""
+    if not transforms:
+        return {}
+    spec = {name: t.model_dump() for name, t in transforms.items()}
+    return normalize_transforms(spec, processor.get_feature_names())
+
+
 @app.get("/")
 def root():
     """Endpoint raíz."""
@@ -50,27 +212,46 @@ def root():
         "version": "0.1.0",
         "endpoints": {
             "upload": "POST /upload",
+            "append": "POST /append",
             "fit": "POST /fit",
+            "ridge_path": "POST /fit/ridge-path",
+            "search": "POST /fit/search",
+            "backtest": "POST /fit/backtest",
             "simulate": "POST /simulate",
+            "simulate_batch": "POST /simulate/batch",
+            "simulate_curves": "POST /simulate/curves",
+            "optimize": "POST /optimize",
+            "metrics": "POST /metrics",
+            "jobs": "GET /jobs/{job_id}, GET /jobs/{job_id}/events, DELETE /jobs/{job_id}",
             "status": "GET /status"
         }
     }
 
 
 @app.get("/status")
-def status():
-    """Retorna el estado actual de los datos cargados."""
-    processor = app.state.processor
-    if processor is None or processor.data is None:
-        return {"status": "no_data", "message": "No hay datos cargados"}
+def status(dataset_id: Optional[str] = Query(None)):
+    """Retorna el estado de un dataset cargado (por defecto, el último)."""
+    registry = app.state.registry
+    try:
+        dataset_id, processor = _get_dataset(dataset_id)
+    except HTTPException as e:
+        if e.status_code == 404:
+            raise
+        return {"status": "no_data", "message": "No hay datos cargados", "registry": registry.stats(),
+                "fit_cache": app.state.fit_cache.stats(), "jobs": app.state.jobs.stats()}
 
     return {
         "status": "ready",
-        "observations": len(processor.data),
+        "dataset_id": dataset_id,
+        "mode": "full" if processor.has_rows() else "stats",
+        "observations": processor.n_observations(),
         "date_column": processor.date_column,
         "target_column": processor.target_column,
         "feature_columns": processor.feature_columns,
-        "control_columns": processor.control_columns
+        "control_columns": processor.control_columns,
+        "registry": registry.stats(),
+        "fit_cache": app.state.fit_cache.stats(),
+        "jobs": app.state.jobs.stats()
     }
 
 
@@ -80,75 +261,119 @@ async def upload_data(
     date_column: str = Form(...),
     target_column: str = Form(...),
     feature_columns: str = Form(...),
-    control_columns: Optional[str] = Form(None)
+    control_columns: Optional[str] = Form(None),
+    mode: str = Form("full")
 ):
     """
-    Carga un archivo CSV y mapea las columnas.
+    Carga un archivo CSV, Parquet o Arrow IPC/Feather y mapea las columnas.
+    
+    El archivo se procesa por bloques y sólo se conservan las columnas
+    mapeadas, de modo que la memoria no depende del ancho del archivo. En
+    Parquet/Arrow sólo se leen esas columnas (requiere pyarrow).
     
     Args:
-        file: Archivo CSV
+        file: Archivo CSV, Parquet o Arrow (se detecta por firma o extensión)
         date_column: Nombre de la columna de fecha
         target_column: Nombre de la columna objetivo
         feature_columns: Columnas de features (separadas por comas)
         control_columns: Columnas de control (separadas por comas, opcional)
+        mode: 'full' (datos en memoria) o 'stats' (sólo estadísticos suficientes,
+            memoria O(p²); sin residuos, bootstrap ni simulación por filas)
     """
     # Validaciones iniciales de seguridad
     content_type = file.content_type or ""
     if content_type and not any(x in content_type for x in ("text", "csv", "application")):
         raise HTTPException(status_code=400, detail="Tipo de archivo no soportado")
 
+    if mode not in ("full", "stats"):
+        raise HTTPException(status_code=400, detail="mode sólo soporta 'full' o 'stats'")
+
+    # Parsear columnas
+    feature_cols = [col.strip() for col in feature_columns.split(',') if col.strip()]
+    control_cols = None
+    if control_columns:
+        control_cols = [col.strip() for col in control_columns.split(',') if col.strip()]
+
+    # Evitar nombres duplicados
+    names_seen = set()
+    dupes = set()
+    for c in [date_column, target_column] + feature_cols + (control_cols or []):
+        if c in names_seen:
+            dupes.add(c)
+        names_seen.add(c)
+    if dupes:
+        raise HTTPException(status_code=400, detail=f"Nombres de columnas duplicados: {dupes}")
+
+    # El cuerpo multipart ya está en un archivo temporal: medirlo sin cargarlo en memoria
     try:
-        contents = await file.read()
+        size = file.size
+        if size is None:
+            file.file.seek(0, os.SEEK_END)
+            size = file.file.tell()
+        file.file.seek(0)
     except Exception:
         logger.exception("Error leyendo archivo subido")
         raise HTTPException(status_code=400, detail="No se pudo leer el archivo")
 
-    if len(contents) > MAX_UPLOAD_SIZE:
-        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    if size > MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413,
                             detail=f"Archivo demasiado grande (>{MAX_UPLOAD_SIZE} bytes)")
 
+    numeric_cols = [target_column] + feature_cols + (control_cols or [])
+    file_format = detect_file_format(file.file, file.filename)
+    processor = DataProcessor()
     try:
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
+        if mode == "stats":
+            # Acumular X'X, X'y, y'y bloque a bloque sin conservar filas
+            file_columns, chunks = iter_mapped_file(file.file, date_column, numeric_cols, file_format)
+            await run_in_threadpool(
+                processor.load_stats,
+                chunks,
+                date_col=date_column,
+                target_col=target_column,
+                feature_cols=feature_cols,
+                control_cols=control_cols
+            )
+        else:
+            df, file_columns = await run_in_threadpool(read_mapped_file, file.file, date_column,
+                                                       numeric_cols, file_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Error al cargar datos: {str(e)}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
     except Exception as e:
-        logger.exception("Error parseando CSV")
-        raise HTTPException(status_code=400, detail=f"Error al parsear CSV: {str(e)}")
+        logger.exception(f"Error parseando archivo ({file_format})")
+        raise HTTPException(status_code=400, detail=f"Error al parsear archivo: {str(e)}")
 
     try:
-        # Parsear columnas
-        feature_cols = [col.strip() for col in feature_columns.split(',') if col.strip()]
-        control_cols = None
-        if control_columns:
-            control_cols = [col.strip() for col in control_columns.split(',') if col.strip()]
-
-        # Evitar nombres duplicados
-        names_seen = set()
-        dupes = set()
-        for c in [date_column, target_column] + feature_cols + (control_cols or []):
-            if c in names_seen:
-                dupes.add(c)
-            names_seen.add(c)
-        if dupes:
-            raise HTTPException(status_code=400, detail=f"Nombres de columnas duplicados: {dupes}")
-
         # Crear y cargar datos
-        processor = DataProcessor()
-        processor.load_data(
-            df,
-            date_col=date_column,
-            target_col=target_column,
-            feature_cols=feature_cols,
-            control_cols=control_cols
-        )
-
-        # Guardar en estado de la app
-        app.state.processor = processor
+        if mode == "full":
+            await run_in_threadpool(
+                processor.load_data,
+                df,
+                date_col=date_column,
+                target_col=target_column,
+                feature_cols=feature_cols,
+                control_cols=control_cols
+            )
+        n_obs = processor.n_observations()
+
+        # Registrar dataset (y persistirlo para otros workers si hay almacén)
+        dataset_id = app.state.registry.add_dataset(processor)
+        if app.state.store is not None:
+            await run_in_threadpool(app.state.store.save, dataset_id, processor)
 
         return {
             "status": "success",
-            "message": f"Datos cargados: {len(df)} observaciones",
-            "columns": list(df.columns),
-            "shape": df.shape,
-            "date_range": f"{processor.data[date_column].min()} to {processor.data[date_column].max()}"
+            "dataset_id": dataset_id,
+            "mode": mode,
+            "format": file_format,
+            "message": f"Datos cargados: {n_obs} observaciones",
+            "columns": file_columns,
+            "shape": [n_obs, len(file_columns)],
+            "date_range": f"{processor.date_range[0]} to {processor.date_range[1]}",
+            "dropped_rows": processor.dropped_rows,
+            "imputed_cells": processor.imputed_counts() if processor.has_rows() else None
         }
     except HTTPException:
         raise
@@ -160,74 +385,459 @@ async def upload_data(
         )
 
 
+def _plan_fit(request: FitRequest) -> dict:
+    """Valida los parámetros de /fit y busca el resultado en caché."""
+    dataset_id, processor = _get_dataset(request.dataset_id)
+
+    # Validaciones de parametros
+    alpha = float(request.alpha or 1.0)
+    if alpha <= 0 or not math.isfinite(alpha):
+        raise ValueError("Parámetro alpha debe ser un número positivo")
+
+    bootstrap_samples = int(request.bootstrap_samples or 1000)
+    if bootstrap_samples < 0 or bootstrap_samples > MAX_BOOTSTRAP:
+        raise ValueError(f"bootstrap_samples debe estar entre 0 y {MAX_BOOTSTRAP}")
+
+    bootstrap_workers = request.bootstrap_workers
+    if bootstrap_workers is not None and not 1 <= int(bootstrap_workers) <= MAX_BOOTSTRAP_WORKERS:
+        raise ValueError(f"bootstrap_workers debe estar entre 1 y {MAX_BOOTSTRAP_WORKERS}")
+
+    bootstrap_tolerance = request.bootstrap_tolerance
+    if bootstrap_tolerance is not None and not 0 < bootstrap_tolerance < 1:
+        raise ValueError("bootstrap_tolerance debe estar entre 0 y 1")
+
+    if request.regularization and request.regularization.lower() not in ("ridge",):
+        raise ValueError("regularization sólo soporta 'ridge' o null")
+
+    ci_method = request.ci_method.lower()
+    if ci_method not in CI_METHODS:
+        raise ValueError(f"ci_method debe ser uno de {list(CI_METHODS)}")
+    if request.hac_lags is not None and request.hac_lags < 0:
+        raise ValueError("hac_lags debe ser >= 0")
+    if request.block_length is not None and request.block_length < 1:
+        raise ValueError("block_length debe ser positivo")
+
+    transforms = _transform_spec(request.transforms, processor)
+
+    # Buscar en caché (mismos datos preprocesados y mismos parámetros)
+    regularization = request.regularization.lower() if request.regularization else None
+    if not processor.has_rows():
+        if transforms:
+            raise ValueError("Las transformaciones adstock/saturación requieren el dataset completo (mode=full)")
+        X, y = processor.get_sufficient_stats().to_arrays()
+    else:
+        X, y = processor.get_regression_data(transforms)
+    cache_key = fit_cache_key(
+        X, y,
+        [processor.feature_columns, processor.control_columns],
+        {
+            "regularization": regularization,
+            "alpha": alpha,
+            "bootstrap_samples": bootstrap_samples,
+            "bootstrap_mode": "parallel" if bootstrap_workers else "serial",
+            "bootstrap_tolerance": bootstrap_tolerance,
+            "ci_method": ci_method,
+            "hac_lags": request.hac_lags,
+            "block_length": request.block_length,
+            "vif_include_controls": request.vif_include_controls,
+            "transforms": transforms,
+        }
+    )
+
+    return {
+        "dataset_id": dataset_id,
+        "processor": processor,
+        "regularization": regularization,
+        "alpha": alpha,
+        "bootstrap_samples": bootstrap_samples,
+        "bootstrap_workers": bootstrap_workers,
+        "bootstrap_tolerance": bootstrap_tolerance,
+        "ci_method": ci_method,
+        "hac_lags": request.hac_lags,
+        "block_length": request.block_length,
+        "vif_include_controls": request.vif_include_controls,
+        "transforms": transforms,
+        "cache_key": cache_key,
+        "results": app.state.fit_cache.get(cache_key),
+    }
+
+
+def _run_fit(plan: dict, progress=None, series: bool = True) -> dict:
+    """
+    Ajusta (o restaura desde caché), registra el modelo y arma la respuesta de /fit.
+    
+    Con `series=False` la respuesta no incluye `fitted_values`/`residuals`
+    (las respuestas binarias, Arrow o reducidas las leen del ajuste).
+    """
+    processor = plan["processor"]
+    results = plan["results"]
+    cached = results is not None
+
+    if cached:
+        fitter = RegressionFitter.from_results(processor, results, plan["regularization"], plan["alpha"],
+                                               plan["bootstrap_samples"], plan["bootstrap_workers"],
+                                               plan["bootstrap_tolerance"], plan["ci_method"],
+                                               plan["hac_lags"], plan["block_length"])
+    else:
+        # Ajustar modelo
+        fitter = RegressionFitter(processor)
+        results = fitter.fit(
+            regularization=plan["regularization"],
+            alpha=plan["alpha"],
+            bootstrap_samples=plan["bootstrap_samples"],
+            n_jobs=plan["bootstrap_workers"],
+            vif_include_controls=plan["vif_include_controls"],
+            transforms=plan["transforms"],
+            progress=progress,
+            bootstrap_tolerance=plan["bootstrap_tolerance"],
+            ci_method=plan["ci_method"],
+            hac_lags=plan["hac_lags"],
+            block_length=plan["block_length"]
+        )
+        app.state.fit_cache.put(plan["cache_key"], results)
+
+    # Inicializar simulador y registrar modelo
+    simulator = Simulator(fitter)
+    model_id = app.state.registry.add_model(plan["dataset_id"], fitter, simulator)
+
+    # Detectar multicolinealidad
+    high_vif = {}
+    if results.get('vif_values'):
+        high_vif = {k: v for k, v in results['vif_values'].items() if v > 10}
+
+    body = _json_safe({
+        "status": "success",
+        "message": "Modelo ajustado correctamente",
+        "model_id": model_id,
+        "dataset_id": plan["dataset_id"],
+        "cached": cached,
+        "coefficients": results['coefficients'],
+        "p_values": results['p_values'],
+        "r_squared": results['r_squared'],
+        "adjusted_r_squared": results['adjusted_r_squared'],
+        "vif_values": results['vif_values'],
+        "high_vif_alert": high_vif if high_vif else None,
+        "condition_number": results['condition_number'],
+        "aic": results['aic'],
+        "bic": results['bic'],
+        "f_statistic": results['f_statistic'],
+        "f_pvalue": results['f_pvalue'],
+        "observations": results['observations'],
+        "residuals_mean": results['residuals_mean'],
+        "residuals_std": results['residuals_std'],
+        "diagnostics": results['diagnostics'],
+        "confidence_intervals": results['confidence_intervals'],
+        # Alias obsoleto de "confidence_intervals" (contiene también IC analíticos)
+        "bootstrap_ci": results['confidence_intervals'],
+        "bootstrap_stale": results.get('bootstrap_stale', False),
+        "bootstrap_replicates": results.get('bootstrap_replicates', 0),
+        "ci_method": results.get('ci_method', plan["ci_method"]),
+        "ci_params": results.get('ci_params', {}),
+        "transforms": results.get('transforms') or None
+    })
+    if series:
+        body["fitted_values"] = _json_safe(results['fitted_values'])
+        body["residuals"] = _json_safe(results['residuals'])
+    return body
+
+
 @app.post("/fit")
-def fit_model(request: FitRequest):
+def fit_model(request: FitRequest, http_request: Request,
+              series_points: Optional[int] = Query(None)):
     """
     Ajusta el modelo de regresión lineal.
     
+    Con `background: true` retorna 202 con un `job_id` de inmediato y el
+    ajuste corre en la cola de jobs (ver `/jobs/{job_id}`).
+    
+    `fitted_values` y `residuals` se sirven según el header Accept (JSON,
+    `application/octet-stream` o Arrow IPC); `series_points` los reduce con
+    LTTB. La serie completa se pagina en `/models/{model_id}/series`.
+    
     Args:
-        request: Parámetros de regresión (regularización, alpha, bootstrap_samples)
+        request: Parámetros de regresión (regularización, alpha, bootstrap_samples,
+            ci_method). Por defecto los IC son HAC analíticos (instantáneos); el
+            bootstrap sólo corre con ci_method 'pairs', 'residual', 'wild' o 'block'.
     """
     try:
-        processor = app.state.processor
-        if processor is None or processor.data is None:
-            raise ValueError("No hay datos cargados. Use /upload primero")
+        plan = _plan_fit(request)
+        if request.background:
+            try:
+                job_id = app.state.jobs.submit(lambda progress: _run_fit(plan, progress), kind="fit")
+            except QueueFull as e:
+                raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(JOB_RETRY_AFTER)})
+            return JSONResponse(status_code=202, content={
+                "status": "accepted",
+                "job_id": job_id,
+                "dataset_id": plan["dataset_id"],
+                "cached": plan["results"] is not None,
+            })
+        series = series_points is None and negotiate(http_request.headers.get("accept")) == JSON
+        body = _run_fit(plan, series=series)
+        if series:
+            return body
+        _, (fitter, _) = app.state.registry.get_model(body["model_id"])
+        return _series_response(http_request, body, fitter, series_points)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error al ajustar modelo")
+        raise HTTPException(status_code=400, detail=f"Error al ajustar modelo: {str(e)}")
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Estado, progreso y (al terminar) resultado de un job."""
+    return _json_safe(_get_job(job_id))
+
 
-        # Validaciones de parametros
-        alpha = float(request.alpha or 1.0)
-        if alpha <= 0 or not math.isfinite(alpha):
-            raise ValueError("Parámetro alpha debe ser un número positivo")
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancela un job en cola o en ejecución."""
+    _get_job(job_id)
+    return _json_safe(app.state.jobs.cancel(job_id))
 
-        bootstrap_samples = int(request.bootstrap_samples or 1000)
-        if bootstrap_samples < 0 or bootstrap_samples > MAX_BOOTSTRAP:
-            raise ValueError(f"bootstrap_samples debe estar entre 0 y {MAX_BOOTSTRAP}")
 
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-Sent Events con el progreso del job: un evento `progress` por
+    cambio de estado y un evento final `succeeded`, `failed` o `cancelled`.
+    """
+    _get_job(job_id)
+
+    async def stream():
+        version = -1
+        while True:
+            try:
+                job = app.state.jobs.get(job_id)
+            except KeyError:
+                return
+            if job["version"] != version:
+                version = job["version"]
+                event = job["status"] if job["status"] in TERMINAL_STATES else "progress"
+                yield f"event: {event}\ndata: {json.dumps(_json_safe(job))}\n\n"
+                if job["status"] in TERMINAL_STATES:
+                    return
+            await asyncio.sleep(JOB_EVENTS_POLL)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/fit/search")
+def search_fit(request: TransformSearchRequest):
+    """
+    Busca los parámetros de adstock/saturación sobre una rejilla (o una muestra
+    aleatoria de ella) con ajustes OLS baratos en un pool de procesos, y
+    ajusta por completo (bootstrap, VIF) sólo la mejor configuración.
+    """
+    dataset_id, processor = _get_dataset(request.dataset_id)
+    try:
+        workers = request.workers
+        if workers is not None and not 1 <= int(workers) <= MAX_SEARCH_WORKERS:
+            raise ValueError(f"workers debe estar entre 1 y {MAX_SEARCH_WORKERS}")
+        if request.top_k < 1:
+            raise ValueError("top_k debe ser positivo")
+
+        candidates = expand_transform_grid(request.grid, request.n_random,
+                                           max_candidates=MAX_SEARCH_CANDIDATES)
+        ranking = search_transforms(processor, candidates, request.criterion,
+                                    request.cv_folds, workers)
+    except Exception as e:
+        logger.exception("Error en búsqueda de transformaciones")
+        raise HTTPException(status_code=400, detail=f"Error en búsqueda: {str(e)}")
+
+    best = ranking[0]
+    try:
+        fit = _run_fit(_plan_fit(FitRequest(
+            dataset_id=dataset_id,
+            regularization=request.regularization,
+            alpha=request.alpha,
+            bootstrap_samples=request.bootstrap_samples,
+            bootstrap_workers=request.bootstrap_workers,
+            ci_method=request.ci_method,
+            hac_lags=request.hac_lags,
+            block_length=request.block_length,
+            vif_include_controls=request.vif_include_controls,
+            transforms=best['transforms'],
+        )))
+    except Exception as e:
+        logger.exception("Error al ajustar el ganador de la búsqueda")
+        raise HTTPException(status_code=400, detail=f"Error al ajustar modelo: {str(e)}")
+
+    return _json_safe({
+        "status": "success",
+        "dataset_id": dataset_id,
+        "criterion": request.criterion,
+        "candidates_evaluated": len(ranking),
+        "best": best,
+        "ranking": ranking[:request.top_k],
+        "fit": fit,
+    })
+
+
+@app.post("/fit/backtest")
+def backtest(request: BacktestRequest):
+    """
+    Validación temporal con origen móvil (ventana creciente o deslizante):
+    RMSE/MAE/MAPE por fold y globales, y pronóstico frente a valores reales.
+    Cada fold actualiza X'X / X'y del anterior en vez de reajustar desde cero.
+    """
+    dataset_id, processor = _get_dataset(request.dataset_id)
+    try:
+        if not 1 <= request.n_folds <= MAX_BACKTEST_FOLDS:
+            raise ValueError(f"n_folds debe estar entre 1 y {MAX_BACKTEST_FOLDS}")
+        workers = request.workers
+        if workers is not None and not 1 <= int(workers) <= MAX_BACKTEST_WORKERS:
+            raise ValueError(f"workers debe estar entre 1 y {MAX_BACKTEST_WORKERS}")
         if request.regularization and request.regularization.lower() not in ("ridge",):
             raise ValueError("regularization sólo soporta 'ridge' o null")
-
-        # Ajustar modelo
-        fitter = RegressionFitter(processor)
-        results = fitter.fit(
+        alpha = 1.0 if request.alpha is None else float(request.alpha)
+        if request.regularization and alpha <= 0:
+            raise ValueError("alpha debe ser positivo")
+
+        transforms = _transform_spec(request.transforms, processor)
+        result = RegressionFitter(processor).backtest(
+            n_folds=request.n_folds,
+            horizon=request.horizon,
+            window=request.window,
+            min_train=request.min_train,
             regularization=request.regularization,
             alpha=alpha,
-            bootstrap_samples=bootstrap_samples
+            transforms=transforms,
+            n_jobs=workers,
         )
+    except Exception as e:
+        logger.exception("Error en backtest")
+        raise HTTPException(status_code=400, detail=f"Error en backtest: {str(e)}")
 
-        # Inicializar simulador y guardar estado
-        simulator = Simulator(fitter)
-        app.state.fitter = fitter
-        app.state.simulator = simulator
+    return _json_safe({"status": "success", "dataset_id": dataset_id, **result})
 
-        # Detectar multicolinealidad
-        high_vif = {}
-        if results.get('vif_values'):
-            high_vif = {k: v for k, v in results['vif_values'].items() if v > 10}
 
-        return {
-            "status": "success",
-            "message": "Modelo ajustado correctamente",
+@app.post("/fit/ridge-path")
+def ridge_path(request: RidgePathRequest):
+    """
+    Calcula coeficientes, grados de libertad efectivos, AIC/BIC y GCV/LOO-CV
+    para una rejilla de alphas Ridge en una sola llamada (una única SVD).
+    """
+    dataset_id, processor = _get_dataset(request.dataset_id)
+    try:
+        if request.alphas is None:
+            alphas = np.logspace(-3, 4, 50)
+        else:
+            alphas = np.asarray(request.alphas, dtype=float)
+            if len(alphas) == 0 or len(alphas) > MAX_RIDGE_PATH_ALPHAS:
+                raise ValueError(f"alphas debe tener entre 1 y {MAX_RIDGE_PATH_ALPHAS} valores")
+            if not np.all(np.isfinite(alphas)) or np.any(alphas <= 0):
+                raise ValueError("Todos los alphas deben ser números positivos")
+
+        transforms = _transform_spec(request.transforms, processor)
+        path = RegressionFitter(processor).ridge_path(alphas, transforms)
+    except Exception as e:
+        logger.exception("Error en camino Ridge")
+        raise HTTPException(status_code=400, detail=f"Error en camino Ridge: {str(e)}")
+
+    return _json_safe({"status": "success", "dataset_id": dataset_id, **path})
+
+
+@app.post("/append")
+async def append_rows(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    dataset_id: Optional[str] = Form(None),
+    refresh_bootstrap: bool = Form(False)
+):
+    """
+    Agrega periodos nuevos a un dataset y actualiza sus modelos de forma incremental.
+    
+    El archivo (CSV, Parquet o Arrow) debe tener las mismas columnas mapeadas
+    que el upload original.
+    Los coeficientes y estadísticos se recalculan desde X'X / X'y actualizados
+    (sin reajustar todo el histórico). Los intervalos bootstrap quedan
+    obsoletos; con `refresh_bootstrap=true` se recalculan en segundo plano,
+    o bajo demanda con `POST /models/{model_id}/bootstrap`. Los modelos
+    ajustados sobre una generación anterior del almacén (filas publicadas
+    por otro worker) no se actualizan y se reportan con status 'stale'.
+    
+    Args:
+        file: Archivo con las filas nuevas
+        dataset_id: Handle del dataset (None = último)
+        refresh_bootstrap: Recalcular bootstrap en segundo plano
+    """
+    dataset_id, processor = _get_dataset(dataset_id)
+    numeric_cols = [processor.target_column] + processor.get_feature_names()
+
+    try:
+        file_format = detect_file_format(file.file, file.filename)
+        df, _ = await run_in_threadpool(read_mapped_file, file.file, processor.date_column,
+                                        numeric_cols, file_format)
+        X_new, y_new = await run_in_threadpool(processor.append_data, df)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Error al agregar datos: {str(e)}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        logger.exception("Error en append")
+        raise HTTPException(status_code=400, detail=f"Error al agregar datos: {str(e)}")
+
+    registry = app.state.registry
+    registry.resize(dataset_id)
+    if app.state.store is not None:
+        await run_in_threadpool(app.state.store.save, dataset_id, processor)
+    models = {}
+    for model_id, (fitter, _) in registry.models_for(dataset_id).items():
+        if fitter.processor is not processor:
+            # Ajustado sobre una generación anterior (otro worker publicó filas
+            # después): sus estadísticos no incluyen esas filas, no se actualiza
+            models[model_id] = {
+                "status": "stale",
+                "detail": "Modelo ajustado sobre una versión anterior del dataset; reajuste con /fit",
+                "observations": int(fitter.model.nobs)
+            }
+            continue
+        try:
+            results = await run_in_threadpool(fitter.update, X_new, y_new)
+        except Exception as e:
+            logger.exception(f"Error actualizando modelo {model_id}")
+            models[model_id] = {"status": "error", "detail": str(e)}
+            continue
+        registry.resize(model_id)
+        if refresh_bootstrap and fitter.bootstrap_stale:
+            background_tasks.add_task(fitter.refresh_bootstrap)
+        models[model_id] = {
+            "status": "updated",
             "coefficients": results['coefficients'],
-            "p_values": results['p_values'],
             "r_squared": results['r_squared'],
-            "adjusted_r_squared": results['adjusted_r_squared'],
-            "vif_values": results['vif_values'],
-            "high_vif_alert": high_vif if high_vif else None,
-            "aic": results['aic'],
-            "bic": results['bic'],
-            "f_statistic": results['f_statistic'],
-            "f_pvalue": results['f_pvalue'],
             "observations": results['observations'],
-            "residuals_mean": float(sum(results['residuals']) / len(results['residuals'])),
-            "residuals_std": float((sum([(r - sum(results['residuals']) / len(results['residuals']))**2 for r in results['residuals']]) / len(results['residuals']))**0.5),
-            "fitted_values": results['fitted_values'],
-            "residuals": results['residuals'],
-            "bootstrap_ci": results.get('bootstrap_ci', {})
+            "bootstrap_stale": fitter.bootstrap_stale,
+            "bootstrap_refresh_scheduled": bool(refresh_bootstrap and fitter.bootstrap_stale)
         }
-    except HTTPException:
-        raise
+
+    return _json_safe({
+        "status": "success",
+        "dataset_id": dataset_id,
+        "appended_rows": int(len(y_new)),
+        "observations": processor.n_observations(),
+        "models": models
+    })
+
+
+@app.post("/models/{model_id}/bootstrap")
+def refresh_model_bootstrap(model_id: str):
+    """Recalcula bajo demanda los intervalos bootstrap de un modelo."""
+    model_id, (fitter, _) = _get_model(model_id)
+    try:
+        bootstrap_ci = fitter.refresh_bootstrap()
     except Exception as e:
-        logger.exception("Error al ajustar modelo")
-        raise HTTPException(status_code=400, detail=f"Error al ajustar modelo: {str(e)}")
+        logger.exception("Error recalculando bootstrap")
+        raise HTTPException(status_code=400, detail=f"Error en bootstrap: {str(e)}")
+    return _json_safe({
+        "status": "success",
+        "model_id": model_id,
+        "confidence_intervals": bootstrap_ci,
+        "bootstrap_ci": bootstrap_ci,
+        "bootstrap_stale": fitter.bootstrap_stale
+    })
 
 
 @app.post("/simulate")
@@ -235,24 +845,29 @@ def simulate_scenario(request: ScenarioRequest):
     """
     Simula un escenario de cambios en variables.
     
+    Incluye intervalos de confianza y de predicción del escenario
+    (`scenario_interval`) a partir de la covarianza de los coeficientes.
+    
     Args:
-        request: Cambios porcentuales por variable
+        request: Cambios porcentuales por variable y nivel de los intervalos
     """
     try:
-        simulator = app.state.simulator
-        if simulator is None:
-            raise ValueError("Modelo no ajustado. Use /fit primero")
+        model_id, (_, simulator) = _get_model(request.model_id)
 
-        result = simulator.simulate(request.changes)
+        result = simulator.simulate(request.changes, request.level)
         
-        return {
+        return _json_safe({
             "status": "success",
+            "model_id": model_id,
             "baseline_prediction": result['baseline_prediction'],
             "scenario_prediction": result['scenario_prediction'],
             "delta": result['delta'],
             "delta_percentage": result['delta_percentage'],
-            "changes_applied": result['changes_applied']
-        }
+            "changes_applied": result['changes_applied'],
+            "scenario_interval": PredictionResult(**result['scenario_interval']).model_dump(),
+            "interval_level": result['interval_level'],
+            "interval_source": result['interval_source']
+        })
     
     except HTTPException:
         raise
@@ -261,21 +876,128 @@ def simulate_scenario(request: ScenarioRequest):
         raise HTTPException(status_code=400, detail=f"Error en simulación: {str(e)}")
 
 
-@app.post("/metrics")
-def get_metrics():
-    """Retorna métricas adicionales."""
-    fitter = app.state.fitter
+@app.post("/simulate/batch")
+def simulate_batch(request: BatchScenarioRequest):
+    """
+    Simula una matriz de escenarios en una sola evaluación vectorizada.
+    
+    Args:
+        request: Nombres de variables y matriz de cambios porcentuales
+            (una fila por escenario)
+    """
+    model_id, (_, simulator) = _get_model(request.model_id)
+    try:
+        if not request.features:
+            raise ValueError("Debe indicar al menos una feature")
+        if not request.changes:
+            raise ValueError("Debe indicar al menos un escenario")
+        if len(request.changes) > MAX_BATCH_SCENARIOS:
+            raise ValueError(f"Máximo {MAX_BATCH_SCENARIOS} escenarios por llamada")
+        if any(len(row) != len(request.features) for row in request.changes):
+            raise ValueError("Cada escenario debe tener un valor por feature")
+
+        result = simulator.simulate_batch(request.features, request.changes, request.level)
+    except Exception as e:
+        logger.exception("Error en simulación batch")
+        raise HTTPException(status_code=400, detail=f"Error en simulación: {str(e)}")
 
-    if fitter is None:
-        raise HTTPException(status_code=400, detail="Modelo no ajustado")
+    return _json_safe({
+        "status": "success",
+        "model_id": model_id,
+        "features": request.features,
+        "n_scenarios": len(request.changes),
+        **result
+    })
 
-    return {
-        "observations": fitter.model.nobs,
-        "residuals_mean": float(fitter.residuals.mean()),
-        "residuals_std": float(fitter.residuals.std()),
-        "fitted_mean": float(fitter.fitted_values.mean()),
-        "fitted_std": float(fitter.fitted_values.std())
+
+@app.post("/simulate/curves")
+def simulate_curves(request: CurvesRequest):
+    """
+    Curvas de respuesta de cada canal sobre una rejilla de cambios porcentuales,
+    con ROI marginal y bandas de confianza/predicción, en una sola llamada.
+    
+    El resultado se guarda por modelo hasta que se reajusta o se actualiza con /append.
+    """
+    model_id, (_, simulator) = _get_model(request.model_id)
+    try:
+        if request.percentages is not None and not 1 <= len(request.percentages) <= MAX_CURVE_POINTS:
+            raise ValueError(f"percentages debe tener entre 1 y {MAX_CURVE_POINTS} valores")
+        result = simulator.response_curves(request.percentages, request.level)
+    except Exception as e:
+        logger.exception("Error en curvas de respuesta")
+        raise HTTPException(status_code=400, detail=f"Error en curvas de respuesta: {str(e)}")
+
+    return _json_safe({"status": "success", "model_id": model_id, **result})
+
+
+@app.post("/optimize")
+def optimize_budget(request: OptimizeRequest):
+    """
+    Busca el reparto del presupuesto entre canales que maximiza la predicción.
+    
+    Args:
+        request: Presupuesto total y límites min/max por canal
+    """
+    model_id, (_, simulator) = _get_model(request.model_id)
+    try:
+        bounds = None
+        if request.bounds:
+            bounds = {name: (b.min, b.max) for name, b in request.bounds.items()}
+        result = simulator.optimize_budget(request.total_budget, bounds)
+    except Exception as e:
+        logger.exception("Error en optimización")
+        raise HTTPException(status_code=400, detail=f"Error en optimización: {str(e)}")
+
+    return _json_safe({"status": "success", "model_id": model_id, **result})
+
+
+@app.get("/models/{model_id}/series")
+def model_series(model_id: str, request: Request, offset: int = Query(0), limit: int = Query(10_000)):
+    """
+    Valores ajustados y residuos a resolución completa, paginados, en el
+    formato pedido por el header Accept (JSON, binario o Arrow IPC).
+    """
+    model_id, (fitter, _) = _get_model(model_id)
+    if fitter.fitted_values is None:
+        raise HTTPException(status_code=400, detail="Series no disponibles para modelos en modo estadísticos")
+    if offset < 0 or not 1 <= limit <= MAX_SERIES_PAGE:
+        raise HTTPException(status_code=400, detail=f"offset debe ser >= 0 y limit estar entre 1 y {MAX_SERIES_PAGE}")
+
+    total = len(fitter.fitted_values)
+    stop = min(offset + limit, total)
+    index = np.arange(offset, max(offset, stop))
+    media_type = negotiate(request.headers.get("accept"))
+    summary = {"model_id": model_id, "offset": offset, "limit": limit, "total": total,
+               "next_offset": stop if stop < total else None}
+    fitted = np.asarray(fitter.fitted_values, dtype=float)[offset:stop]
+    residuals = np.asarray(fitter.residuals, dtype=float)[offset:stop]
+
+    if media_type == JSON:
+        return _json_safe({**summary, "index": index.tolist(), "fitted_values": fitted.tolist(),
+                           "residuals": residuals.tolist()})
+    arrays = {"index": index.astype(np.int64), "fitted_values": fitted, "residuals": residuals}
+    return _encoded_response(media_type, summary, arrays)
+
+
+@app.post("/metrics")
+def get_metrics(request: Request, model_id: Optional[str] = Query(None),
+                series_points: Optional[int] = Query(None)):
+    """
+    Retorna métricas adicionales de un modelo (por defecto, el último ajustado).
+    
+    Con header Accept binario/Arrow o con `series_points` incluye además las
+    series de valores ajustados y residuos (ver `/fit`).
+    """
+    model_id, (fitter, _) = _get_model(model_id)
+
+    summary = {
+        "model_id": model_id,
+        "observations": int(fitter.model.nobs),
+        **fitter.diagnostics()
     }
+    if series_points is None and negotiate(request.headers.get("accept")) == JSON:
+        return _json_safe(summary)
+    return _series_response(request, summary, fitter, series_points)
 
 
 if __name__ == "__main__":
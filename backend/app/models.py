@@ -1,7 +1,9 @@
 """Modelos de datos para la calculadora de atribución marketing."""
 
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+from .utils import DEFAULT_CI_METHOD
 
 
 class ColumnMapping(BaseModel):
@@ -12,25 +14,122 @@ class ColumnMapping(BaseModel):
     control_columns: Optional[List[str]] = Field(default=None, description="Columnas de control")
 
 
+class ColumnTransform(BaseModel):
+    """Transformación adstock/saturación de una columna."""
+    adstock: Optional[str] = Field(default=None, description="'geometric', 'weibull' o None")
+    decay: Optional[float] = Field(default=None, description="Tasa de arrastre del adstock geométrico [0, 1)")
+    shape: Optional[float] = Field(default=None, description="Forma del adstock Weibull")
+    scale: Optional[float] = Field(default=None, description="Escala (periodos) del adstock Weibull")
+    max_lag: Optional[int] = Field(default=None, description="Rezagos máximos del adstock Weibull")
+    saturation: Optional[str] = Field(default=None, description="'hill' o None")
+    half_saturation: Optional[float] = Field(default=None, description="Punto de media saturación, relativo a la media de la serie")
+    slope: Optional[float] = Field(default=None, description="Pendiente de la curva Hill")
+
+
 class FitRequest(BaseModel):
     """Solicitud para ajustar el modelo."""
+    dataset_id: Optional[str] = Field(default=None, description="Handle retornado por /upload (None = último dataset)")
     regularization: Optional[str] = Field(default=None, description="Tipo de regularización: 'ridge' o None")
     alpha: Optional[float] = Field(default=1.0, description="Parámetro de regularización (para Ridge)")
     bootstrap_samples: Optional[int] = Field(default=1000, description="Número de muestras bootstrap para intervalos")
+    bootstrap_workers: Optional[int] = Field(default=None, description="Workers para bootstrap paralelo (None = secuencial)")
+    bootstrap_tolerance: Optional[float] = Field(default=None, description="Parar el bootstrap cuando los extremos de los IC se mueven menos que esta fracción de su ancho entre bloques (None = todas las réplicas)")
+    ci_method: str = Field(default=DEFAULT_CI_METHOD, description="Intervalos de los coeficientes: 'hc'/'hac' (analíticos, sin bootstrap) o 'pairs'/'residual'/'wild'/'block' (bootstrap)")
+    hac_lags: Optional[int] = Field(default=None, description="Rezagos de Newey-West para 'hac' (None = floor(4 (n/100)^(2/9)))")
+    block_length: Optional[int] = Field(default=None, description="Longitud de bloque para 'block' (None = n^(1/3))")
+    vif_include_controls: bool = Field(default=False, description="Calcular VIF también para las columnas de control")
+    transforms: Optional[Dict[str, ColumnTransform]] = Field(default=None, description="Adstock/saturación por columna")
+    background: bool = Field(default=False, description="Ejecutar como job en background (retorna job_id)")
+
+
+class RidgePathRequest(BaseModel):
+    """Solicitud para calcular el camino de regularización Ridge."""
+    dataset_id: Optional[str] = Field(default=None, description="Handle retornado por /upload (None = último dataset)")
+    alphas: Optional[List[float]] = Field(default=None, description="Rejilla de alphas (None = 50 valores log-espaciados entre 1e-3 y 1e4)")
+    transforms: Optional[Dict[str, ColumnTransform]] = Field(default=None, description="Adstock/saturación por columna")
+
+
+class BacktestRequest(BaseModel):
+    """Solicitud de validación temporal con origen móvil."""
+    dataset_id: Optional[str] = Field(default=None, description="Handle retornado por /upload (None = último dataset)")
+    n_folds: int = Field(default=5, description="Número de folds de evaluación")
+    horizon: Optional[int] = Field(default=None, description="Filas por fold de evaluación (None = repartir lo que queda tras min_train)")
+    window: str = Field(default="expanding", description="'expanding' (todo el pasado) o 'sliding' (ventana fija)")
+    min_train: Optional[int] = Field(default=None, description="Mínimo de filas de entrenamiento del primer fold")
+    regularization: Optional[str] = Field(default=None, description="Tipo de regularización: 'ridge' o None")
+    alpha: Optional[float] = Field(default=1.0, description="Parámetro de regularización")
+    transforms: Optional[Dict[str, ColumnTransform]] = Field(default=None, description="Adstock/saturación por columna")
+    workers: Optional[int] = Field(default=None, description="Hilos para los folds (None = secuencial)")
+
+
+class TransformSearchRequest(BaseModel):
+    """Solicitud para buscar los parámetros de adstock/saturación."""
+    dataset_id: Optional[str] = Field(default=None, description="Handle retornado por /upload (None = último dataset)")
+    grid: Dict[str, Dict[str, Any]] = Field(..., description="Rejilla por columna. Ej: {'Channel_A': {'adstock': 'geometric', 'decay': [0.1, 0.5, 0.9]}}")
+    n_random: Optional[int] = Field(default=None, description="Muestrear n combinaciones de la rejilla (None = rejilla completa)")
+    criterion: str = Field(default="aic", description="Criterio de ranking: 'aic', 'bic' o 'cv'")
+    cv_folds: int = Field(default=5, description="Folds de validación temporal (criterion='cv')")
+    workers: Optional[int] = Field(default=None, description="Procesos para evaluar candidatos (None = secuencial)")
+    top_k: int = Field(default=10, description="Candidatos a retornar en el ranking")
+    regularization: Optional[str] = Field(default=None, description="Regularización del ajuste final del ganador")
+    alpha: Optional[float] = Field(default=1.0, description="Parámetro de regularización del ajuste final")
+    bootstrap_samples: Optional[int] = Field(default=1000, description="Muestras bootstrap del ajuste final")
+    bootstrap_workers: Optional[int] = Field(default=None, description="Workers para el bootstrap del ajuste final")
+    ci_method: str = Field(default=DEFAULT_CI_METHOD, description="Intervalos del ajuste final (ver FitRequest)")
+    hac_lags: Optional[int] = Field(default=None, description="Rezagos de Newey-West para 'hac'")
+    block_length: Optional[int] = Field(default=None, description="Longitud de bloque para 'block'")
+    vif_include_controls: bool = Field(default=False, description="Calcular VIF también para las columnas de control")
 
 
 class ScenarioRequest(BaseModel):
     """Solicitud para simulación de escenarios."""
+    model_config = ConfigDict(protected_namespaces=())
+    model_id: Optional[str] = Field(default=None, description="Handle retornado por /fit (None = último modelo)")
     changes: Dict[str, float] = Field(..., description="Cambios porcentuales por variable. Ej: {'Channel_A': 10}")
+    level: float = Field(default=0.95, description="Nivel de los intervalos de confianza y predicción")
+
+
+class BatchScenarioRequest(BaseModel):
+    """Solicitud para simular muchos escenarios en una llamada."""
+    model_config = ConfigDict(protected_namespaces=())
+    model_id: Optional[str] = Field(default=None, description="Handle retornado por /fit (None = último modelo)")
+    features: List[str] = Field(..., description="Variables de cada columna de la matriz de cambios")
+    changes: List[List[float]] = Field(..., description="Matriz (escenarios x features) de cambios porcentuales")
+    level: float = Field(default=0.95, description="Nivel de los intervalos de confianza y predicción")
+
+
+class CurvesRequest(BaseModel):
+    """Solicitud de curvas de respuesta por canal."""
+    model_config = ConfigDict(protected_namespaces=())
+    model_id: Optional[str] = Field(default=None, description="Handle retornado por /fit (None = último modelo)")
+    percentages: Optional[List[float]] = Field(default=None, description="Rejilla de cambios porcentuales (None = -100 a +100 cada 5)")
+    level: float = Field(default=0.95, description="Nivel de confianza de las bandas")
+
+
+class ChannelBounds(BaseModel):
+    """Límites de gasto por periodo para un canal."""
+    min: Optional[float] = Field(default=0.0, description="Gasto mínimo")
+    max: Optional[float] = Field(default=None, description="Gasto máximo (None = sin límite)")
+
+
+class OptimizeRequest(BaseModel):
+    """Solicitud para optimizar el reparto del presupuesto entre canales."""
+    model_config = ConfigDict(protected_namespaces=())
+    model_id: Optional[str] = Field(default=None, description="Handle retornado por /fit (None = último modelo)")
+    total_budget: Optional[float] = Field(default=None, description="Presupuesto total por periodo (None = gasto medio actual)")
+    bounds: Optional[Dict[str, ChannelBounds]] = Field(default=None, description="Límites por canal")
 
 
 class RegressionResults(BaseModel):
     """Resultados de la regresión lineal."""
+    model_config = ConfigDict(protected_namespaces=())
     coefficients: Dict[str, float]
     p_values: Dict[str, float]
     r_squared: float
     adjusted_r_squared: float
-    vif_values: Optional[Dict[str, float]] = None
+    vif_values: Optional[Dict[str, Optional[float]]] = None  # None = VIF infinito
+    condition_number: Optional[float] = None  # None = matriz de correlación singular
+    transforms: Optional[Dict[str, Dict[str, Any]]] = None
     residuals: List[float]
     fitted_values: List[float]
     aic: float
@@ -46,6 +145,8 @@ class PredictionResult(BaseModel):
     predicted_value: float
     confidence_interval_lower: Optional[float] = None
     confidence_interval_upper: Optional[float] = None
+    prediction_interval_lower: Optional[float] = None
+    prediction_interval_upper: Optional[float] = None
 
 
 class SimulationResult(BaseModel):
@@ -55,3 +156,4 @@ class SimulationResult(BaseModel):
     delta: float
     delta_percentage: float
     changes_applied: Dict[str, float]
+    scenario_interval: Optional[PredictionResult] = None
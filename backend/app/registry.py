@@ -0,0 +1,124 @@
+"""Registro en memoria de datasets y modelos para múltiples sesiones."""
+
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger("attribution_registry")
+
+
+class SessionRegistry:
+    """
+    Registro LRU de datasets (`DataProcessor`) y modelos (`RegressionFitter` +
+    `Simulator`) identificados por handle.
+
+    Cuando el tamaño estimado supera `memory_budget` (bytes) se expulsan las
+    entradas usadas menos recientemente. Expulsar un dataset expulsa también
+    los modelos ajustados sobre él. Si no se indica handle, se usa el último
+    dataset/modelo registrado (compatibilidad con clientes de una sola sesión).
+    """
+
+    def __init__(self, memory_budget: int):
+        self.memory_budget = memory_budget
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._last = {'dataset': None, 'model': None}
+
+    def add_dataset(self, processor, dataset_id: Optional[str] = None) -> str:
+        """Registra un dataset y retorna su handle (nuevo, o `dataset_id` si se reabre uno persistido)."""
+        dataset_id = dataset_id or f"ds_{uuid.uuid4().hex}"
+        with self._lock:
+            self._entries[dataset_id] = {
+                'kind': 'dataset',
+                'value': processor,
+                'size': processor.memory_usage(),
+                'dataset_id': dataset_id,
+            }
+            self._last['dataset'] = dataset_id
+            self._evict(keep=dataset_id)
+        return dataset_id
+
+    def add_model(self, dataset_id: str, fitter, simulator) -> str:
+        """Registra un modelo ajustado sobre `dataset_id` y retorna su handle."""
+        model_id = f"mdl_{uuid.uuid4().hex}"
+        with self._lock:
+            self._entries[model_id] = {
+                'kind': 'model',
+                'value': (fitter, simulator),
+                'size': fitter.memory_usage(),
+                'dataset_id': dataset_id,
+            }
+            self._last['model'] = model_id
+            self._evict(keep=model_id)
+        return model_id
+
+    def get_dataset(self, dataset_id: Optional[str] = None) -> Tuple[str, Any]:
+        """Retorna (handle, DataProcessor). Lanza KeyError si no existe."""
+        return self._get('dataset', dataset_id)
+
+    def get_model(self, model_id: Optional[str] = None) -> Tuple[str, Tuple[Any, Any]]:
+        """Retorna (handle, (RegressionFitter, Simulator)). Lanza KeyError si no existe."""
+        return self._get('model', model_id)
+
+    def models_for(self, dataset_id: str) -> Dict[str, Tuple[Any, Any]]:
+        """Modelos registrados sobre un dataset (handle -> (fitter, simulator))."""
+        with self._lock:
+            return {key: entry['value'] for key, entry in self._entries.items()
+                    if entry['kind'] == 'model' and entry['dataset_id'] == dataset_id}
+
+    def resize(self, key: str) -> None:
+        """Recalcula el tamaño estimado de una entrada tras modificarla (p. ej. /append)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            value = entry['value']
+            entry['size'] = value.memory_usage() if entry['kind'] == 'dataset' else value[0].memory_usage()
+            self._evict(keep=key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Resumen del uso del registro."""
+        with self._lock:
+            kinds = [entry['kind'] for entry in self._entries.values()]
+            return {
+                'datasets': kinds.count('dataset'),
+                'models': kinds.count('model'),
+                'memory_bytes': self._total_size(),
+                'memory_budget': self.memory_budget,
+            }
+
+    def _get(self, kind: str, key: Optional[str]):
+        with self._lock:
+            key = key or self._last[kind]
+            entry = self._entries.get(key) if key else None
+            if entry is None or entry['kind'] != kind:
+                raise KeyError(key)
+            self._entries.move_to_end(key)
+            if kind == 'model' and entry['dataset_id'] in self._entries:
+                self._entries.move_to_end(entry['dataset_id'])
+                self._entries.move_to_end(key)
+            return key, entry['value']
+
+    def _total_size(self) -> int:
+        return sum(entry['size'] for entry in self._entries.values())
+
+    def _evict(self, keep: str) -> None:
+        """Expulsa entradas LRU hasta respetar el presupuesto (nunca `keep` ni su dataset)."""
+        protected = {keep, self._entries[keep]['dataset_id']}
+        while self._total_size() > self.memory_budget:
+            victim = next((key for key in self._entries if key not in protected), None)
+            if victim is None:
+                break
+            self._remove(victim)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        logger.info(f"Registro: expulsando {entry['kind']} {key} ({entry['size']} bytes)")
+        if entry['kind'] == 'dataset':
+            for model_id in [k for k, e in self._entries.items() if e['dataset_id'] == key]:
+                self._entries.pop(model_id)
+        for kind, last in self._last.items():
+            if last not in self._entries:
+                self._last[kind] = None
@@ -0,0 +1,162 @@
+"""Almacén persistente de datasets en archivos .npy mapeables en memoria."""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+import logging
+from typing import Optional
+
+import numpy as np
+
+from .utils import DataProcessor
+
+logger = logging.getLogger("attribution_storage")
+
+# Se incrementa cuando cambia el formato en disco
+STORE_VERSION = 2
+
+# Reintentos de `load` si la generación leída se borra mientras se abre
+_LOAD_RETRIES = 5
+
+
+class DatasetStore:
+    """
+    Persiste los datasets cargados en `root/<dataset_id>/` para que varios
+    workers los compartan y sobrevivan a reinicios.
+
+    Cada `save` escribe una generación nueva en su propio directorio
+    `root/<dataset_id>/<generación>/` y luego reemplaza de forma atómica
+    (`os.replace`) el puntero `root/<dataset_id>/CURRENT`, que siempre
+    existe: otro proceso nunca ve el dataset a medias ni ausente. Las
+    generaciones anteriores se borran después; los mapeos ya abiertos
+    siguen siendo válidos y `load` reintenta si la generación que leyó
+    desaparece mientras la abre. `generation` permite a cada worker
+    comprobar si su copia en memoria sigue vigente. Cada generación contiene:
+
+    - `values.npy`: float64 (n, 1 + p) en orden Fortran: target y luego
+      features y controles. Cada columna es contigua en disco.
+    - `dates.npy`: datetime64[ns] (n,).
+    - `imputed.npy`: máscara de celdas imputadas empaquetada (`np.packbits`).
+    - `meta.json`: mapeo de columnas y filas descartadas.
+
+    `load` mapea los archivos en memoria (sólo lectura), de modo que N
+    workers comparten una única copia en la page cache y `X`/`y` son vistas
+    sin copia. Los datasets en modo estadísticos no tienen filas y no se
+    persisten.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def save(self, dataset_id: str, processor: DataProcessor) -> bool:
+        """
+        Escribe una generación nueva del dataset y la publica. Retorna False si
+        no tiene filas. La generación queda en `processor.store_generation`.
+        """
+        if not processor.has_rows():
+            return False
+        values = np.asfortranarray(processor.get_matrix())
+        generation = f"{time.time_ns():020d}_{uuid.uuid4().hex[:8]}"
+        meta = {
+            'version': STORE_VERSION,
+            'generation': generation,
+            'date_column': processor.date_column,
+            'target_column': processor.target_column,
+            'feature_columns': processor.feature_columns,
+            'control_columns': processor.control_columns,
+            'dropped_rows': processor.dropped_rows,
+        }
+
+        # La generación se escribe completa antes de apuntar CURRENT a ella
+        path = self._path(dataset_id)
+        gen_path = os.path.join(path, generation)
+        os.makedirs(gen_path)
+        pointer_tmp = os.path.join(path, f".CURRENT.{uuid.uuid4().hex}.tmp")
+        try:
+            np.save(os.path.join(gen_path, 'values.npy'), values)
+            np.save(os.path.join(gen_path, 'dates.npy'),
+                    np.asarray(processor.get_dates(), dtype='datetime64[ns]'))
+            np.save(os.path.join(gen_path, 'imputed.npy'), np.packbits(processor.imputation_mask()))
+            with open(os.path.join(gen_path, 'meta.json'), 'w', encoding='utf-8') as fh:
+                json.dump(meta, fh)
+            with open(pointer_tmp, 'w', encoding='utf-8') as fh:
+                fh.write(generation)
+            with self._lock:
+                os.replace(pointer_tmp, os.path.join(path, 'CURRENT'))
+        except Exception:
+            shutil.rmtree(gen_path, ignore_errors=True)
+            if os.path.exists(pointer_tmp):
+                os.remove(pointer_tmp)
+            raise
+        processor.store_generation = generation
+        self._remove_stale(path, keep=generation)
+        return True
+
+    def generation(self, dataset_id: str) -> Optional[str]:
+        """Generación publicada de un dataset (None si no existe). Sólo lee `CURRENT`."""
+        try:
+            with open(os.path.join(self._path(dataset_id), 'CURRENT'), 'r', encoding='utf-8') as fh:
+                return fh.read().strip() or None
+        except (FileNotFoundError, KeyError):
+            return None
+
+    def load(self, dataset_id: str) -> DataProcessor:
+        """Abre la generación vigente de un dataset mapeada en memoria. Lanza KeyError si no existe."""
+        for _ in range(_LOAD_RETRIES):
+            generation = self.generation(dataset_id)
+            if generation is None:
+                raise KeyError(dataset_id)
+            try:
+                return self._load_generation(dataset_id, generation)
+            except FileNotFoundError:
+                # Otro proceso publicó una generación nueva y borró ésta: releer CURRENT
+                continue
+        raise KeyError(dataset_id)
+
+    def _load_generation(self, dataset_id: str, generation: str) -> DataProcessor:
+        path = os.path.join(self._path(dataset_id), generation)
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as fh:
+            meta = json.load(fh)
+        if meta.get('version') != STORE_VERSION:
+            logger.warning(f"Dataset {dataset_id} con formato {meta.get('version')} ignorado")
+            raise KeyError(dataset_id)
+
+        values = np.load(os.path.join(path, 'values.npy'), mmap_mode='r')
+        dates = np.load(os.path.join(path, 'dates.npy'), mmap_mode='r')
+        imputed_path = os.path.join(path, 'imputed.npy')
+        imputed = np.load(imputed_path) if os.path.exists(imputed_path) else None
+        processor = DataProcessor.from_arrays(
+            dates,
+            values,
+            date_col=meta['date_column'],
+            target_col=meta['target_column'],
+            feature_cols=meta['feature_columns'],
+            control_cols=meta['control_columns'],
+            dropped_rows=meta['dropped_rows'],
+            imputed=imputed,
+        )
+        processor.store_generation = generation
+        return processor
+
+    def exists(self, dataset_id: str) -> bool:
+        return self.generation(dataset_id) is not None
+
+    def delete(self, dataset_id: str) -> None:
+        with self._lock:
+            shutil.rmtree(self._path(dataset_id), ignore_errors=True)
+
+    def _remove_stale(self, path: str, keep: str) -> None:
+        """Borra las generaciones anteriores (los mapeos abiertos sobre ellas siguen siendo válidos)."""
+        for name in os.listdir(path):
+            if name != keep and not name.startswith('.') and name != 'CURRENT':
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+    def _path(self, dataset_id: str) -> str:
+        if os.sep in dataset_id or dataset_id.startswith('.'):
+            raise KeyError(dataset_id)
+        return os.path.join(self.root, dataset_id)
@@ -1,25 +1,848 @@
 """Utilidades para procesamiento de datos y regresión lineal."""
 
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+from collections import OrderedDict
+from multiprocessing import get_context
 import numpy as np
 import pandas as pd
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, Iterable, Iterator, Callable
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from scipy.signal import lfilter
 import statsmodels.api as sm
-from statsmodels.stats.outliers_influence import variance_inflation_factor
 from sklearn.preprocessing import StandardScaler
 import warnings
+import copy
 
 warnings.filterwarnings('ignore')
 import logging
 
 logger = logging.getLogger("attribution_utils")
 
+# Número máximo de elementos (réplicas x observaciones x coeficientes) que se
+# materializan a la vez durante el bootstrap vectorizado (~32 MB en float64).
+_BOOTSTRAP_CHUNK_ELEMENTS = 2 ** 22
+
+# Réplicas por bloque en el bootstrap paralelo; cada bloque tiene su propia
+# semilla, de modo que el resultado es independiente del número de workers.
+_BOOTSTRAP_BLOCK_SIZE = 250
+
+# Columnas transformadas (adstock/saturación) y matrices de diseño completas
+# que cada DataProcessor conserva en caché, indexadas por los parámetros.
+_TRANSFORM_CACHE_COLUMNS = 256
+_TRANSFORM_CACHE_MATRICES = 8
+
+# Elementos (escenarios x observaciones) que se evalúan a la vez al promediar
+# una curva de saturación sobre la serie histórica.
+_SCENARIO_CHUNK_ELEMENTS = 2 ** 22
+
+# Elementos (observaciones x alphas) de residuos y leverages que se
+# materializan a la vez al calcular LOO-CV en `ridge_path`.
+_RIDGE_PATH_CHUNK_ELEMENTS = 2 ** 22
+
+# Pool de procesos compartido por todas las búsquedas de transformaciones
+# (ver `_search_pool`); se crea en el primer uso con el método 'spawn'.
+_SEARCH_POOL = None
+_SEARCH_POOL_LOCK = threading.Lock()
+
+# Máximo de réplicas bootstrap por ajuste (la API rechaza valores mayores)
+MAX_BOOTSTRAP = 5000
+
+# Métodos de intervalos de confianza de los coeficientes: sandwich analítico
+# (HC3 o HAC Newey-West) o bootstrap (pares i.i.d., residuos, wild o por bloques)
+CI_METHODS = ('hc', 'hac', 'pairs', 'residual', 'wild', 'block')
+ANALYTIC_CI_METHODS = ('hc', 'hac')
+# Método por defecto de la API, del ajuste y de la búsqueda de transformaciones:
+# HAC es instantáneo y robusto a la autocorrelación de las series semanales
+DEFAULT_CI_METHOD = 'hac'
+
+# Parámetros admitidos (y sus valores por defecto) de cada transformación
+_TRANSFORM_PARAMS = {
+    'geometric': {'decay': 0.5},
+    'weibull': {'shape': 1.0, 'scale': 2.0, 'max_lag': 12},
+    'hill': {'half_saturation': 1.0, 'slope': 1.0},
+}
+
+
+def _standardize_design(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Centra y escala las columnas de X (salvo la constante) para mejorar el condicionamiento."""
+    shift = X.mean(axis=0)
+    scale = X.std(axis=0)
+    shift[0] = 0.0
+    scale[0] = 1.0
+    scale[scale == 0] = 1.0
+    return (X - shift) / scale, shift, scale
+
+
+def _unstandardize_coefficients(coef: np.ndarray, shift: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Deshace `_standardize_design` sobre coeficientes apilados (filas = réplicas)."""
+    coef = coef / scale
+    coef[:, 0] -= coef[:, 1:] @ shift[1:]
+    return coef
+
+
+def _newey_west_lags(n: int) -> int:
+    """Rezagos por defecto de HAC (regla de Newey-West): floor(4 (n/100)^(2/9))."""
+    return int(np.floor(4 * (n / 100) ** (2 / 9)))
+
+
+def _default_block_length(n: int) -> int:
+    """Longitud por defecto del bootstrap por bloques: n^(1/3) redondeado."""
+    return max(1, int(round(n ** (1 / 3))))
+
+
+def _covariance_factor(cov: np.ndarray) -> np.ndarray:
+    """
+    Factor L con L L' = cov (Cholesky; si la matriz es singular, raíz por
+    autovalores recortando los negativos), de modo que x'Σx = ||L'x||².
+    """
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(cov)
+        return vectors * np.sqrt(np.clip(values, 0.0, None))
+
+
+def _ridge_penalty(scale: np.ndarray, alpha: float) -> np.ndarray:
+    """Matriz de penalización Ridge en el espacio escalado (la constante no se penaliza)."""
+    penalty = np.zeros(len(scale))
+    penalty[1:] = alpha / scale[1:] ** 2
+    return np.diag(penalty)
+
+
+def _vif_from_covariance(cov: np.ndarray, tol: float = 1e-10) -> Tuple[np.ndarray, float]:
+    """
+    VIF de cada variable como diagonal de la inversa de la matriz de correlación.
+    
+    Usa una única descomposición espectral R = V diag(λ) V'; entonces
+    VIF_j = sum_k V_jk² / λ_k. Los autovalores menores que `tol * λ_max`
+    se consideran nulos y las variables que cargan en ellos (o con varianza
+    cero) reciben `inf`.
+    
+    Returns:
+        (array de VIF, número de condición de la matriz de correlación)
+    """
+    cov = np.atleast_2d(cov)
+    std = np.sqrt(np.diag(cov))
+    vif = np.full(len(std), np.inf)
+    valid = std > 0
+    if not valid.any():
+        return vif, float('inf')
+    
+    corr = cov[np.ix_(valid, valid)] / np.outer(std[valid], std[valid])
+    eigvals, eigvecs = np.linalg.eigh(corr)
+    singular = eigvals <= tol * eigvals.max()
+    loadings = eigvecs ** 2
+    
+    sub_vif = loadings[:, ~singular] @ (1.0 / eigvals[~singular])
+    sub_vif[loadings[:, singular].sum(axis=1) > tol ** 0.5] = np.inf
+    vif[valid] = sub_vif
+    
+    condition_number = float('inf') if singular.any() or not valid.all() else float(eigvals.max() / eigvals.min())
+    return vif, condition_number
+
+
+def geometric_adstock(x: np.ndarray, decay: float) -> np.ndarray:
+    """Adstock geométrico a_t = x_t + decay * a_{t-1} (filtro IIR de primer orden)."""
+    return lfilter([1.0], [1.0, -decay], x, axis=0)
+
+
+def weibull_adstock(x: np.ndarray, shape: float, scale: float, max_lag: int) -> np.ndarray:
+    """Adstock Weibull: suma de x_{t-l} ponderada por exp(-(l/scale)^shape), l = 0..max_lag (filtro FIR)."""
+    lags = np.arange(int(max_lag) + 1)
+    weights = np.exp(-(lags / scale) ** shape)
+    return lfilter(weights, [1.0], x, axis=0)
+
+
+def hill_saturation(x: np.ndarray, half_saturation: float, slope: float) -> np.ndarray:
+    """Saturación Hill x^s / (x^s + k^s); valores negativos se tratan como 0."""
+    ratio = (np.clip(x, 0, None) / half_saturation) ** slope
+    return ratio / (1.0 + ratio)
+
+
+def _hill_derivative(x: np.ndarray, half_saturation: float, slope: float) -> np.ndarray:
+    """Derivada de `hill_saturation` respecto a x."""
+    x = np.clip(x, half_saturation * 1e-12, None)
+    ratio = (x / half_saturation) ** slope
+    return slope * ratio / (x * (1.0 + ratio) ** 2)
+
+
+def normalize_transforms(transforms: Optional[Dict[str, Dict[str, Any]]],
+                         columns: list) -> Dict[str, Dict[str, Any]]:
+    """
+    Valida una especificación de transformaciones y la lleva a forma canónica.
+    
+    Formato: {columna: {'adstock': 'geometric' | 'weibull' | None,
+    'saturation': 'hill' | None, <parámetros>}}. Los parámetros omitidos toman
+    el valor por defecto; `half_saturation` se expresa en unidades de la media
+    de la serie (tras adstock). Las columnas sin transformación se omiten.
+    """
+    normalized = {}
+    for column, spec in (transforms or {}).items():
+        if column not in columns:
+            raise ValueError(f"Columna no encontrada para transformar: {column}")
+        spec = dict(spec or {})
+        adstock = spec.pop('adstock', None)
+        saturation = spec.pop('saturation', None)
+        if adstock not in (None, 'geometric', 'weibull'):
+            raise ValueError(f"Adstock no soportado: {adstock}")
+        if saturation not in (None, 'hill'):
+            raise ValueError(f"Saturación no soportada: {saturation}")
+        
+        allowed = {}
+        for name in (adstock, saturation):
+            if name:
+                allowed.update(_TRANSFORM_PARAMS[name])
+        unknown = {k for k, v in spec.items() if v is not None} - set(allowed)
+        if unknown:
+            raise ValueError(f"Parámetros no válidos para {column}: {unknown}")
+        if not adstock and not saturation:
+            continue
+        
+        canonical = {'adstock': adstock, 'saturation': saturation}
+        for key, default in allowed.items():
+            value = spec.get(key)
+            canonical[key] = float(default if value is None else value)
+        if adstock == 'geometric' and not 0 <= canonical['decay'] < 1:
+            raise ValueError(f"decay debe estar en [0, 1) ({column})")
+        if adstock == 'weibull':
+            if canonical['shape'] <= 0 or canonical['scale'] <= 0:
+                raise ValueError(f"shape y scale deben ser positivos ({column})")
+            if canonical['max_lag'] < 0 or canonical['max_lag'] != int(canonical['max_lag']):
+                raise ValueError(f"max_lag debe ser un entero no negativo ({column})")
+            canonical['max_lag'] = int(canonical['max_lag'])
+        if saturation == 'hill' and (canonical['half_saturation'] <= 0 or canonical['slope'] <= 0):
+            raise ValueError(f"half_saturation y slope deben ser positivos ({column})")
+        normalized[column] = canonical
+    return normalized
+
+
+def apply_transform(x: np.ndarray, spec: Dict[str, Any]) -> Tuple[np.ndarray, Optional[float], np.ndarray]:
+    """
+    Aplica adstock y saturación (spec canónica) a una serie.
+    
+    Returns:
+        (serie tras adstock, k absoluto de la Hill o None, serie final)
+    """
+    x = np.asarray(x, dtype=float)
+    if spec.get('adstock') == 'geometric':
+        x = geometric_adstock(x, spec['decay'])
+    elif spec.get('adstock') == 'weibull':
+        x = weibull_adstock(x, spec['shape'], spec['scale'], spec['max_lag'])
+    if spec.get('saturation') != 'hill':
+        return x, None, x
+    level = x.mean()
+    if level <= 0:
+        raise ValueError("No se puede saturar una serie cuya media tras adstock no es positiva")
+    k = spec['half_saturation'] * level
+    return x, k, hill_saturation(x, k, spec['slope'])
+
+
+def expand_transform_grid(grid: Dict[str, Dict[str, Any]], n_random: Optional[int] = None,
+                          seed: int = 42, max_candidates: Optional[int] = None) -> list:
+    """
+    Expande una rejilla de transformaciones en especificaciones candidatas.
+    
+    Cada parámetro puede ser un valor o una lista de valores; los candidatos son
+    el producto cartesiano de todas las listas. Con `n_random` se muestrean
+    `n_random` combinaciones distintas sin enumerar el producto completo.
+    Si el número de candidatos supera `max_candidates` se lanza ValueError.
+    """
+    axes = []
+    for column, params in grid.items():
+        for key, values in (params or {}).items():
+            axes.append((column, key, list(values) if isinstance(values, (list, tuple)) else [values]))
+    sizes = [len(values) for _, _, values in axes]
+    if any(size == 0 for size in sizes):
+        raise ValueError("La rejilla contiene listas de valores vacías")
+    total = int(np.prod(sizes, dtype=object)) if sizes else 1
+    if n_random is not None and n_random < 1:
+        raise ValueError("n_random debe ser positivo")
+    n_candidates = min(total, n_random) if n_random is not None else total
+    if max_candidates is not None and n_candidates > max_candidates:
+        raise ValueError(f"Demasiados candidatos ({n_candidates}); máximo {max_candidates}, use n_random")
+    
+    if n_random is not None and n_random < total:
+        combos = []
+        for position in sorted(random.Random(seed).sample(range(total), n_random)):
+            digits = []
+            for size in reversed(sizes):
+                position, digit = divmod(int(position), size)
+                digits.append(digit)
+            combos.append([values[d] for (_, _, values), d in zip(axes, reversed(digits))])
+    else:
+        combos = itertools.product(*[values for _, _, values in axes])
+    
+    candidates = []
+    for combo in combos:
+        spec = {column: {} for column in grid}
+        for (column, key, _), value in zip(axes, combo):
+            spec[column][key] = value
+        candidates.append(spec)
+    return candidates
+
+
+def _score_transform_chunk(X: np.ndarray, y: np.ndarray, names: list, candidates: list,
+                           cv_folds: Optional[int]) -> list:
+    """
+    Ajusta OLS (lstsq, sin bootstrap ni VIF) para cada candidato y retorna sus métricas.
+    
+    Se ejecuta en un proceso del pool; las columnas transformadas se cachean
+    dentro del bloque porque candidatos vecinos comparten la mayoría.
+    """
+    n = len(y)
+    k = X.shape[1] + 1
+    tss = float(((y - y.mean()) ** 2).sum())
+    columns = {}
+    scores = []
+    for spec in candidates:
+        Z = np.empty((n, k))
+        Z[:, 0] = 1.0
+        Z[:, 1:] = X
+        for column, params in spec.items():
+            key = (column, json.dumps(params, sort_keys=True))
+            if key not in columns:
+                columns[key] = apply_transform(X[:, names.index(column)], params)[2]
+            Z[:, 1 + names.index(column)] = columns[key]
+        
+        coef = np.linalg.lstsq(Z, y, rcond=None)[0]
+        rss = float(((y - Z @ coef) ** 2).sum())
+        # Mismas fórmulas que statsmodels OLS
+        llf = -n / 2 * (np.log(2 * np.pi) + np.log(rss / n) + 1)
+        score = {
+            'transforms': spec,
+            'r_squared': 1 - rss / tss,
+            'aic': -2 * llf + 2 * k,
+            'bic': -2 * llf + np.log(n) * k,
+        }
+        
+        if cv_folds:
+            # Origen móvil con ventana creciente: entrenar en [0, b_i), evaluar en [b_i, b_{i+1})
+            bounds = [n * (i + 1) // (cv_folds + 1) for i in range(cv_folds + 1)]
+            bounds[-1] = n
+            errors = []
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                fold_coef = np.linalg.lstsq(Z[:start], y[:start], rcond=None)[0]
+                errors.append(y[start:stop] - Z[start:stop] @ fold_coef)
+            score['cv_rmse'] = float(np.sqrt(np.mean(np.concatenate(errors) ** 2)))
+        scores.append(score)
+    return scores
+
+
+def _score_transform_file_chunk(data_dir: str, names: list, candidates: list,
+                                cv_folds: Optional[int]) -> list:
+    """
+    `_score_transform_chunk` sobre X/y guardados en `data_dir` (`X.npy`, `y.npy`).
+    
+    Los archivos se abren mapeados en memoria: cada bloque sólo recibe la
+    ruta y todos los procesos comparten las páginas de la page cache.
+    """
+    X = np.load(os.path.join(data_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(data_dir, 'y.npy'), mmap_mode='r')
+    return _score_transform_chunk(X, y, names, candidates, cv_folds)
+
+
+def _search_pool() -> ProcessPoolExecutor:
+    """
+    Pool de procesos de la búsqueda, creado una vez por proceso con 'spawn'.
+    
+    Las peticiones llegan desde hilos del servidor: hacer fork de un proceso
+    con varios hilos puede heredar locks tomados y bloquear a los hijos.
+    """
+    global _SEARCH_POOL
+    with _SEARCH_POOL_LOCK:
+        if _SEARCH_POOL is None:
+            _SEARCH_POOL = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                               mp_context=get_context('spawn'))
+        return _SEARCH_POOL
+
+
+def shutdown_search_pool(pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Detiene el pool de la búsqueda (se vuelve a crear en el siguiente uso).
+    
+    Con `pool` sólo lo detiene si sigue siendo el vigente (p. ej. tras un
+    `BrokenProcessPool`, sin tocar uno que otra petición ya recreó).
+    """
+    global _SEARCH_POOL
+    with _SEARCH_POOL_LOCK:
+        if pool is None:
+            pool = _SEARCH_POOL
+        if pool is _SEARCH_POOL:
+            _SEARCH_POOL = None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def search_transforms(processor: 'DataProcessor', candidates: list, criterion: str = 'aic',
+                      cv_folds: int = 5, n_jobs: Optional[int] = None) -> list:
+    """
+    Evalúa candidatos de transformaciones con ajustes OLS baratos y los ordena.
+    
+    Args:
+        candidates: Especificaciones de transformaciones (ver `expand_transform_grid`).
+        criterion: 'aic', 'bic' o 'cv' (RMSE de validación temporal con origen móvil).
+        cv_folds: Folds de validación temporal cuando criterion='cv'.
+        n_jobs: Bloques evaluados a la vez en el pool compartido (None o 1 =
+            en el proceso actual). X e y se escriben una sola vez en un
+            directorio temporal y los procesos los leen mapeados en memoria.
+    
+    Returns:
+        Lista de métricas por candidato, de mejor a peor.
+    """
+    if criterion not in ('aic', 'bic', 'cv'):
+        raise ValueError("criterion debe ser 'aic', 'bic' o 'cv'")
+    names = processor.get_feature_names()
+    candidates = [normalize_transforms(spec, names) for spec in candidates]
+    if not candidates:
+        raise ValueError("No hay candidatos que evaluar")
+    X, y = processor.get_regression_data()
+    X = np.ascontiguousarray(X, dtype=float)
+    y = np.ascontiguousarray(y, dtype=float)
+    folds = cv_folds if criterion == 'cv' else None
+    if folds and (folds < 2 or len(y) // (folds + 1) <= X.shape[1] + 1):
+        raise ValueError("cv_folds no válido: cada fold de entrenamiento necesita más filas que variables")
+    
+    workers = min(int(n_jobs or 1), len(candidates))
+    if workers <= 1:
+        scores = _score_transform_chunk(X, y, names, candidates, folds)
+    else:
+        # Bloques contiguos: candidatos vecinos del producto comparten columnas
+        step = -(-len(candidates) // (workers * 4))
+        chunks = [candidates[i:i + step] for i in range(0, len(candidates), step)]
+        parts = [None] * len(chunks)
+        pool = _search_pool()
+        with tempfile.TemporaryDirectory(prefix='transform_search_') as data_dir:
+            np.save(os.path.join(data_dir, 'X.npy'), X)
+            np.save(os.path.join(data_dir, 'y.npy'), y)
+            pending = {}
+            queue = list(enumerate(chunks))[::-1]
+            try:
+                # Como mucho `workers` bloques en vuelo por búsqueda
+                while queue or pending:
+                    while queue and len(pending) < workers:
+                        i, chunk = queue.pop()
+                        pending[pool.submit(_score_transform_file_chunk, data_dir, names, chunk, folds)] = i
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        parts[pending.pop(future)] = future.result()
+            except BrokenProcessPool:
+                shutdown_search_pool(pool)
+                raise
+            finally:
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+        scores = [score for part in parts for score in part]
+    
+    key = 'cv_rmse' if criterion == 'cv' else criterion
+    scores.sort(key=lambda score: score[key] if np.isfinite(score[key]) else np.inf)
+    return scores
+
+
+def lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Índices de los puntos que conserva Largest-Triangle-Three-Buckets al
+    reducir una serie equiespaciada a `n_out` puntos (incluye primero y último).
+    
+    Cada bucket se evalúa vectorizado; sólo se itera sobre los buckets.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError("LTTB necesita al menos 3 puntos de salida")
+    
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = (next_start + next_stop - 1) / 2
+        avg_y = y[next_start:next_stop].mean()
+        xs = np.arange(start, stop)
+        area = np.abs((a - avg_x) * (y[start:stop] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _resample_counts(indices: np.ndarray, n: int) -> np.ndarray:
+    """Convierte una matriz de índices (réplicas, n) en conteos de aparición por fila."""
+    offsets = (indices + (np.arange(indices.shape[0]) * n)[:, None]).ravel()
+    return np.bincount(offsets, minlength=indices.size).reshape(indices.shape).astype(float)
+
+
+def _solve_weighted_batch(Z: np.ndarray, y: np.ndarray, weights: np.ndarray,
+                          penalty: np.ndarray, singular: bool = False) -> np.ndarray:
+    """
+    Resuelve (Z' W Z + P) b = Z' W y para cada fila de pesos en una sola llamada.
+    
+    Con `singular` (diseño de rango incompleto) usa directamente la
+    pseudo-inversa: `solve` no siempre detecta una matriz singular.
+    """
+    Zw = weights[:, :, None] * Z
+    gram = Zw.transpose(0, 2, 1) @ Z + penalty
+    rhs = Zw.transpose(0, 2, 1) @ y
+    if singular:
+        return (np.linalg.pinv(gram, hermitian=True) @ rhs[:, :, None])[:, :, 0]
+    try:
+        return np.linalg.solve(gram, rhs[:, :, None])[:, :, 0]
+    except np.linalg.LinAlgError:
+        # Alguna réplica es singular: usar pseudo-inversa (solución de norma mínima)
+        return (np.linalg.pinv(gram, hermitian=True) @ rhs[:, :, None])[:, :, 0]
+
+
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+
+def _as_float(values: pd.Series) -> pd.Series:
+    """Convierte a float64; `pd.to_numeric` sólo si la columna no es ya numérica."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype('float64', copy=False)
+    return pd.to_numeric(values, errors='coerce').astype('float64')
+
+
+def _coerce_chunk(chunk: pd.DataFrame, date_col: str, numeric_cols: list) -> pd.DataFrame:
+    """Tipos de un bloque leído: columnas numéricas a float64 y fecha a datetime64."""
+    for col in numeric_cols:
+        chunk[col] = _as_float(chunk[col])
+    if not pd.api.types.is_datetime64_any_dtype(chunk[date_col]):
+        try:
+            chunk[date_col] = pd.to_datetime(chunk[date_col])
+        except Exception as e:
+            raise ValueError(f"Error al convertir columna de fecha: {str(e)}")
+    return chunk
+
+
+def detect_file_format(source, filename: Optional[str] = None) -> str:
+    """
+    Detecta el formato de un archivo subido: 'parquet', 'arrow' (IPC/Feather)
+    o 'csv'. Usa la firma del archivo y, si no es concluyente, la extensión.
+    """
+    magic = source.read(6)
+    source.seek(0)
+    if magic[:4] == b'PAR1':
+        return 'parquet'
+    if magic == b'ARROW1':
+        return 'arrow'
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    if extension in ('.arrow', '.arrows', '.feather', '.ipc'):
+        return 'arrow'
+    return 'csv'
+
+
+def iter_mapped_csv(source, date_col: str, numeric_cols: list,
+                    chunksize: int = 100_000) -> Tuple[list, Iterator[pd.DataFrame]]:
+    """
+    Prepara la lectura por bloques de un CSV conservando sólo las columnas mapeadas.
+    
+    `source` es un archivo binario o de texto posicionable (p. ej. el archivo
+    temporal de un `UploadFile`). Las columnas numéricas se convierten a
+    float64 y la fecha a datetime64 bloque a bloque, por lo que el pico de
+    memoria es proporcional a las columnas usadas y no al archivo completo.
+    
+    Returns:
+        (lista de columnas del archivo, iterador de bloques)
+    """
+    file_columns = list(pd.read_csv(source, nrows=0, encoding='utf-8').columns)
+    missing_cols = set([date_col] + numeric_cols) - set(file_columns)
+    if missing_cols:
+        raise ValueError(f"Columnas no encontradas: {missing_cols}")
+    source.seek(0)
+    
+    def chunks() -> Iterator[pd.DataFrame]:
+        reader = pd.read_csv(source, usecols=[date_col] + numeric_cols, chunksize=chunksize, encoding='utf-8')
+        for chunk in reader:
+            yield _coerce_chunk(chunk, date_col, numeric_cols)
+    
+    return file_columns, chunks()
+
+
+def iter_mapped_columnar(source, file_format: str, date_col: str, numeric_cols: list,
+                         chunksize: int = 100_000) -> Tuple[list, Iterator[pd.DataFrame]]:
+    """
+    Equivalente de `iter_mapped_csv` para Parquet y Arrow IPC/Feather.
+    
+    Sólo se leen las columnas mapeadas (proyección en el lector de pyarrow),
+    de modo que el tiempo de carga depende de las columnas usadas y no del
+    ancho del archivo. Las columnas que ya son numéricas no pasan por
+    `pd.to_numeric`. Requiere pyarrow (dependencia opcional).
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError(f"Formato {file_format} no disponible: pyarrow no está instalado")
+    
+    columns = [date_col] + numeric_cols
+    if file_format == 'parquet':
+        reader = pq.ParquetFile(source)
+        file_columns = list(reader.schema_arrow.names)
+        batches = lambda: reader.iter_batches(batch_size=chunksize, columns=columns)
+    elif file_format == 'arrow':
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = lambda: (reader.get_batch(i).select(columns) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            source.seek(0)
+            reader = pa.ipc.open_stream(source)
+            batches = lambda: (batch.select(columns) for batch in reader)
+        file_columns = list(reader.schema.names)
+    else:
+        raise ValueError(f"Formato de archivo no soportado: {file_format}")
+    
+    missing_cols = set(columns) - set(file_columns)
+    if missing_cols:
+        raise ValueError(f"Columnas no encontradas: {missing_cols}")
+    # Mismo orden que el CSV con `usecols`: el del archivo
+    columns = [col for col in file_columns if col in set(columns)]
+    
+    def chunks() -> Iterator[pd.DataFrame]:
+        for batch in batches():
+            for offset in range(0, batch.num_rows, chunksize):
+                chunk = batch.slice(offset, chunksize).to_pandas()
+                yield _coerce_chunk(chunk, date_col, numeric_cols)
+    
+    return file_columns, chunks()
+
+
+def iter_mapped_file(source, date_col: str, numeric_cols: list, file_format: str = 'csv',
+                     chunksize: int = 100_000) -> Tuple[list, Iterator[pd.DataFrame]]:
+    """Lectura por bloques de un archivo CSV, Parquet o Arrow (ver `detect_file_format`)."""
+    if file_format in COLUMNAR_FORMATS:
+        return iter_mapped_columnar(source, file_format, date_col, numeric_cols, chunksize)
+    return iter_mapped_csv(source, date_col, numeric_cols, chunksize)
+
+
+def read_mapped_file(source, date_col: str, numeric_cols: list, file_format: str = 'csv',
+                     chunksize: int = 100_000) -> Tuple[pd.DataFrame, list]:
+    """
+    Lee un archivo completo por bloques conservando sólo las columnas mapeadas.
+    
+    Returns:
+        (DataFrame con las columnas mapeadas, lista de columnas del archivo)
+    """
+    file_columns, chunks = iter_mapped_file(source, date_col, numeric_cols, file_format, chunksize)
+    frames = list(chunks)
+    if not frames:
+        return pd.DataFrame(columns=[date_col] + numeric_cols), file_columns
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True), file_columns
+    return pd.concat(frames, ignore_index=True), file_columns
+
+
+class SufficientStats:
+    """
+    Estadísticos suficientes de OLS acumulados por bloques.
+    
+    Guarda Z'Z y Z'y (Z = [1, X]), y'y y n, con O(p²) memoria. Los datos se
+    desplazan por la media del primer bloque antes de acumular para evitar
+    cancelación numérica; el desplazamiento se deshace al resolver.
+    """
+    
+    def __init__(self, n_features: int):
+        k = n_features + 1
+        self.n = 0
+        self.gram = np.zeros((k, k))
+        self.xty = np.zeros(k)
+        self.yty = 0.0
+        self.x_shift = None
+        self.y_shift = 0.0
+    
+    @classmethod
+    def from_arrays(cls, X: np.ndarray, y: np.ndarray,
+                    shift: Optional[Tuple[np.ndarray, float]] = None) -> 'SufficientStats':
+        """Estadísticos de un bloque; con `shift` = (x_shift, y_shift) se fija el desplazamiento."""
+        stats = cls(X.shape[1])
+        if shift is not None:
+            stats.x_shift = np.asarray(shift[0], dtype=float)
+            stats.y_shift = float(shift[1])
+        stats.update(X, y)
+        return stats
+    
+    def combine(self, other: 'SufficientStats', sign: float = 1.0) -> 'SufficientStats':
+        """
+        Nuevos estadísticos sumando (sign=1) o restando (sign=-1) los de otro
+        bloque calculado con el mismo desplazamiento.
+        """
+        if other.n == 0:
+            return copy.deepcopy(self)
+        if self.x_shift is None or not np.array_equal(self.x_shift, other.x_shift) \
+                or self.y_shift != other.y_shift:
+            raise ValueError("Los bloques deben compartir desplazamiento")
+        result = copy.deepcopy(self)
+        result.gram = self.gram + sign * other.gram
+        result.xty = self.xty + sign * other.xty
+        result.yty = self.yty + sign * other.yty
+        result.n = self.n + int(sign) * other.n
+        return result
+    
+    def update(self, X: np.ndarray, y: np.ndarray) -> None:
+        """Acumula un bloque de filas."""
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if len(y) == 0:
+            return
+        if self.x_shift is None:
+            self.x_shift = X.mean(axis=0)
+            self.y_shift = float(y.mean())
+        Z = np.column_stack([np.ones(len(y)), X - self.x_shift])
+        yc = y - self.y_shift
+        self.gram += Z.T @ Z
+        self.xty += Z.T @ yc
+        self.yty += float(yc @ yc)
+        self.n += len(y)
+    
+    def means(self) -> np.ndarray:
+        """Media de cada columna de X."""
+        return self.x_shift + self.gram[0, 1:] / self.n
+    
+    def y_mean(self) -> float:
+        return self.y_shift + self.xty[0] / self.n
+    
+    def covariance(self) -> np.ndarray:
+        """Covarianza (sesgada) de las columnas de X."""
+        m = self.gram[0, 1:] / self.n
+        return self.gram[1:, 1:] / self.n - np.outer(m, m)
+    
+    def total_sum_squares(self) -> float:
+        return self.yty - self.xty[0] ** 2 / self.n
+    
+    def solve(self, alpha: float = 0.0) -> np.ndarray:
+        """Coeficientes [const, betas] de OLS (alpha=0) o Ridge con constante sin penalizar."""
+        m = self.gram[0, 1:] / self.n
+        ym = self.xty[0] / self.n
+        centered = self.gram[1:, 1:] - self.n * np.outer(m, m)
+        cxy = self.xty[1:] - self.n * m * ym
+        if alpha > 0:
+            beta = np.linalg.solve(centered + alpha * np.eye(len(m)), cxy)
+        else:
+            beta = np.linalg.pinv(centered, hermitian=True) @ cxy
+        intercept = ym + self.y_shift - (m + self.x_shift) @ beta
+        return np.concatenate([[intercept], beta])
+    
+    def residual_sum_squares(self, coef: np.ndarray) -> float:
+        """RSS de unos coeficientes (en coordenadas originales)."""
+        shifted = coef.copy()
+        shifted[0] = coef[0] - self.y_shift + self.x_shift @ coef[1:]
+        rss = self.yty - 2 * shifted @ self.xty + shifted @ self.gram @ shifted
+        return float(max(rss, 0.0))
+    
+    def inverse_gram(self) -> np.ndarray:
+        """(Z'Z)^-1 en coordenadas originales (constante incluida)."""
+        inv = np.linalg.pinv(self.gram, hermitian=True)
+        T = np.eye(len(self.gram))
+        T[0, 1:] = -self.x_shift
+        return T @ inv @ T.T
+    
+    def coefficient_covariance(self, coef: np.ndarray, alpha: float = 0.0) -> Tuple[np.ndarray, float]:
+        """
+        Covarianza de los coeficientes y varianza residual RSS / (n - k).
+        
+        OLS: s² (Z'Z)^-1 (la de statsmodels sin corrección robusta). Ridge:
+        sandwich s² A^-1 Z'Z A^-1 con A = Z'Z + alpha (constante sin penalizar).
+        """
+        k = len(coef)
+        sigma2 = self.residual_sum_squares(coef) / max(self.n - k, 1)
+        if alpha > 0:
+            penalty = np.full(k, alpha)
+            penalty[0] = 0.0
+            inv = np.linalg.inv(self.gram + np.diag(penalty))
+            cov = inv @ self.gram @ inv
+            T = np.eye(k)
+            T[0, 1:] = -self.x_shift
+            cov = T @ cov @ T.T
+        else:
+            cov = self.inverse_gram()
+        return sigma2 * cov, float(sigma2)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Representación serializable en JSON (p. ej. para la caché de ajustes)."""
+        return {
+            'n': self.n,
+            'gram': self.gram.tolist(),
+            'xty': self.xty.tolist(),
+            'yty': self.yty,
+            'x_shift': self.x_shift.tolist() if self.x_shift is not None else None,
+            'y_shift': self.y_shift,
+        }
+    
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> 'SufficientStats':
+        """Reconstruye los estadísticos desde `to_dict`."""
+        stats = cls(len(payload['xty']) - 1)
+        stats.n = int(payload['n'])
+        stats.gram = np.array(payload['gram'], dtype=float)
+        stats.xty = np.array(payload['xty'], dtype=float)
+        stats.yty = float(payload['yty'])
+        if payload['x_shift'] is not None:
+            stats.x_shift = np.array(payload['x_shift'], dtype=float)
+        stats.y_shift = float(payload['y_shift'])
+        return stats
+    
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Representación en arrays (p. ej. para calcular una huella)."""
+        return self.gram, np.concatenate([self.xty, [self.yty, self.n, self.y_shift], self.x_shift])
+    
+    @property
+    def nbytes(self) -> int:
+        return int(self.gram.nbytes + self.xty.nbytes)
+
+
+def _interpolate_columns(values: np.ndarray) -> np.ndarray:
+    """
+    Interpola en el sitio los NaN de cada columna, linealmente por posición y
+    extendiendo los extremos (como `interpolate(method='linear',
+    limit_direction='both')`). Retorna la máscara de celdas que eran NaN.
+    """
+    missing = np.isnan(values)
+    positions = np.arange(len(values))
+    for j in np.flatnonzero(missing.any(axis=0)):
+        column_missing = missing[:, j]
+        if column_missing.all():
+            continue
+        values[column_missing, j] = np.interp(positions[column_missing], positions[~column_missing],
+                                              values[~column_missing, j])
+    return missing
+
 
 class DataProcessor:
-    """Procesador de datos para la calculadora de atribución marketing."""
+    """
+    Procesador de datos para la calculadora de atribución marketing.
+    
+    En modo completo los datos se guardan una sola vez como una matriz
+    float64 contigua (n, 1 + p) en orden Fortran (target y luego features y
+    controles), un array datetime64 de fechas y una máscara de bits
+    (`np.packbits`) de las celdas imputadas. `data` es una vista DataFrame
+    de sólo lectura sobre esa matriz.
+    """
     
     def __init__(self):
-        self.data = None
-        self.original_data = None
+        self.stats = None
+        self.date_range = None
+        self.dropped_rows = 0
+        # Generación publicada en DatasetStore de la que provienen estos datos (None = no persistido)
+        self.store_generation = None
+        self._anchor = None
+        self._values = None
+        self._dates = None
+        self._imputed = None
+        self._frame = None
+        self._transform_cache = OrderedDict()
+        self._matrix_cache = OrderedDict()
+        self._transform_lock = threading.Lock()
         self.feature_columns = None
         self.control_columns = None
         self.date_column = None
@@ -44,67 +867,373 @@ class DataProcessor:
         
         # Convertir fechas
         try:
-            df[date_col] = pd.to_datetime(df[date_col])
+            dates = pd.to_datetime(df[date_col]).to_numpy(dtype='datetime64[ns]')
         except Exception as e:
             raise ValueError(f"Error al convertir columna de fecha: {str(e)}")
         
-        # Ordenar por fecha
-        df = df.sort_values(date_col).reset_index(drop=True)
-        
         # Almacenar referencias
-        self.original_data = df.copy()
         self.date_column = date_col
         self.target_column = target_col
         self.feature_columns = feature_cols
         self.control_columns = control_cols or []
         
-        # Procesar datos
-        self.data = self._preprocess_data(df)
+        # Ordenar por fecha y copiar cada columna una sola vez a la matriz final
+        order = np.argsort(dates, kind='stable')
+        columns = self._matrix_columns()
+        values = np.empty((len(df), len(columns)), dtype=np.float64, order='F')
+        for j, col in enumerate(columns):
+            values[:, j] = _as_float(df[col]).to_numpy()[order]
+        imputed = _interpolate_columns(values)
+        
+        self.stats = None
+        self._set_arrays(dates[order], values, np.packbits(imputed))
+    
+    @classmethod
+    def from_arrays(cls, dates: np.ndarray, values: np.ndarray, date_col: str, target_col: str,
+                    feature_cols: list, control_cols: Optional[list] = None,
+                    dropped_rows: int = 0, imputed: Optional[np.ndarray] = None) -> 'DataProcessor':
+        """
+        Crea un procesador sobre datos ya preprocesados y ordenados por fecha.
+        
+        `values` es una matriz float64 (n, 1 + p) con el target en la primera
+        columna y luego features y controles (p. ej. un memmap de
+        `DatasetStore`). No se copia: `data` y `get_regression_data` son
+        vistas sobre ella. `imputed` es la máscara de celdas imputadas
+        empaquetada con `np.packbits` (opcional).
+        """
+        processor = cls()
+        processor.date_column = date_col
+        processor.target_column = target_col
+        processor.feature_columns = list(feature_cols)
+        processor.control_columns = list(control_cols or [])
+        processor.dropped_rows = dropped_rows
+        
+        n_columns = len(processor._matrix_columns())
+        if values.ndim != 2 or values.shape != (len(dates), n_columns):
+            raise ValueError(f"Forma de datos inconsistente: {values.shape} para {n_columns} columnas")
+        processor._set_arrays(dates, values, imputed)
+        return processor
     
-    def _preprocess_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Preprocesa los datos: manejo de NaNs, validación de tipos."""
-        df = df.copy()
+    def load_stats(self, chunks: Iterable[pd.DataFrame], date_col: str, target_col: str,
+                   feature_cols: list, control_cols: Optional[list] = None) -> None:
+        """
+        Carga los datos en modo estadísticos suficientes.
         
-        # Convertir a numérico
-        numeric_cols = [self.target_column] + self.feature_columns + self.control_columns
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        Cada bloque se preprocesa y se acumula en `self.stats`; no se guarda
+        ninguna fila, por lo que la memoria es O(p²). La interpolación se
+        hace dentro de cada bloque usando la última fila del bloque anterior
+        como ancla; las filas que siguen con NaN (p. ej. una columna vacía
+        al inicio del archivo) se descartan y se cuentan en `dropped_rows`.
+        """
+        self.date_column = date_col
+        self.target_column = target_col
+        self.feature_columns = feature_cols
+        self.control_columns = control_cols or []
+        self.dropped_rows = 0
+        self._anchor = None
+        self._set_arrays(None, None, None)
+        self.stats = SufficientStats(len(self.get_feature_names()))
         
-        # Manejo de NaNs
-        # Realizar interpolación lineal para NaNs en el medio
-        for col in numeric_cols:
-            df[col] = df[col].interpolate(method='linear', limit_direction='both')
-            # Si aún hay NaNs, rellenar con la media
-            if df[col].isna().any():
-                df[col].fillna(df[col].mean(), inplace=True)
+        for chunk in chunks:
+            self._accumulate(chunk)
         
-        return df
+        if self.stats.n < 10:
+            n_obs = self.stats.n
+            self.stats = None
+            raise ValueError(f"Mínimo 10 observaciones requeridas, se encontraron {n_obs}")
+        if self.dropped_rows:
+            logger.warning(f"Modo estadísticos: {self.dropped_rows} filas descartadas por NaN no interpolables")
     
-    def get_regression_data(self) -> Tuple[np.ndarray, np.ndarray]:
-        """Obtiene X (features + controles) e y (target) para regresión."""
-        if self.data is None:
+    def append_data(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Agrega filas nuevas (p. ej. la última semana) a un dataset ya cargado.
+        
+        Las filas se preprocesan igual que en la carga, interpolando desde la
+        última fila existente. En modo estadísticos sólo se actualizan los
+        estadísticos suficientes.
+        
+        Returns:
+            (X, y) de las filas agregadas ya preprocesadas.
+        """
+        if not self.is_loaded():
             raise ValueError("Datos no cargados")
+        if len(df) == 0:
+            raise ValueError("No hay filas para agregar")
         
-        all_feature_cols = self.feature_columns + self.control_columns
+        if not self.has_rows():
+            return self._accumulate(df)
         
-        # Validar que hay suficientes observaciones por variable
-        if len(self.data) < max(10, len(all_feature_cols) * 10):
-            raise ValueError(
-                f"Insuficientes observaciones ({len(self.data)}) para el número de variables ({len(all_feature_cols)})"
-            )
+        columns = self._matrix_columns()
+        missing_cols = set([self.date_column] + columns) - set(df.columns)
+        if missing_cols:
+            raise ValueError(f"Columnas no encontradas: {missing_cols}")
+        try:
+            new_dates = pd.to_datetime(df[self.date_column]).to_numpy(dtype='datetime64[ns]')
+        except Exception as e:
+            raise ValueError(f"Error al convertir columna de fecha: {str(e)}")
         
-        X = self.data[all_feature_cols].values
-        y = self.data[self.target_column].values
+        # La última fila existente hace de ancla para interpolar
+        n, m = len(self._values), len(df)
+        block = np.empty((m + 1, len(columns)), dtype=np.float64)
+        block[0] = self._values[-1]
+        for j, col in enumerate(columns):
+            block[1:, j] = _as_float(df[col]).to_numpy()
+        imputed = _interpolate_columns(block)[1:]
+        block = block[1:]
+        # Sólo quedan NaN si la columna no tiene ningún valor: usar la media histórica
+        still_missing = np.isnan(block)
+        if still_missing.any():
+            block[still_missing] = np.take(self._values.mean(axis=0), np.nonzero(still_missing)[1])
         
+        values = np.empty((n + m, len(columns)), dtype=np.float64, order='F')
+        values[:n] = self._values
+        values[n:] = block
+        dates = np.concatenate([self._dates, new_dates])
+        mask = np.concatenate([self.imputation_mask(), imputed])
+        if np.any(dates[1:] < dates[:-1]):
+            order = np.argsort(dates, kind='stable')
+            values = np.asfortranarray(values[order])
+            dates = dates[order]
+            mask = mask[order]
+        self._set_arrays(dates, values, np.packbits(mask))
+        
+        return block[:, 1:], block[:, 0]
+    
+    def _preprocess_block(self, chunk: pd.DataFrame,
+                          anchor: Optional[pd.DataFrame]) -> Tuple[pd.Series, pd.DataFrame]:
+        """Convierte tipos e interpola un bloque de filas usando `anchor` como fila previa."""
+        numeric_cols = [self.target_column] + self.get_feature_names()
+        missing_cols = set([self.date_column] + numeric_cols) - set(chunk.columns)
+        if missing_cols:
+            raise ValueError(f"Columnas no encontradas: {missing_cols}")
+        try:
+            dates = pd.to_datetime(chunk[self.date_column]).reset_index(drop=True)
+        except Exception as e:
+            raise ValueError(f"Error al convertir columna de fecha: {str(e)}")
+        
+        block = chunk[numeric_cols].apply(_as_float)
+        if anchor is not None:
+            block = pd.concat([anchor, block], ignore_index=True)
+        block = block.interpolate(method='linear', limit_direction='both')
+        if anchor is not None:
+            block = block.iloc[1:]
+        return dates, block.reset_index(drop=True)
+    
+    def _accumulate(self, chunk: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Preprocesa un bloque y lo suma a los estadísticos suficientes."""
+        all_feature_cols = self.get_feature_names()
+        dates, block = self._preprocess_block(chunk, self._anchor)
+        
+        valid = block.notna().all(axis=1).values
+        self.dropped_rows += int((~valid).sum())
+        block = block[valid]
+        X = block[all_feature_cols].values
+        y = block[self.target_column].values
+        if len(block) == 0:
+            return X, y
+        
+        self.stats.update(X, y)
+        self._anchor = block.iloc[[-1]]
+        
+        dates = dates[valid]
+        if self.date_range is None:
+            self.date_range = (dates.min(), dates.max())
+        else:
+            self.date_range = (min(self.date_range[0], dates.min()), max(self.date_range[1], dates.max()))
         return X, y
     
+    def _matrix_columns(self) -> list:
+        """Columnas de la matriz interna: target y luego features y controles."""
+        return [self.target_column] + self.get_feature_names()
+    
+    def _set_arrays(self, dates: Optional[np.ndarray], values: Optional[np.ndarray],
+                    imputed: Optional[np.ndarray]) -> None:
+        """Reemplaza la representación interna (o la vacía con None) e invalida cachés."""
+        if values is not None and values.flags.writeable:
+            values.flags.writeable = False
+        self._dates = dates
+        self._values = values
+        self._imputed = imputed
+        self._frame = None
+        self._clear_transform_cache()
+        if values is not None and len(values):
+            self.date_range = (pd.Timestamp(dates[0]), pd.Timestamp(dates[-1]))
+        else:
+            self.date_range = None
+    
+    @property
+    def data(self) -> Optional[pd.DataFrame]:
+        """
+        Vista DataFrame (fecha, target, features y controles) sobre la matriz
+        interna, construida al primer acceso. None en modo estadísticos.
+        """
+        if self._values is None:
+            return None
+        if self._frame is None:
+            frame = pd.DataFrame(self._values, columns=self._matrix_columns(), copy=False)
+            frame.insert(0, self.date_column, self._dates)
+            self._frame = frame
+        return self._frame
+    
+    def get_matrix(self) -> np.ndarray:
+        """Matriz interna (n, 1 + p) de sólo lectura: target y luego features y controles."""
+        if self._values is None:
+            raise ValueError("Datos no cargados")
+        return self._values
+    
+    def imputation_mask(self) -> np.ndarray:
+        """Máscara (n, 1 + p) de celdas imputadas (interpoladas o rellenadas con la media)."""
+        values = self.get_matrix()
+        if self._imputed is None:
+            return np.zeros(values.shape, dtype=bool)
+        return np.unpackbits(self._imputed, count=values.size).reshape(values.shape).astype(bool)
+    
+    def imputed_counts(self) -> Dict[str, int]:
+        """Número de celdas imputadas por columna."""
+        counts = self.imputation_mask().sum(axis=0)
+        return {col: int(count) for col, count in zip(self._matrix_columns(), counts)}
+    
+    def get_regression_data(self, transforms: Optional[Dict[str, Dict[str, Any]]] = None
+                            ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Obtiene X (features + controles) e y (target) para regresión.
+        
+        Args:
+            transforms: Adstock/saturación por columna (ver `normalize_transforms`).
+                La matriz transformada se cachea por parámetros y es de sólo lectura.
+        """
+        if self._values is None:
+            if self.stats is not None:
+                raise ValueError("Datos cargados en modo estadísticos suficientes: no hay matriz de diseño")
+            raise ValueError("Datos no cargados")
+        
+        all_feature_cols = self.feature_columns + self.control_columns
+        self._check_observations()
+        
+        # Vistas sin copia sobre la matriz interna
+        if transforms:
+            X = self._transformed_matrix(normalize_transforms(transforms, all_feature_cols))
+        else:
+            X = self._values[:, 1:]
+        y = self._values[:, 0]
+        
+        return X, y
+    
+    def get_transformed_column(self, column: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Aplica adstock y saturación a una columna (con caché por parámetros).
+        
+        Returns:
+            Dict con 'adstocked' (serie tras adstock), 'half_saturation'
+            (k absoluto de la Hill, o None) y 'values' (serie final).
+        """
+        key = (column, json.dumps(spec, sort_keys=True))
+        with self._transform_lock:
+            entry = self._transform_cache.get(key)
+            if entry is not None:
+                self._transform_cache.move_to_end(key)
+                return entry
+        
+        try:
+            index = self._matrix_columns().index(column)
+            adstocked, k, values = apply_transform(self._values[:, index], spec)
+        except ValueError as e:
+            raise ValueError(f"{column}: {e}")
+        entry = {'adstocked': adstocked, 'half_saturation': k, 'values': values}
+        for array in (entry['adstocked'], entry['values']):
+            array.flags.writeable = False
+        
+        with self._transform_lock:
+            self._transform_cache[key] = entry
+            while len(self._transform_cache) > _TRANSFORM_CACHE_COLUMNS:
+                self._transform_cache.popitem(last=False)
+        return entry
+    
+    def _transformed_matrix(self, transforms: Dict[str, Dict[str, Any]]) -> np.ndarray:
+        """Matriz de diseño con las columnas transformadas, reutilizando columnas ya calculadas."""
+        key = json.dumps(transforms, sort_keys=True)
+        with self._transform_lock:
+            X = self._matrix_cache.get(key)
+            if X is not None:
+                self._matrix_cache.move_to_end(key)
+                return X
+        
+        all_feature_cols = self.get_feature_names()
+        X = np.array(self._values[:, 1:])
+        for column, spec in transforms.items():
+            X[:, all_feature_cols.index(column)] = self.get_transformed_column(column, spec)['values']
+        X.flags.writeable = False
+        
+        with self._transform_lock:
+            self._matrix_cache[key] = X
+            while len(self._matrix_cache) > _TRANSFORM_CACHE_MATRICES:
+                self._matrix_cache.popitem(last=False)
+        return X
+    
+    def _clear_transform_cache(self) -> None:
+        with self._transform_lock:
+            self._transform_cache.clear()
+            self._matrix_cache.clear()
+    
+    def get_sufficient_stats(self) -> SufficientStats:
+        """Estadísticos suficientes (acumulados o calculados desde los datos)."""
+        if self.stats is not None:
+            self._check_observations()
+            return self.stats
+        X, y = self.get_regression_data()
+        return SufficientStats.from_arrays(X, y)
+    
+    def get_feature_means(self, transforms: Optional[Dict[str, Dict[str, Any]]] = None) -> np.ndarray:
+        """Media de cada feature/control (línea base del simulador)."""
+        if self.stats is not None:
+            if transforms:
+                raise ValueError("Las transformaciones adstock/saturación requieren el dataset completo")
+            return self.stats.means()
+        X, _ = self.get_regression_data(transforms)
+        return X.mean(axis=0)
+    
+    def n_observations(self) -> int:
+        if self.stats is not None:
+            return self.stats.n
+        return 0 if self._values is None else len(self._values)
+    
+    def is_loaded(self) -> bool:
+        return self._values is not None or self.stats is not None
+    
+    def has_rows(self) -> bool:
+        """True si las filas están en memoria (modo completo)."""
+        return self._values is not None
+    
+    def _check_observations(self) -> None:
+        """Valida que hay suficientes observaciones por variable."""
+        n_obs = self.n_observations()
+        n_vars = len(self.get_feature_names())
+        if n_obs < max(10, n_vars * 10):
+            raise ValueError(
+                f"Insuficientes observaciones ({n_obs}) para el número de variables ({n_vars})"
+            )
+    
     def get_dates(self) -> np.ndarray:
         """Retorna array de fechas."""
-        return self.data[self.date_column].values
+        return self._dates
     
     def get_feature_names(self) -> list:
         """Retorna nombres de features incluyendo controles."""
         return self.feature_columns + self.control_columns
+    
+    def memory_usage(self) -> int:
+        """Bytes aproximados que ocupan los datos en memoria."""
+        arrays = [a for a in (self._values, self._dates, self._imputed) if a is not None]
+        # Las páginas mapeadas de `DatasetStore` se comparten entre procesos: no cuentan
+        arrays = [a for a in arrays if not isinstance(a, np.memmap)]
+        if self._frame is not None:
+            arrays.append(self._frame[self.date_column].values)
+        stats_bytes = self.stats.nbytes if self.stats is not None else 0
+        with self._transform_lock:
+            cache_bytes = sum(X.nbytes for X in self._matrix_cache.values())
+            cache_bytes += sum(e['adstocked'].nbytes + (e['values'].nbytes if e['values'] is not e['adstocked'] else 0)
+                               for e in self._transform_cache.values())
+        return int(sum(a.nbytes for a in arrays)) + stats_bytes + cache_bytes
 
 
 class RegressionFitter:
@@ -117,18 +1246,82 @@ class RegressionFitter:
         self.residuals = None
         self.vif_values = None
         self.bootstrap_ci = {}
+        self.regularization = None
+        self.alpha = 1.0
+        self.condition_number = None
+        self.stats = None
+        self.bootstrap_samples = 0
+        self.bootstrap_replicates = 0
+        self.bootstrap_tolerance = None
+        self.ci_method = DEFAULT_CI_METHOD
+        self.hac_lags = None
+        self.block_length = None
+        self.ci_params = {}
+        self.bootstrap_draws = None
+        self._covariance = None
+        self.bootstrap_stale = False
+        self._diagnostics = None
+        self.n_jobs = None
+        self.vif_include_controls = False
+        self.transforms = {}
         
     def fit(self, regularization: Optional[str] = None, alpha: float = 1.0,
-            bootstrap_samples: int = 1000) -> Dict[str, Any]:
-        """Ajusta el modelo de regresión."""
-        X, y = self.processor.get_regression_data()
+            bootstrap_samples: int = 1000, n_jobs: Optional[int] = None,
+            vif_include_controls: bool = False,
+            transforms: Optional[Dict[str, Dict[str, Any]]] = None,
+            progress: Optional[Callable[..., None]] = None,
+            bootstrap_tolerance: Optional[float] = None, ci_method: str = DEFAULT_CI_METHOD,
+            hac_lags: Optional[int] = None, block_length: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Ajusta el modelo de regresión.
+        
+        Args:
+            n_jobs: Workers para repartir el bootstrap (None = secuencial).
+            vif_include_controls: Si True, reporta VIF también para los controles.
+            transforms: Adstock/saturación por columna (ver `normalize_transforms`).
+            progress: Callback `progress(done, total, stage=..., ci=...)` llamado tras
+                cada bloque de réplicas bootstrap; si lanza una excepción el ajuste se aborta.
+            bootstrap_tolerance: Parar el bootstrap cuando los extremos de los IC se
+                mueven menos que esta fracción de su ancho entre bloques (None = todas).
+            ci_method: Intervalos de los coeficientes (ver `CI_METHODS`): 'hc' (HC3) y
+                'hac' (Newey-West) son analíticos y no usan `bootstrap_samples`;
+                'pairs' remuestrea filas i.i.d.; 'residual', 'wild' y 'block'
+                (bloques móviles de residuos) reutilizan una sola factorización de X.
+            hac_lags: Rezagos de HAC (None = regla de Newey-West).
+            block_length: Longitud de bloque de 'block' (None = n^(1/3)).
+        
+        Si el `DataProcessor` está en modo estadísticos suficientes, el ajuste
+        se calcula a partir de X'X, X'y e y'y sin matriz de diseño; en ese
+        caso no se generan residuos ni valores ajustados y no hay bootstrap.
+        """
+        if ci_method not in CI_METHODS:
+            raise ValueError(f"ci_method debe ser uno de {list(CI_METHODS)}")
         feature_names = self.processor.get_feature_names()
+        self.regularization = regularization
+        self.alpha = alpha
+        self.ci_method = ci_method
+        self.hac_lags = hac_lags
+        self.block_length = block_length
+        self.n_jobs = n_jobs
+        self.vif_include_controls = vif_include_controls
+        self.bootstrap_samples = min(int(bootstrap_samples or 0), MAX_BOOTSTRAP)
+        self.bootstrap_replicates = 0
+        self.bootstrap_tolerance = bootstrap_tolerance
+        self.bootstrap_stale = False
+        self.transforms = normalize_transforms(transforms, feature_names)
+        
+        if not self.processor.has_rows():
+            if self.transforms:
+                raise ValueError("Las transformaciones adstock/saturación requieren el dataset completo")
+            return self._fit_from_stats(bootstrap_samples, vif_include_controls)
+        
+        X, y = self.processor.get_regression_data(self.transforms)
         
         # Agregar constante
         X = sm.add_constant(X)
         
         # Ajustar modelo
-        if regularization and regularization.lower() == 'ridge':
+        if self._is_ridge():
             # Ridge regression
             from sklearn.linear_model import Ridge
             ridge = Ridge(alpha=alpha)
@@ -146,21 +1339,357 @@ class RegressionFitter:
             self.fitted_values = self.model.fittedvalues
         
         self.residuals = y - self.fitted_values
+        # Estadísticos suficientes para actualizaciones incrementales (/append)
+        self.stats = SufficientStats.from_arrays(X[:, 1:], y)
         
-        # Calcular VIF (para features, no para controles)
-        self.vif_values = self._calculate_vif(X, feature_names)
+        # Calcular VIF (para features y, si se pide, para controles)
+        self.vif_values = self._calculate_vif(X, feature_names, include_controls=vif_include_controls)
         
-        # Bootstrap para intervalos de confianza
-        if bootstrap_samples and bootstrap_samples > 0:
+        # Intervalos de confianza (analíticos o bootstrap)
+        if int(bootstrap_samples or 0) > self.bootstrap_samples and ci_method not in ANALYTIC_CI_METHODS:
             # evitar uso excesivo de CPU/memoria si el usuario pasa un valor enorme
-            max_allowed = 5000
-            n_bs = min(int(bootstrap_samples), max_allowed)
-            if int(bootstrap_samples) > max_allowed:
-                logger.warning(f"bootstrap_samples reducido a {max_allowed} por seguridad")
-            self.bootstrap_ci = self._bootstrap_ci(X, y, n_bs)
+            logger.warning(f"bootstrap_samples reducido a {self.bootstrap_samples} por seguridad")
+        self.bootstrap_ci = self._confidence_intervals(X, y, progress=progress)
+        
+        return self._get_results()
+    
+    def _fit_from_stats(self, bootstrap_samples: int, vif_include_controls: bool) -> Dict[str, Any]:
+        """Ajuste OLS/Ridge a partir de los estadísticos suficientes del procesador."""
+        stats = copy.deepcopy(self.processor.get_sufficient_stats())
+        feature_names = self.processor.get_feature_names()
+        self.stats = stats
+        
+        coef = stats.solve(self.alpha if self._is_ridge() else 0.0)
+        self.model = _StatsSummary(stats, coef, feature_names, ridge=self._is_ridge())
+        self.fitted_values = None
+        self.residuals = None
+        self.vif_values = self._calculate_vif(None, feature_names, include_controls=vif_include_controls,
+                                              cov=stats.covariance())
+        self.bootstrap_ci = {}
+        self.ci_params = {}
+        if self.ci_method in ANALYTIC_CI_METHODS:
+            logger.warning("Intervalos HC/HAC no disponibles en modo estadísticos suficientes; se omiten")
+        elif bootstrap_samples:
+            logger.warning("Bootstrap no disponible en modo estadísticos suficientes; se omite")
         
         return self._get_results()
     
+    def ridge_path(self, alphas, transforms: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Calcula todas las soluciones Ridge de una rejilla de alphas con una sola SVD.
+        
+        Con X centrada = U S V', para cada alpha:
+        beta = V diag(s / (s² + alpha)) U' y, df = sum s² / (s² + alpha).
+        La constante no se penaliza (igual que `sklearn.linear_model.Ridge`).
+        AIC/BIC usan los grados de libertad efectivos (+1 por la constante);
+        GCV y LOO-CV salen de la diagonal del hat matrix sin reajustar; el RSS
+        sale de U'y y LOO-CV se acumula por bloques de filas. En modo
+        estadísticos suficientes se usa la descomposición de X'X centrada y
+        LOO-CV no está disponible.
+        """
+        alphas = np.asarray(alphas, dtype=float)
+        feature_names = self.processor.get_feature_names()
+        transforms = normalize_transforms(transforms, feature_names)
+        
+        if not self.processor.has_rows():
+            if transforms:
+                raise ValueError("Las transformaciones adstock/saturación requieren el dataset completo")
+            stats = self.processor.get_sufficient_stats()
+            n = stats.n
+            m = stats.gram[0, 1:] / n
+            centered = stats.gram[1:, 1:] - n * np.outer(m, m)
+            eigvals, V = np.linalg.eigh(centered)
+            sq = np.clip(eigvals, 0, None)
+            Vty = V.T @ (stats.xty[1:] - m * stats.xty[0])
+            weights = Vty[:, None] / (sq[:, None] + alphas)
+            beta = V @ weights
+            tss = stats.total_sum_squares()
+            # RSS = yc'yc - 2 b'Xc'yc + b'Xc'Xc b
+            rss = tss - 2 * (Vty[:, None] * weights).sum(axis=0) + (sq[:, None] * weights ** 2).sum(axis=0)
+            x_mean = stats.means()
+            y_mean = stats.y_mean()
+            loo_mse = None
+        else:
+            X, y = self.processor.get_regression_data(transforms)
+            n = len(y)
+            x_mean = X.mean(axis=0)
+            y_mean = y.mean()
+            yc = y - y_mean
+            U, s, Vt = np.linalg.svd(X - x_mean, full_matrices=False)
+            sq = s ** 2
+            Uty = U.T @ yc
+            beta = Vt.T @ (s[:, None] * Uty[:, None] / (sq[:, None] + alphas))
+            shrink = sq[:, None] / (sq[:, None] + alphas)
+            tss = float(yc @ yc)
+            # RSS = yc'yc - sum (2 shrink - shrink²) (U'yc)², sin residuos n x alphas
+            rss = np.clip(tss - ((2 * shrink - shrink ** 2) * Uty[:, None] ** 2).sum(axis=0), 0.0, None)
+            # LOO-CV por bloques de filas: sólo se materializan chunk x alphas elementos
+            fitted_weights = shrink * Uty[:, None]
+            loo_sse = np.zeros(len(alphas))
+            chunk = max(1, _RIDGE_PATH_CHUNK_ELEMENTS // max(len(alphas), 1))
+            for start in range(0, n, chunk):
+                rows = U[start:start + chunk]
+                residuals = yc[start:start + chunk, None] - rows @ fitted_weights
+                leverage = 1.0 / n + (rows ** 2) @ shrink
+                loo_sse += ((residuals / (1 - leverage)) ** 2).sum(axis=0)
+            loo_mse = loo_sse / n
+        
+        effective_df = (sq[:, None] / (sq[:, None] + alphas)).sum(axis=0)
+        intercept = y_mean - x_mean @ beta
+        n_params = effective_df + 1
+        aic = n * np.log(rss / n) + 2 * n_params
+        bic = n * np.log(rss / n) + np.log(n) * n_params
+        gcv = (rss / n) / (1 - n_params / n) ** 2
+        
+        coefficients = {'const': intercept.tolist()}
+        coefficients.update({name: beta[i].tolist() for i, name in enumerate(feature_names)})
+        best = {'aic': float(alphas[np.argmin(aic)]), 'bic': float(alphas[np.argmin(bic)]),
+                'gcv': float(alphas[np.argmin(gcv)])}
+        if loo_mse is not None:
+            best['loo'] = float(alphas[np.argmin(loo_mse)])
+        
+        return {
+            'alphas': alphas.tolist(),
+            'coefficients': coefficients,
+            'effective_df': effective_df.tolist(),
+            'rss': rss.tolist(),
+            'r_squared': (1 - rss / tss).tolist(),
+            'aic': aic.tolist(),
+            'bic': bic.tolist(),
+            'gcv': gcv.tolist(),
+            'loo_mse': loo_mse.tolist() if loo_mse is not None else None,
+            'best_alpha': best,
+            'observations': int(n)
+        }
+    
+    def backtest(self, n_folds: int = 5, horizon: Optional[int] = None, window: str = 'expanding',
+                 min_train: Optional[int] = None, regularization: Optional[str] = None,
+                 alpha: float = 1.0, transforms: Optional[Dict[str, Dict[str, Any]]] = None,
+                 n_jobs: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Validación temporal con origen móvil sobre los datos ordenados por fecha.
+        
+        Los `n_folds` bloques de evaluación de `horizon` filas se alinean al
+        final de la serie; cada fold entrena con todo lo anterior
+        (window='expanding') o con una ventana de tamaño fijo igual al primer
+        entrenamiento (window='sliding'). Los estadísticos suficientes de cada
+        fold se obtienen del fold anterior sumando el bloque nuevo (y restando
+        el que sale de la ventana); los X'X de los bloques y las resoluciones
+        por fold se reparten en `n_jobs` hilos.
+        
+        El adstock se calcula sobre la serie completa (sólo mira al pasado).
+        La escala de la Hill (`half_saturation` relativo a la media) se fija
+        en cada fold con la media de su ventana de entrenamiento, de modo que
+        el bloque de evaluación no influye en el ajuste; esos folds se
+        resuelven desde cero en vez de acumular estadísticos.
+        
+        Returns:
+            Dict con la configuración, métricas globales (RMSE, MAE, MAPE %) y,
+            por fold, rangos de entrenamiento/evaluación, métricas y las series
+            de pronóstico y valores reales.
+        """
+        if window not in ('expanding', 'sliding'):
+            raise ValueError("window debe ser 'expanding' o 'sliding'")
+        if not self.processor.has_rows():
+            raise ValueError("El backtest requiere el dataset completo")
+        if n_folds < 1:
+            raise ValueError("n_folds debe ser al menos 1")
+        ridge = bool(regularization and regularization.lower() == 'ridge')
+        
+        feature_names = self.processor.get_feature_names()
+        transforms = normalize_transforms(transforms, feature_names)
+        X, y = self.processor.get_regression_data(transforms)
+        dates = self.processor.get_dates()
+        n, k = len(y), X.shape[1] + 1
+        if min_train is None:
+            min_train = max(k + 1, n // (n_folds + 1))
+        if horizon is None:
+            horizon = (n - min_train) // n_folds
+        if horizon < 1 or n - n_folds * horizon < max(min_train, k + 1):
+            raise ValueError(
+                f"Observaciones insuficientes ({n}) para {n_folds} folds de {horizon} filas "
+                f"con al menos {max(min_train, k + 1)} de entrenamiento"
+            )
+        
+        train_size = n - n_folds * horizon
+        origins = [train_size + i * horizon for i in range(n_folds)]
+        # Columnas con Hill: serie tras adstock y parámetros, para escalarlas por fold
+        hill = {feature_names.index(name): (self.processor.get_transformed_column(name, spec)['adstocked'], spec)
+                for name, spec in transforms.items() if spec['saturation'] == 'hill'}
+        
+        def fold_design(start: int, stop: int) -> np.ndarray:
+            """Filas [start, stop) del diseño con la Hill escalada por la media de [start, origin)."""
+            design = np.array(X[start:stop])
+            origin = stop - horizon
+            for j, (adstocked, spec) in hill.items():
+                level = adstocked[start:origin].mean()
+                if level <= 0:
+                    raise ValueError(f"{feature_names[j]}: no se puede saturar una ventana de "
+                                     f"entrenamiento cuya media tras adstock no es positiva")
+                design[:, j] = hill_saturation(adstocked[start:stop], spec['half_saturation'] * level,
+                                               spec['slope'])
+            return design
+        
+        workers = max(1, int(n_jobs)) if n_jobs else 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            fold_stats = None
+            if not hill:
+                shift = (X[:train_size].mean(axis=0), float(y[:train_size].mean()))
+                blocks = [(0, train_size)] + [(origin, origin + horizon) for origin in origins[:-1]]
+                if window == 'sliding':
+                    blocks += [(origin - train_size, origin - train_size + horizon) for origin in origins[:-1]]
+                block_stats = list(pool.map(
+                    lambda bounds: SufficientStats.from_arrays(X[bounds[0]:bounds[1]], y[bounds[0]:bounds[1]], shift),
+                    blocks))
+                
+                # Cada fold parte del anterior: + bloque nuevo (- bloque que sale de la ventana)
+                fold_stats = [block_stats[0]]
+                for i in range(1, n_folds):
+                    stats = fold_stats[-1].combine(block_stats[i])
+                    if window == 'sliding':
+                        stats = stats.combine(block_stats[n_folds - 1 + i], sign=-1.0)
+                    fold_stats.append(stats)
+            
+            def run_fold(i: int) -> Dict[str, Any]:
+                origin = origins[i]
+                train_start = origin - train_size if window == 'sliding' else 0
+                if fold_stats is None:
+                    design = fold_design(train_start, origin + horizon)
+                    stats = SufficientStats.from_arrays(design[:origin - train_start], y[train_start:origin])
+                    X_test = design[origin - train_start:]
+                else:
+                    stats = fold_stats[i]
+                    X_test = X[origin:origin + horizon]
+                coef = stats.solve(alpha if ridge else 0.0)
+                actual = y[origin:origin + horizon]
+                forecast = coef[0] + X_test @ coef[1:]
+                errors = actual - forecast
+                nonzero = actual != 0
+                return {
+                    'fold': i,
+                    'train_start': str(pd.Timestamp(dates[train_start])),
+                    'train_end': str(pd.Timestamp(dates[origin - 1])),
+                    'test_start': str(pd.Timestamp(dates[origin])),
+                    'test_end': str(pd.Timestamp(dates[origin + horizon - 1])),
+                    'train_size': int(stats.n),
+                    'test_size': int(horizon),
+                    'rmse': float(np.sqrt(np.mean(errors ** 2))),
+                    'mae': float(np.mean(np.abs(errors))),
+                    'mape': float(np.mean(np.abs(errors[nonzero] / actual[nonzero])) * 100) if nonzero.any() else None,
+                    'coefficients': dict(zip(['const'] + feature_names, coef.tolist())),
+                    'dates': [str(pd.Timestamp(d).date()) for d in dates[origin:origin + horizon]],
+                    'actual': actual.tolist(),
+                    'forecast': forecast.tolist(),
+                }
+            
+            folds = list(pool.map(run_fold, range(n_folds)))
+        
+        actual = y[train_size:]
+        forecast = np.concatenate([fold['forecast'] for fold in folds])
+        errors = actual - forecast
+        nonzero = actual != 0
+        return {
+            'window': window,
+            'n_folds': n_folds,
+            'horizon': int(horizon),
+            'train_size': int(train_size),
+            'regularization': 'ridge' if ridge else None,
+            'alpha': float(alpha) if ridge else None,
+            'rmse': float(np.sqrt(np.mean(errors ** 2))),
+            'mae': float(np.mean(np.abs(errors))),
+            'mape': float(np.mean(np.abs(errors[nonzero] / actual[nonzero])) * 100) if nonzero.any() else None,
+            'folds': folds,
+        }
+    
+    def update(self, X_new: np.ndarray, y_new: np.ndarray) -> Dict[str, Any]:
+        """
+        Actualiza el ajuste tras `DataProcessor.append_data` sin reajustar todo el histórico.
+        
+        Suma las filas nuevas a X'X / X'y (actualización de rango k) y vuelve a
+        resolver el sistema p x p. Los intervalos analíticos (HC/HAC) se
+        recalculan en el momento; los bootstrap quedan marcados como obsoletos
+        (`bootstrap_stale`) hasta llamar a `refresh_bootstrap`.
+        """
+        if self.model is None:
+            raise ValueError("Modelo no ajustado")
+        
+        if self.transforms:
+            # El adstock arrastra efecto entre filas y la saturación se escala con
+            # la media de la serie: las filas nuevas cambian columnas ya existentes
+            self.stats = SufficientStats.from_arrays(*self.processor.get_regression_data(self.transforms))
+        else:
+            self.stats.update(X_new, y_new)
+        
+        feature_names = self.processor.get_feature_names()
+        coef = self.stats.solve(self.alpha if self._is_ridge() else 0.0)
+        self.model = _StatsSummary(self.stats, coef, feature_names, ridge=self._is_ridge())
+        if self.processor.has_rows():
+            X, y = self.processor.get_regression_data(self.transforms)
+            self.fitted_values = coef[0] + X @ coef[1:]
+            self.residuals = y - self.fitted_values
+        self.vif_values = self._calculate_vif(None, feature_names, include_controls=self.vif_include_controls,
+                                              cov=self.stats.covariance())
+        if self.ci_method in ANALYTIC_CI_METHODS:
+            # Intervalos analíticos: recalcularlos cuesta lo mismo que marcarlos obsoletos
+            self.refresh_bootstrap()
+        else:
+            self.bootstrap_stale = bool(self.bootstrap_ci) or self.bootstrap_samples > 0
+        
+        return self._get_results()
+    
+    def refresh_bootstrap(self) -> Dict[str, Tuple[float, float]]:
+        """Recalcula los intervalos de confianza con los datos actuales del procesador."""
+        if not self.processor.has_rows():
+            self.bootstrap_stale = False
+            return {}
+        
+        if self.bootstrap_samples > 0 or self.ci_method in ANALYTIC_CI_METHODS:
+            X, y = self.processor.get_regression_data(self.transforms)
+            self.bootstrap_ci = self._confidence_intervals(sm.add_constant(X), y)
+        self.bootstrap_stale = False
+        return self.bootstrap_ci
+    
+    @classmethod
+    def from_results(cls, data_processor: DataProcessor, results: Dict[str, Any],
+                     regularization: Optional[str] = None, alpha: float = 1.0,
+                     bootstrap_samples: int = 0, n_jobs: Optional[int] = None,
+                     bootstrap_tolerance: Optional[float] = None, ci_method: str = DEFAULT_CI_METHOD,
+                     hac_lags: Optional[int] = None,
+                     block_length: Optional[int] = None) -> 'RegressionFitter':
+        """
+        Reconstruye un ajuste a partir del payload de `_get_results` (p. ej. desde caché).
+        
+        Restaura también los estadísticos suficientes y las réplicas bootstrap,
+        de modo que /append, /simulate y /simulate/curves se comportan igual
+        que con el ajuste original.
+        """
+        fitter = cls(data_processor)
+        fitter.ci_method = results.get('ci_method', ci_method)
+        fitter.ci_params = results.get('ci_params') or {}
+        fitter.hac_lags = hac_lags
+        fitter.block_length = block_length
+        fitter.bootstrap_tolerance = bootstrap_tolerance
+        fitter.bootstrap_replicates = results.get('bootstrap_replicates', 0)
+        fitter.regularization = regularization
+        fitter.alpha = alpha
+        fitter.transforms = results.get('transforms') or {}
+        fitter.bootstrap_samples = bootstrap_samples
+        fitter.n_jobs = n_jobs
+        fitter.model = _ResultsSummary(results)
+        if results['residuals']:
+            fitter.fitted_values = np.asarray(results['fitted_values'], dtype=float)
+            fitter.residuals = np.asarray(results['residuals'], dtype=float)
+        if results.get('sufficient_stats'):
+            fitter.stats = SufficientStats.from_dict(results['sufficient_stats'])
+        if results.get('bootstrap_draws'):
+            fitter.bootstrap_draws = np.asarray(results['bootstrap_draws'], dtype=float)
+        fitter.vif_values = results['vif_values']
+        fitter.condition_number = results.get('condition_number')
+        fitter.bootstrap_ci = {k: tuple(v) for k, v in results['confidence_intervals'].items()}
+        fitter.bootstrap_stale = results.get('bootstrap_stale', False)
+        fitter._diagnostics = (fitter.model, results['diagnostics'])
+        return fitter
+    
     def _create_ridge_summary(self, X, y, coef, feature_names):
         """Crea un objeto de resumen compatible con OLS para Ridge."""
         from sklearn.metrics import r2_score, mean_squared_error
@@ -187,62 +1716,371 @@ class RegressionFitter:
         
         return RidgeSummary()
     
-    def _calculate_vif(self, X: np.ndarray, feature_names: list) -> Dict[str, float]:
-        """Calcula VIF para detectar multicolinealidad."""
-        vif_dict = {}
+    def _calculate_vif(self, X: Optional[np.ndarray], feature_names: list,
+                       include_controls: bool = False,
+                       cov: Optional[np.ndarray] = None) -> Dict[str, float]:
+        """
+        Calcula VIF para detectar multicolinealidad.
         
-        try:
-            # Sin la constante (primer valor)
-            X_features = X[:, 1:]
-            feature_names_clean = feature_names
-            
-            for i in range(X_features.shape[1]):
-                # Solo calcular para features, no para controles
-                if i < len(self.processor.feature_columns):
-                    try:
-                        vif_value = variance_inflation_factor(X_features, i)
-                        vif_dict[feature_names_clean[i]] = float(vif_value)
-                    except Exception as e:
-                        logger.exception(f"Error calculando VIF para {feature_names_clean[i]}")
-                        vif_dict[feature_names_clean[i]] = float('nan')
-        except Exception as e:
-            logger.exception(f"Error calculando VIF: {str(e)}")
+        Los VIF se obtienen de la diagonal de la inversa de la matriz de
+        correlación de las variables (sin la constante), en una sola
+        descomposición. Las variables en una colinealidad exacta (o
+        constantes) reciben `inf`; el número de condición queda en
+        `self.condition_number`. Acepta directamente la covarianza de las
+        variables en lugar de X (modo estadísticos suficientes).
+        """
+        if cov is None:
+            cov = np.cov(X[:, 1:], rowvar=False, bias=True)
+        vif, self.condition_number = _vif_from_covariance(cov)
         
-        return vif_dict
+        n_reported = len(feature_names) if include_controls else len(self.processor.feature_columns)
+        return {feature_names[i]: float(vif[i]) for i in range(n_reported)}
     
-    def _bootstrap_ci(self, X: np.ndarray, y: np.ndarray, n_samples: int = 1000) -> Dict[str, Tuple[float, float]]:
-        """Calcula intervalos de confianza usando bootstrap."""
+    def _confidence_intervals(self, X: np.ndarray, y: np.ndarray,
+                              progress: Optional[Callable[..., None]] = None) -> Dict[str, Tuple[float, float]]:
+        """IC al 95% de los coeficientes con el método `self.ci_method`."""
         n = len(y)
-        coef_samples = []
-        
-        np.random.seed(42)
-        for _ in range(n_samples):
-            # Muestreo con reemplazo
-            indices = np.random.choice(n, size=n, replace=True)
-            X_boot = X[indices]
-            y_boot = y[indices]
-            
-            try:
-                model_boot = sm.OLS(y_boot, X_boot).fit()
-                coef_samples.append(model_boot.params.values)
-            except:
-                continue
+        if self.ci_method == 'hac':
+            lags = _newey_west_lags(n) if self.hac_lags is None else int(self.hac_lags)
+            self.ci_params = {'lags': min(max(lags, 0), n - 1)}
+        elif self.ci_method == 'block':
+            self.ci_params = {'block_length': min(max(int(self.block_length or _default_block_length(n)), 1), n)}
+        else:
+            self.ci_params = {}
+        
+        self.bootstrap_draws = None
+        self._covariance = None
+        if self.ci_method in ANALYTIC_CI_METHODS:
+            self.bootstrap_replicates = 0
+            return self._sandwich_ci(X, y)
+        if self.bootstrap_samples <= 0:
+            return {}
+        return self._bootstrap_ci(X, y, self.bootstrap_samples, n_jobs=self.n_jobs, progress=progress,
+                                  tolerance=self.bootstrap_tolerance)
+    
+    def _linear_smoother(self, X: np.ndarray) -> np.ndarray:
+        """
+        Matriz M (k x n) tal que los coeficientes del ajuste (OLS o Ridge) son M y.
+        
+        Se obtiene con una sola factorización de Cholesky de Z'Z + P sobre el
+        diseño estandarizado (pseudo-inversa si es singular o de rango
+        incompleto, p. ej. con colinealidad exacta); la usan tanto los
+        intervalos sandwich como los bootstrap de residuos.
+        """
+        from scipy.linalg import cho_factor, cho_solve
+        
+        Z, shift, scale = _standardize_design(X)
+        gram = Z.T @ Z + _ridge_penalty(scale, self.alpha if self._is_ridge() else 0.0)
+        try:
+            if np.linalg.matrix_rank(gram, hermitian=True) < len(gram):
+                raise np.linalg.LinAlgError("Matriz de Gram singular")
+            smoother = cho_solve(cho_factor(gram), Z.T)
+        except np.linalg.LinAlgError:
+            smoother = np.linalg.pinv(gram, hermitian=True) @ Z.T
+        return _unstandardize_coefficients(smoother.T, shift, scale).T
+    
+    def _sandwich_ci(self, X: np.ndarray, y: np.ndarray) -> Dict[str, Tuple[float, float]]:
+        """
+        Intervalos analíticos con covarianza sandwich M Ω M' y cuantiles normales.
         
-        if len(coef_samples) == 0:
+        'hc' usa HC3 (residuos escalados por 1 - h_ii); 'hac' usa Newey-West
+        con núcleo de Bartlett y `ci_params['lags']` rezagos, sin corrección
+        de muestra finita (mismas convenciones que statsmodels).
+        
+        Los intervalos se centran en los coeficientes del modelo ajustado, no
+        en M y: con un diseño de rango incompleto ambas soluciones de mínimos
+        cuadrados pueden diferir.
+        """
+        from scipy import stats as st
+        
+        names = ['const'] + self.processor.get_feature_names()
+        M = self._linear_smoother(X)
+        coef = np.asarray(self.model.params, dtype=float)
+        residuals = y - X @ coef
+        if self.ci_method == 'hc':
+            leverage = np.einsum('ij,ji->i', X, M)
+            G = M * (residuals / np.maximum(1 - leverage, 1e-12))
+            cov = G @ G.T
+        else:
+            G = M * residuals
+            cov = G @ G.T
+            lags = self.ci_params['lags']
+            for lag in range(1, lags + 1):
+                cross = G[:, lag:] @ G[:, :-lag].T
+                cov += (1 - lag / (lags + 1)) * (cross + cross.T)
+        
+        se = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        z = st.norm.ppf(0.975)
+        return {name: (float(c - z * s), float(c + z * s)) for name, c, s in zip(names, coef, se)}
+    
+    def _bootstrap_ci(self, X: np.ndarray, y: np.ndarray, n_samples: int = 1000,
+                      n_jobs: Optional[int] = None,
+                      progress: Optional[Callable[..., None]] = None,
+                      tolerance: Optional[float] = None) -> Dict[str, Tuple[float, float]]:
+        """
+        Calcula intervalos de confianza usando bootstrap.
+        
+        Las réplicas se generan por bloques. Con `tolerance`, tras cada bloque
+        se comparan los extremos 2.5/97.5 con los del bloque anterior y se para
+        cuando ninguno se movió más de `tolerance` veces el ancho de su
+        intervalo. `progress` recibe además los intervalos parciales (`ci`) y
+        el mayor desplazamiento relativo (`max_shift`). Las réplicas usadas
+        quedan en `self.bootstrap_replicates`.
+        """
+        names = ['const'] + self.processor.get_feature_names()
+        track = progress is not None or tolerance is not None
+        samples = []
+        previous = None
+        done = 0
+        
+        if progress is not None:
+            progress(0, n_samples, stage='bootstrap')
+        batches = self._iter_bootstrap_batches(X, y, n_samples, n_jobs=n_jobs)
+        try:
+            for batch in batches:
+                done += len(batch)
+                valid = batch[np.isfinite(batch).all(axis=1)]
+                if len(valid):
+                    samples.append(valid)
+                if not track:
+                    continue
+                
+                info = {'stage': 'bootstrap'}
+                converged = False
+                if samples:
+                    bounds = np.percentile(np.vstack(samples), [2.5, 97.5], axis=0)
+                    if previous is not None:
+                        width = np.where(bounds[1] > bounds[0], bounds[1] - bounds[0], 1.0)
+                        shift = float((np.abs(bounds - previous) / width).max())
+                        info['max_shift'] = shift
+                        converged = tolerance is not None and shift <= tolerance
+                    previous = bounds
+                    info['ci'] = {name: [float(lo), float(hi)] for name, lo, hi in zip(names, *bounds)}
+                if progress is not None:
+                    progress(done, n_samples, **info)
+                if converged:
+                    break
+        finally:
+            batches.close()
+        
+        self.bootstrap_replicates = done
+        self.bootstrap_draws = np.vstack(samples) if samples else None
+        self._covariance = None
+        if done < n_samples:
+            logger.info(f"Bootstrap convergió con {done} de {n_samples} réplicas")
+        
+        if not samples:
             logger.warning("Bootstrap no pudo generar muestras válidas; devolviendo dict vacío")
             return {}
-
-        coef_samples = np.array(coef_samples)
+        
+        coef_samples = self.bootstrap_draws
         ci_dict = {}
         
-        for i, name in enumerate(['const'] + self.processor.get_feature_names()):
-            if i < len(coef_samples[0]):
+        for i, name in enumerate(names):
+            if i < coef_samples.shape[1]:
                 lower = np.percentile(coef_samples[:, i], 2.5)
                 upper = np.percentile(coef_samples[:, i], 97.5)
                 ci_dict[name] = (float(lower), float(upper))
         
         return ci_dict
     
+    def _iter_bootstrap_batches(self, X: np.ndarray, y: np.ndarray, n_samples: int,
+                                seed: int = 42, n_jobs: Optional[int] = None) -> Iterator[np.ndarray]:
+        """
+        Genera los coeficientes bootstrap bloque a bloque (a lo sumo 250 réplicas), en orden.
+        
+        Cada bloque sortea su matriz de índices de una sola vez (misma
+        secuencia que el muestreo réplica a réplica) y resuelve todos los
+        mínimos cuadrados con matrices de Gram apiladas. Si el ajuste fue
+        Ridge, se aplica la misma penalización.
+        
+        Con `n_jobs` los bloques se reparten en un pool de hilos. Cada bloque
+        recibe un hijo independiente de `SeedSequence(seed)`, por lo que el
+        resultado no depende del número de workers (pero difiere del modo
+        secuencial, que conserva la secuencia histórica de `RandomState`).
+        Si el consumidor deja de iterar, los bloques pendientes se cancelan.
+        
+        Con `ci_method` 'residual', 'wild' o 'block' se remuestrean residuos
+        (i.i.d., con signos de Rademacher o por bloques móviles) en vez de
+        filas: cada réplica es coef + M e* con la M de `_linear_smoother`,
+        así que basta un producto matricial por bloque.
+        
+        Las réplicas se centran en los coeficientes del modelo ajustado
+        (`self.model.params`). Si el diseño tiene rango incompleto, 'pairs'
+        resuelve cada réplica con pseudo-inversa y la desplaza por la
+        diferencia entre esos coeficientes y la solución con todas las filas.
+        """
+        n = len(y)
+        fitted_coef = np.asarray(self.model.params, dtype=float)
+        if self.ci_method in ('residual', 'wild', 'block'):
+            M = self._linear_smoother(X)
+            coef = fitted_coef
+            residuals = y - X @ coef
+            centered = residuals - residuals.mean()
+            chunk = max(1, min(_BOOTSTRAP_BLOCK_SIZE, _BOOTSTRAP_CHUNK_ELEMENTS // n))
+            if self.ci_method == 'residual':
+                high, width = n, n
+                errors = lambda draws: centered[draws]
+            elif self.ci_method == 'wild':
+                high, width = 2, n
+                errors = lambda draws: residuals * (2.0 * draws - 1.0)
+            else:
+                length = self.ci_params.get('block_length') or _default_block_length(n)
+                high, width = n - length + 1, -(-n // length)
+                offsets = np.arange(length)
+                errors = lambda draws: centered[(draws[:, :, None] + offsets).reshape(len(draws), -1)[:, :n]]
+            
+            def solve(draws: np.ndarray) -> np.ndarray:
+                return coef + errors(draws) @ M.T
+        else:
+            Z, shift, scale = _standardize_design(X)
+            penalty = _ridge_penalty(scale, self.alpha if self._is_ridge() else 0.0)
+            chunk = max(1, min(_BOOTSTRAP_BLOCK_SIZE, _BOOTSTRAP_CHUNK_ELEMENTS // (n * Z.shape[1])))
+            high, width = n, n
+            singular = np.linalg.matrix_rank(Z.T @ Z + penalty, hermitian=True) < Z.shape[1]
+            offset = 0.0
+            if singular:
+                full = _solve_weighted_batch(Z, y, np.ones((1, n)), penalty, singular=True)
+                offset = fitted_coef - _unstandardize_coefficients(full, shift, scale)[0]
+            
+            def solve(indices: np.ndarray) -> np.ndarray:
+                weights = _resample_counts(indices, n)
+                coef = _solve_weighted_batch(Z, y, weights, penalty, singular=singular)
+                return _unstandardize_coefficients(coef, shift, scale) + offset
+        
+        if n_jobs is None:
+            rng = np.random.RandomState(seed)
+            for start in range(0, n_samples, chunk):
+                yield solve(rng.choice(high, size=(min(chunk, n_samples - start), width), replace=True))
+            return
+        
+        sizes = [min(_BOOTSTRAP_BLOCK_SIZE, n_samples - start)
+                 for start in range(0, n_samples, _BOOTSTRAP_BLOCK_SIZE)]
+        children = np.random.SeedSequence(seed).spawn(len(sizes))
+        
+        def run_block(child: np.random.SeedSequence, size: int) -> np.ndarray:
+            rng = np.random.default_rng(child)
+            return np.vstack([
+                solve(rng.integers(0, high, size=(min(chunk, size - start), width)))
+                for start in range(0, size, chunk)
+            ])
+        
+        with ThreadPoolExecutor(max_workers=max(1, int(n_jobs))) as pool:
+            futures = [pool.submit(run_block, child, size) for child, size in zip(children, sizes)]
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+    
+    def coefficient_covariance(self) -> Dict[str, Any]:
+        """
+        Covarianza de los coeficientes ('cov') y su factor de Cholesky ('chol'),
+        varianza residual ('sigma2') y grados de libertad residuales
+        ('df_resid'), calculados una vez por modelo.
+        
+        Sale de X'X (`SufficientStats.coefficient_covariance`), por lo que
+        sirve igual para ajustes completos, en modo estadísticos, actualizados
+        con /append o restaurados desde caché. En Ridge, si hay réplicas
+        bootstrap vigentes, se usa su covarianza empírica ('source' indica cuál).
+        """
+        if self._covariance is not None and self._covariance[0] is self.model:
+            return self._covariance[1]
+        
+        stats = self.stats
+        if stats is None:
+            if self.processor.has_rows():
+                stats = SufficientStats.from_arrays(*self.processor.get_regression_data(self.transforms))
+            else:
+                stats = self.processor.get_sufficient_stats()
+        coef = np.asarray(self.model.params, dtype=float)
+        cov, sigma2 = stats.coefficient_covariance(coef, self.alpha if self._is_ridge() else 0.0)
+        source = 'analytic'
+        draws = self.bootstrap_draws
+        if self._is_ridge() and draws is not None and not self.bootstrap_stale and len(draws) > len(coef):
+            cov = np.cov(draws, rowvar=False)
+            source = 'bootstrap'
+        block = {'cov': cov, 'chol': _covariance_factor(cov), 'sigma2': sigma2,
+                 'df_resid': max(stats.n - len(coef), 1), 'source': source}
+        self._covariance = (self.model, block)
+        return block
+    
+    def diagnostics(self) -> Dict[str, Any]:
+        """
+        Diagnóstico de residuos, calculado una vez por modelo con NumPy.
+        
+        Incluye momentos de residuos y valores ajustados, asimetría y curtosis,
+        Durbin-Watson, Jarque-Bera (mismas fórmulas que statsmodels) y
+        cuantiles de los residuos estandarizados. En modo estadísticos
+        suficientes sólo hay medias y desviaciones (analíticas); el resto es None.
+        """
+        if self._diagnostics is not None and self._diagnostics[0] is self.model:
+            return self._diagnostics[1]
+        
+        if self.residuals is not None:
+            residuals = np.asarray(self.residuals, dtype=float)
+            fitted = np.asarray(self.fitted_values, dtype=float)
+            n = len(residuals)
+            mean = residuals.mean()
+            centered = residuals - mean
+            m2 = centered @ centered / n
+            std = np.sqrt(m2)
+            # Con varianza residual nula (ajuste perfecto) los momentos
+            # estandarizados no están definidos: se reportan como None.
+            skew = (centered ** 3).mean() / m2 ** 1.5 if m2 > 0 else None
+            kurtosis = (centered ** 4).mean() / m2 ** 2 if m2 > 0 else None
+            jb = n / 6 * (skew ** 2 + (kurtosis - 3) ** 2 / 4) if m2 > 0 else None
+            ss = residuals @ residuals
+            diff = np.diff(residuals)
+            quantile_levels = [1, 5, 25, 50, 75, 95, 99]
+            standardized = centered / std if std > 0 else centered
+            quantiles = np.percentile(standardized, quantile_levels)
+            
+            from scipy import stats as st
+            block = {
+                'residuals_mean': float(mean),
+                'residuals_std': float(std),
+                'fitted_mean': float(fitted.mean()),
+                'fitted_std': float(fitted.std()),
+                'residuals_skew': float(skew) if skew is not None else None,
+                'residuals_kurtosis': float(kurtosis) if kurtosis is not None else None,
+                'durbin_watson': float(diff @ diff / ss) if ss > 0 else None,
+                'jarque_bera': float(jb) if jb is not None else None,
+                'jarque_bera_pvalue': float(st.chi2.sf(jb, 2)) if jb is not None else None,
+                'standardized_residual_quantiles': {f"{q}%": float(v) for q, v in zip(quantile_levels, quantiles)},
+            }
+        else:
+            stats = self.processor.get_sufficient_stats()
+            coef = np.asarray(self.model.params, dtype=float)
+            fitted_mean = coef[0] + stats.means() @ coef[1:]
+            residuals_mean = stats.y_mean() - fitted_mean
+            residual_var = stats.residual_sum_squares(coef) / stats.n - residuals_mean ** 2
+            fitted_var = coef[1:] @ stats.covariance() @ coef[1:]
+            block = {
+                'residuals_mean': float(residuals_mean),
+                'residuals_std': float(np.sqrt(max(residual_var, 0.0))),
+                'fitted_mean': float(fitted_mean),
+                'fitted_std': float(np.sqrt(max(fitted_var, 0.0))),
+                'residuals_skew': None,
+                'residuals_kurtosis': None,
+                'durbin_watson': None,
+                'jarque_bera': None,
+                'jarque_bera_pvalue': None,
+                'standardized_residual_quantiles': None,
+            }
+        
+        self._diagnostics = (self.model, block)
+        return block
+    
+    def memory_usage(self) -> int:
+        """Bytes aproximados propios del modelo (sin contar el dataset)."""
+        arrays = [a for a in (self.fitted_values, self.residuals, self.bootstrap_draws) if a is not None]
+        return int(sum(np.asarray(a).nbytes for a in arrays))
+    
+    def _is_ridge(self) -> bool:
+        return bool(self.regularization and self.regularization.lower() == 'ridge')
+    
     def _get_results(self) -> Dict[str, Any]:
         """Retorna los resultados de la regresión."""
         feature_names = ['const'] + self.processor.get_feature_names()
@@ -260,81 +2098,507 @@ class RegressionFitter:
         coefficients = dict(zip(feature_names, params_values))
         p_values = dict(zip(feature_names, pvalues_values))
         
+        diagnostics = self.diagnostics()
         results = {
             'coefficients': coefficients,
             'p_values': p_values,
             'r_squared': float(self.model.rsquared),
             'adjusted_r_squared': float(self.model.rsquared_adj),
             'vif_values': self.vif_values,
-            'residuals': self.residuals.tolist(),
-            'fitted_values': self.fitted_values.tolist(),
+            'condition_number': self.condition_number,
+            'residuals': self.residuals.tolist() if self.residuals is not None else [],
+            'fitted_values': self.fitted_values.tolist() if self.fitted_values is not None else [],
+            'residuals_mean': diagnostics['residuals_mean'],
+            'residuals_std': diagnostics['residuals_std'],
+            'diagnostics': diagnostics,
             'aic': float(self.model.aic),
             'bic': float(self.model.bic),
             'f_statistic': float(self.model.fvalue),
             'f_pvalue': float(self.model.f_pvalue),
             'observations': int(self.model.nobs),
-            'bootstrap_ci': self.bootstrap_ci
+            'confidence_intervals': self.bootstrap_ci,
+            # Alias obsoleto de 'confidence_intervals' (también contiene IC analíticos)
+            'bootstrap_ci': self.bootstrap_ci,
+            'ci_method': self.ci_method,
+            'ci_params': self.ci_params,
+            'bootstrap_stale': self.bootstrap_stale,
+            'bootstrap_replicates': self.bootstrap_replicates,
+            'bootstrap_draws': self.bootstrap_draws.tolist() if self.bootstrap_draws is not None else None,
+            'sufficient_stats': self.stats.to_dict() if self.stats is not None else None,
+            'transforms': self.transforms
         }
         
         return results
 
 
+class _StatsSummary:
+    """Resumen compatible con OLS calculado desde estadísticos suficientes."""
+    
+    def __init__(self, stats: SufficientStats, coef: np.ndarray, feature_names: list, ridge: bool = False):
+        from scipy import stats as st
+        
+        names = ['const'] + feature_names
+        n = stats.n
+        k = len(coef)
+        rss = stats.residual_sum_squares(coef)
+        tss = stats.total_sum_squares()
+        
+        self.params = pd.Series(coef, index=names)
+        self.nobs = n
+        self.rsquared = 1 - rss / tss
+        self.rsquared_adj = 1 - (1 - self.rsquared) * (n - 1) / (n - k)
+        self.fvalue = (tss - rss) / (k - 1) / (rss / (n - k))
+        self.f_pvalue = float(st.f.sf(self.fvalue, k - 1, n - k))
+        self.fittedvalues = None
+        
+        if ridge:
+            # Mismas fórmulas que el resumen de Ridge con datos completos
+            self.pvalues = pd.Series([np.nan] * k, index=names)
+            self.bse = pd.Series([np.nan] * k, index=names)
+            self._cov = None
+            self.aic = n * np.log(rss / n) + 2 * k
+            self.bic = n * np.log(rss / n) + np.log(n) * k
+        else:
+            # Mismas fórmulas que statsmodels OLS
+            self._cov = rss / (n - k) * stats.inverse_gram()
+            self.bse = pd.Series(np.sqrt(np.diag(self._cov)), index=names)
+            tvalues = self.params / self.bse
+            self.pvalues = pd.Series(2 * st.t.sf(np.abs(tvalues), n - k), index=names)
+            llf = -n / 2 * (np.log(2 * np.pi) + np.log(rss / n) + 1)
+            self.aic = -2 * llf + 2 * k
+            self.bic = -2 * llf + np.log(n) * k
+    
+    def cov_params(self) -> pd.DataFrame:
+        return pd.DataFrame(self._cov, index=self.params.index, columns=self.params.index)
+
+
+class _ResultsSummary:
+    """Resumen compatible con OLS reconstruido desde un payload de resultados."""
+    
+    def __init__(self, results: Dict[str, Any]):
+        self.params = pd.Series(results['coefficients'], dtype=float)
+        self.pvalues = pd.Series(results['p_values'], dtype=float)
+        self.rsquared = results['r_squared']
+        self.rsquared_adj = results['adjusted_r_squared']
+        self.aic = results['aic']
+        self.bic = results['bic']
+        self.fvalue = results['f_statistic']
+        self.f_pvalue = results['f_pvalue']
+        self.nobs = results['observations']
+        self.fittedvalues = np.asarray(results['fitted_values'], dtype=float)
+
+
+def _greedy_allocation(gain: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                       budget: float) -> np.ndarray:
+    """
+    Solución exacta de max gain'x s.a. sum(x) = budget, lower <= x <= upper.
+    
+    Llena los canales por ganancia descendente (mochila fraccionaria) con un
+    argsort y una suma acumulada.
+    """
+    order = np.argsort(-gain, kind='stable')
+    capacity = (upper - lower)[order]
+    filled_before = np.concatenate(([0.0], np.cumsum(capacity)[:-1]))
+    extra = np.clip(budget - lower.sum() - filled_before, 0, capacity)
+    allocation = lower.copy()
+    allocation[order] += extra
+    return allocation
+
+
 class Simulator:
     """Simulador de escenarios de atribución marketing."""
     
+    # Iteraciones máximas de Frank-Wolfe cuando hay canales con saturación
+    OPTIMIZE_MAX_ITER = 200
+    
     def __init__(self, model_fitter: RegressionFitter):
         self.fitter = model_fitter
         self.processor = model_fitter.processor
-        self.model = model_fitter.model
+        self._baseline_cache = None
+        self._baseline_model = None
+        self._curves = None
+    
+    @property
+    def model(self):
+        # Siempre el modelo vigente del ajuste (puede cambiar con /append)
+        return self.fitter.model
+    
+    def _baseline(self) -> Dict[str, Any]:
+        """
+        Coeficientes, vector base (medias), gasto medio y mapa nombre -> índice.
+        
+        Para las columnas con saturación guarda además la serie tras adstock y
+        los parámetros de la Hill. Se calculan una vez por modelo y se
+        invalidan cuando el ajuste cambia (p. ej. tras /append).
+        """
+        model = self.model
+        if self._baseline_model is not model:
+            params_array = np.asarray(model.params, dtype=float)
+            transforms = self.fitter.transforms
+            names = self.processor.get_feature_names()
+            X_mean = self.processor.get_feature_means(transforms)
+            saturation = {}
+            for name, spec in transforms.items():
+                if spec['saturation']:
+                    column = self.processor.get_transformed_column(name, spec)
+                    saturation[names.index(name)] = (column['adstocked'], column['half_saturation'], spec['slope'])
+            self._baseline_cache = {
+                'params': params_array,
+                'x_mean': X_mean,
+                'spend': self.processor.get_feature_means() if transforms else X_mean,
+                'index': {name: i for i, name in enumerate(names)},
+                'saturation': saturation,
+                'prediction': float(params_array[0] + X_mean @ params_array[1:]),
+            }
+            self._baseline_model = model
+        return self._baseline_cache
+    
+    def _design_levels(self, idx: np.ndarray, multipliers: np.ndarray) -> np.ndarray:
+        """
+        Valor medio de las variables `idx` cuando su serie histórica se multiplica por `multipliers`.
+        
+        Sin transformación o sólo con adstock (lineal) el valor escala con el
+        multiplicador; con saturación Hill se promedia la curva sobre la serie
+        tras adstock. `multipliers` tiene forma (n_escenarios, len(idx)).
+        """
+        baseline = self._baseline()
+        levels = multipliers * baseline['x_mean'][idx]
+        for k, j in enumerate(idx):
+            curve = baseline['saturation'].get(j)
+            if curve is not None:
+                levels[:, k] = self._saturated_mean(curve, multipliers[:, k])
+        return levels
+    
+    def _scenario_intervals(self, pos: np.ndarray, change: np.ndarray, prediction: np.ndarray,
+                            level: float) -> Dict[str, Any]:
+        """
+        Intervalos de confianza (media) y de predicción (un periodo) de escenarios.
+        
+        Cada escenario es x = x0 + cambio en las columnas `pos` de la matriz con
+        constante; con el factor L de `coefficient_covariance`, x'Σx = ||x'L||²
+        y x'L = x0'L + cambio @ L[pos], es decir O(p²) por escenario sin
+        pasar por `get_prediction` de statsmodels.
+        """
+        from scipy import stats as st
+        
+        if not 0 < level < 1:
+            raise ValueError("level debe estar entre 0 y 1")
+        covariance = self.fitter.coefficient_covariance()
+        factor = covariance['chol']
+        x0 = np.concatenate(([1.0], self._baseline()['x_mean']))
+        base = x0 @ factor
+        mean_var = np.empty(len(change))
+        step = max(1, _SCENARIO_CHUNK_ELEMENTS // factor.shape[1])
+        for start in range(0, len(change), step):
+            projected = base + change[start:start + step] @ factor[pos]
+            mean_var[start:start + step] = np.einsum('ij,ij->i', projected, projected)
+        
+        q = st.t.ppf(0.5 + level / 2, covariance['df_resid'])
+        mean_se = np.sqrt(mean_var)
+        obs_se = np.sqrt(mean_var + covariance['sigma2'])
+        return {
+            'confidence_interval_lower': prediction - q * mean_se,
+            'confidence_interval_upper': prediction + q * mean_se,
+            'prediction_interval_lower': prediction - q * obs_se,
+            'prediction_interval_upper': prediction + q * obs_se,
+            'interval_level': level,
+            'interval_source': covariance['source'],
+        }
+    
+    def _design_slopes(self, idx: np.ndarray, multipliers: np.ndarray) -> np.ndarray:
+        """Derivada de `_design_levels` respecto al multiplicador (misma forma)."""
+        baseline = self._baseline()
+        slopes = np.broadcast_to(baseline['x_mean'][idx], multipliers.shape).copy()
+        for k, j in enumerate(idx):
+            curve = baseline['saturation'].get(j)
+            if curve is not None:
+                slopes[:, k] = self._saturated_mean(curve, multipliers[:, k], derivative=True)
+        return slopes
+    
+    @staticmethod
+    def _saturated_mean(curve: Tuple[np.ndarray, float, float], multipliers: np.ndarray,
+                        derivative: bool = False) -> np.ndarray:
+        """Media sobre la serie histórica de hill(m * adstock) (o de su derivada respecto a m)."""
+        adstocked, half_saturation, slope = curve
+        unique, inverse = np.unique(multipliers, return_inverse=True)
+        out = np.empty(len(unique))
+        step = max(1, _SCENARIO_CHUNK_ELEMENTS // max(len(adstocked), 1))
+        for start in range(0, len(unique), step):
+            z = np.outer(unique[start:start + step], adstocked)
+            if derivative:
+                values = _hill_derivative(z, half_saturation, slope) * adstocked
+            else:
+                values = hill_saturation(z, half_saturation, slope)
+            out[start:start + step] = values.mean(axis=1)
+        return out[inverse]
         
-    def simulate(self, percentage_changes: Dict[str, float]) -> Dict[str, Any]:
+    def simulate(self, percentage_changes: Dict[str, float], level: float = 0.95) -> Dict[str, Any]:
         """
         Simula cambios en las variables.
         
         Args:
             percentage_changes: Dict con cambios porcentuales. Ej: {'Channel_A': 10}
+            level: Nivel de los intervalos del escenario.
         
         Returns:
-            Dict con predicción base, de escenario y delta.
+            Dict con predicción base, de escenario, delta e intervalos del
+            escenario (`scenario_interval`).
         """
-        X, y = self.processor.get_regression_data()
-        feature_names = self.processor.get_feature_names()
-        
-        # Obtener coeficientes del modelo (compatible con Series y arrays)
-        params = self.model.params
-        if hasattr(params, 'values'):
-            params_array = params.values if isinstance(params.values, np.ndarray) else np.array(params.values)
-        else:
-            params_array = params if isinstance(params, np.ndarray) else np.array(params)
+        baseline = self._baseline()
+        params_array = baseline['params']
+        baseline_pred = baseline['prediction']
         
-        # Predicción base (media)
-        X_mean = X.mean(axis=0)
-        X_base = np.concatenate([[1], X_mean])  # Add constant
-        baseline_pred = params_array @ X_base
+        for feature in percentage_changes:
+            if feature not in baseline['index']:
+                raise ValueError(f"Feature no encontrada: {feature}")
+        changes_applied = dict(percentage_changes)
+        idx = np.array([baseline['index'][f] for f in percentage_changes], dtype=int)
+        multipliers = 1 + np.array(list(percentage_changes.values()), dtype=float) / 100
         
         # Crear escenario
-        X_scenario = X_mean.copy()
-        changes_applied = {}
-        
-        for feature, pct_change in percentage_changes.items():
-            if feature in feature_names:
-                idx = feature_names.index(feature)
-                change_amount = X_scenario[idx] * (pct_change / 100)
-                X_scenario[idx] += change_amount
-                changes_applied[feature] = pct_change
-            else:
-                raise ValueError(f"Feature no encontrada: {feature}")
+        X_scenario = baseline['x_mean'].copy()
+        X_scenario[idx] = self._design_levels(idx, multipliers[None, :])[0]
         
-        X_scenario_full = np.concatenate([[1], X_scenario])
-        scenario_pred = params_array @ X_scenario_full
+        scenario_pred = params_array[0] + X_scenario @ params_array[1:]
         
         delta = scenario_pred - baseline_pred
         delta_pct = (delta / baseline_pred * 100) if baseline_pred != 0 else 0
+        intervals = self._scenario_intervals(idx + 1, (X_scenario[idx] - baseline['x_mean'][idx])[None, :],
+                                             np.array([scenario_pred]), level)
         
         return {
             'baseline_prediction': float(baseline_pred),
             'scenario_prediction': float(scenario_pred),
             'delta': float(delta),
             'delta_percentage': float(delta_pct),
-            'changes_applied': changes_applied
+            'changes_applied': changes_applied,
+            'scenario_interval': {
+                'predicted_value': float(scenario_pred),
+                **{key: float(value[0]) for key, value in intervals.items() if key.endswith(('_lower', '_upper'))},
+            },
+            'interval_level': intervals['interval_level'],
+            'interval_source': intervals['interval_source'],
+        }
+    
+    def simulate_batch(self, features: list, changes, level: float = 0.95) -> Dict[str, Any]:
+        """
+        Simula muchos escenarios a la vez.
+        
+        Args:
+            features: Columnas de la matriz de cambios (nombres de variables).
+            changes: Matriz (n_escenarios, len(features)) de cambios porcentuales.
+            level: Nivel de los intervalos de cada escenario.
+        
+        Returns:
+            Dict con arrays columnares (una posición por escenario), incluidos
+            los intervalos de confianza y de predicción.
+        """
+        baseline = self._baseline()
+        missing = [f for f in features if f not in baseline['index']]
+        if missing:
+            raise ValueError(f"Features no encontradas: {missing}")
+        if len(set(features)) != len(features):
+            raise ValueError("Features duplicadas en la matriz de escenarios")
+        
+        changes = np.asarray(changes, dtype=float).reshape(-1, len(features))
+        if not np.all(np.isfinite(changes)):
+            raise ValueError("La matriz de escenarios contiene valores no finitos")
+        
+        idx = np.array([baseline['index'][f] for f in features], dtype=int)
+        change = self._design_levels(idx, 1 + changes / 100) - baseline['x_mean'][idx]
+        delta = change @ baseline['params'][1:][idx]
+        baseline_pred = baseline['prediction']
+        delta_pct = delta / baseline_pred * 100 if baseline_pred != 0 else np.zeros_like(delta)
+        intervals = self._scenario_intervals(idx + 1, change, baseline_pred + delta, level)
+        
+        return {
+            'baseline_prediction': baseline_pred,
+            'scenario_prediction': (baseline_pred + delta).tolist(),
+            'delta': delta.tolist(),
+            'delta_percentage': delta_pct.tolist(),
+            **{key: value.tolist() if isinstance(value, np.ndarray) else value
+               for key, value in intervals.items()},
+        }
+    
+    def response_curves(self, percentages=None, level: float = 0.95) -> Dict[str, Any]:
+        """
+        Curvas de respuesta de cada canal (`feature_columns`) sobre una rejilla de cambios porcentuales.
+        
+        Cada punto mueve un solo canal y deja el resto en su media. Todas las
+        curvas se evalúan en una pasada vectorizada (`_design_levels` con una
+        columna por canal). Las bandas usan la covarianza del modelo:
+        Var(x'b) = x0'S x0 + 2 d (S x0)_j + d² S_jj, con x0 el vector base y d
+        el cambio del canal j, de modo que cada punto cuesta O(1). El
+        resultado se guarda hasta que cambia el modelo (reajuste o /append).
+        
+        Args:
+            percentages: Rejilla de cambios (None = -100% a +100% cada 5%).
+            level: Nivel de confianza de las bandas.
+        
+        Returns:
+            Dict con la rejilla y, por canal, gasto, predicción, delta, ROI
+            marginal (d predicción / d gasto) y bandas de confianza y predicción.
+        """
+        from scipy import stats as st
+        
+        if percentages is None:
+            percentages = np.linspace(-100, 100, 41)
+        grid = np.asarray(percentages, dtype=float).ravel()
+        if len(grid) == 0 or not np.all(np.isfinite(grid)) or np.any(grid < -100):
+            raise ValueError("La rejilla debe tener cambios finitos >= -100%")
+        if not 0 < level < 1:
+            raise ValueError("level debe estar entre 0 y 1")
+        
+        # El bloque de covarianza se recrea al cambiar el modelo o las réplicas bootstrap
+        covariance = self.fitter.coefficient_covariance()
+        key = (grid.tobytes(), level)
+        if self._curves is not None and self._curves[0] is covariance and self._curves[1] == key:
+            return self._curves[2]
+        
+        baseline = self._baseline()
+        channels = list(self.processor.feature_columns)
+        idx = np.array([baseline['index'][c] for c in channels], dtype=int)
+        beta = baseline['params'][1:][idx]
+        multipliers = np.repeat(1 + grid[:, None] / 100, len(idx), axis=1)
+        
+        # (n_puntos, n_canales): una columna por curva
+        change = self._design_levels(idx, multipliers) - baseline['x_mean'][idx]
+        delta = change * beta
+        spend = baseline['spend'][idx]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            marginal_roi = self._design_slopes(idx, multipliers) * beta / spend
+        marginal_roi[:, spend == 0] = np.nan
+        
+        cov = covariance['cov']
+        x0 = np.concatenate(([1.0], baseline['x_mean']))
+        cov_x0 = cov @ x0
+        pos = idx + 1
+        mean_var = x0 @ cov_x0 + 2 * change * cov_x0[pos] + change ** 2 * np.diag(cov)[pos]
+        mean_se = np.sqrt(np.clip(mean_var, 0.0, None))
+        obs_se = np.sqrt(np.clip(mean_var, 0.0, None) + covariance['sigma2'])
+        q = st.t.ppf(0.5 + level / 2, covariance['df_resid'])
+        prediction = baseline['prediction'] + delta
+        
+        curves = {}
+        for k, channel in enumerate(channels):
+            curves[channel] = {
+                'spend': (spend[k] * multipliers[:, k]).tolist(),
+                'prediction': prediction[:, k].tolist(),
+                'delta': delta[:, k].tolist(),
+                'marginal_roi': marginal_roi[:, k].tolist(),
+                'confidence_lower': (prediction[:, k] - q * mean_se[:, k]).tolist(),
+                'confidence_upper': (prediction[:, k] + q * mean_se[:, k]).tolist(),
+                'prediction_lower': (prediction[:, k] - q * obs_se[:, k]).tolist(),
+                'prediction_upper': (prediction[:, k] + q * obs_se[:, k]).tolist(),
+            }
+        result = {
+            'percentages': grid.tolist(),
+            'level': level,
+            'interval_source': covariance['source'],
+            'baseline_prediction': baseline['prediction'],
+            'curves': curves,
+        }
+        self._curves = (covariance, key, result)
+        return result
+    
+    def optimize_budget(self, total_budget: Optional[float] = None,
+                        bounds: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None) -> Dict[str, Any]:
+        """
+        Reparte un presupuesto total entre los canales (features) para maximizar la predicción.
+        
+        Los controles quedan fijos en su media. Si la predicción es lineal en
+        el gasto (sin saturación) el problema es un LP y se resuelve de forma
+        exacta con `_greedy_allocation`. Con canales saturados (cóncavos) se
+        usa Frank-Wolfe: en cada iteración el mismo LP sobre el gradiente da la
+        dirección y una búsqueda vectorizada sobre la recta da el paso.
+        
+        Args:
+            total_budget: Gasto total por periodo (None = gasto medio actual).
+            bounds: Límites absolutos por canal {canal: (min, max)}; por defecto (0, sin límite).
+        
+        Returns:
+            Dict con la asignación óptima, la actual y la predicción de ambas.
+        """
+        baseline = self._baseline()
+        channels = list(self.processor.feature_columns)
+        idx = np.array([baseline['index'][c] for c in channels], dtype=int)
+        beta = baseline['params'][1:][idx]
+        current = baseline['spend'][idx]
+        
+        bounds = bounds or {}
+        unknown = set(bounds) - set(channels)
+        if unknown:
+            raise ValueError(f"Canales no encontrados: {unknown}")
+        lower = np.array([bounds.get(c, (None, None))[0] or 0.0 for c in channels], dtype=float)
+        upper = np.array([np.inf if bounds.get(c, (None, None))[1] is None else bounds[c][1]
+                          for c in channels], dtype=float)
+        if np.any(lower < 0):
+            raise ValueError("El gasto mínimo no puede ser negativo")
+        if np.any(upper < lower):
+            raise ValueError("Cada canal debe cumplir min <= max")
+        
+        budget = float(current.sum()) if total_budget is None else float(total_budget)
+        if not np.isfinite(budget) or budget < lower.sum() or budget > upper.sum():
+            raise ValueError(
+                f"Presupuesto fuera de rango: debe estar entre {lower.sum()} y {upper.sum()}"
+            )
+        
+        # Los canales transformados se evalúan escalando su serie histórica
+        transformed = np.array([c in self.fitter.transforms for c in channels], dtype=bool)
+        if np.any(transformed & (current <= 0)):
+            raise ValueError("No se puede escalar un canal transformado sin gasto histórico positivo")
+        scale = np.where(transformed, current, 1.0)
+        saturated = [k for k, j in enumerate(idx) if j in baseline['saturation']]
+        # Ganancia por unidad de gasto de los canales lineales
+        slope = beta * np.where(transformed, baseline['x_mean'][idx], 1.0) / scale
+        
+        def predict(allocations: np.ndarray) -> np.ndarray:
+            levels = np.where(transformed, 0.0, allocations)
+            if transformed.any():
+                t = np.flatnonzero(transformed)
+                levels[:, t] = self._design_levels(idx[t], allocations[:, t] / scale[t])
+            return baseline['prediction'] + (levels - baseline['x_mean'][idx]) @ beta
+        
+        def gradient(allocation: np.ndarray) -> np.ndarray:
+            gain = slope.copy()
+            for k in saturated:
+                curve = baseline['saturation'][idx[k]]
+                gain[k] = beta[k] * self._saturated_mean(curve, allocation[k:k + 1] / scale[k],
+                                                         derivative=True)[0] / scale[k]
+            return gain
+        
+        if not saturated:
+            solver = 'greedy'
+            allocation = _greedy_allocation(slope, lower, upper, budget)
+        else:
+            solver = 'frank-wolfe'
+            steps = np.concatenate(([0.0], np.geomspace(1e-6, 1.0, 64)))
+            allocation = _greedy_allocation(gradient(np.clip(current, lower, upper)), lower, upper, budget)
+            for _ in range(self.OPTIMIZE_MAX_ITER):
+                gain = gradient(allocation)
+                direction = _greedy_allocation(gain, lower, upper, budget) - allocation
+                values = predict(allocation + steps[:, None] * direction)
+                best = int(np.argmax(values))
+                if gain @ direction <= 1e-9 * max(1.0, abs(values[0])) or best == 0:
+                    break
+                allocation = allocation + steps[best] * direction
+        
+        optimized_pred = float(predict(allocation[None, :])[0])
+        baseline_pred = baseline['prediction']
+        delta = optimized_pred - baseline_pred
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct_change = np.where(current != 0, (allocation - current) / current * 100, np.nan)
+        
+        return {
+            'total_budget': budget,
+            'solver': solver,
+            'allocation': dict(zip(channels, allocation.tolist())),
+            'current_allocation': dict(zip(channels, current.tolist())),
+            'percentage_changes': dict(zip(channels, pct_change.tolist())),
+            'marginal_roi': dict(zip(channels, gradient(allocation).tolist())),
+            'baseline_prediction': baseline_pred,
+            'optimized_prediction': optimized_pred,
+            'delta': delta,
+            'delta_percentage': delta / baseline_pred * 100 if baseline_pred != 0 else 0.0,
         }
@@ -0,0 +1 @@
+"""Benchmarks de rendimiento de los caminos críticos (carga, ajuste, simulación)."""
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+"""
+Benchmark de /upload, /fit y /simulate sobre datos sintéticos.
+
+Mide cada etapa para una rejilla de tamaños (filas x canales): tiempo
+(mínimo y mediana de varias repeticiones) y memoria pico (tracemalloc, en
+una ejecución aparte para no distorsionar los tiempos). Los resultados se
+guardan como JSON y se pueden comparar con una ejecución anterior.
+
+Modos:
+    library: llama directamente a DataProcessor / RegressionFitter / Simulator.
+    api:     recorre los endpoints en proceso con el TestClient de FastAPI
+             (incluye validación, serialización JSON y caché de ajustes).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark --rows 1000 100000 --channels 5 20 --output bench.json
+    python -m benchmarks.benchmark --mode api --compare bench.json --threshold 1.25
+"""
+
+import argparse
+import io
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Etapas medidas en cada modo (en orden de ejecución)
+STAGES = ('upload', 'fit_ols', 'fit_ridge', 'vif', 'bootstrap', 'simulate', 'simulate_batch', 'simulate_curves')
+
+# Réplicas bootstrap y escenarios del batch por defecto
+BOOTSTRAP_SAMPLES = 200
+BATCH_SCENARIOS = 10_000
+
+
+def make_dataset(n_rows: int, n_channels: int, n_controls: int = 1, seasonality: float = 0.2,
+                 collinearity: float = 0.0, noise: float = 0.1, seed: int = 0) -> pd.DataFrame:
+    """
+    Dataset sintético diario con `n_channels` canales de gasto y `n_controls` controles.
+
+    Args:
+        seasonality: Amplitud de la estacionalidad anual y semanal, relativa
+            a la media del target (0 = sin estacionalidad).
+        collinearity: Peso (0-1) de un factor común en el gasto de todos los
+            canales; la correlación entre canales es aproximadamente este valor.
+        noise: Desviación del error relativa a la media del target.
+
+    Returns:
+        DataFrame con columnas Date, Channel_1..p, Control_1..c y Sales.
+    """
+    if not 0 <= collinearity < 1:
+        raise ValueError("collinearity debe estar en [0, 1)")
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_rows)
+    season = np.sin(2 * np.pi * t / 365.25) + 0.5 * np.sin(2 * np.pi * t / 7)
+
+    common = rng.standard_normal(n_rows)
+    own = rng.standard_normal((n_rows, n_channels))
+    latent = np.sqrt(collinearity) * common[:, None] + np.sqrt(1 - collinearity) * own
+    base_spend = rng.uniform(1_000, 5_000, n_channels)
+    spend = base_spend * np.exp(0.3 * latent + 0.2 * seasonality * season[:, None])
+
+    controls = rng.standard_normal((n_rows, n_controls))
+    beta = rng.uniform(0.05, 0.5, n_channels)
+    sales = 1_000 + spend @ beta + controls @ rng.uniform(-50, 50, n_controls)
+    sales += seasonality * sales.mean() * season
+    sales += noise * sales.mean() * rng.standard_normal(n_rows)
+
+    data = {'Date': pd.date_range('2000-01-01', periods=n_rows, freq='D')}
+    data.update({f'Channel_{j + 1}': spend[:, j] for j in range(n_channels)})
+    data.update({f'Control_{j + 1}': controls[:, j] for j in range(n_controls)})
+    data['Sales'] = sales
+    return pd.DataFrame(data)
+
+
+def measure(func: Callable[[], Any], repeat: int = 3, memory: bool = True) -> Dict[str, Any]:
+    """
+    Tiempo mínimo/mediano de `repeat` ejecuciones y memoria pico de una ejecución extra.
+
+    Antes se hace una ejecución sin medir para no contar imports perezosos ni cachés frías.
+    """
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    result = {'seconds_min': min(times), 'seconds_median': statistics.median(times), 'repeat': repeat}
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def _library_stages(data: pd.DataFrame, csv: bytes, channels: List[str], controls: List[str],
+                    bootstrap_samples: int, batch_scenarios: int) -> Dict[str, Callable[[], Any]]:
+    from backend.app.utils import DataProcessor, RegressionFitter, Simulator, read_mapped_file
+
+    numeric = ['Sales'] + channels + controls
+    processor = DataProcessor()
+    processor.load_data(data, 'Date', 'Sales', channels, control_cols=controls)
+    fitter = RegressionFitter(processor)
+    fitter.fit(bootstrap_samples=0, ci_method='hc')
+    simulator = Simulator(fitter)
+    X, _ = processor.get_regression_data()
+    design = np.column_stack([np.ones(len(X)), X])
+    changes = np.random.default_rng(0).uniform(-50, 50, (batch_scenarios, len(channels)))
+
+    def upload():
+        df, _ = read_mapped_file(io.BytesIO(csv), 'Date', numeric)
+        DataProcessor().load_data(df, 'Date', 'Sales', channels, control_cols=controls)
+
+    def fit_ols():
+        RegressionFitter(processor).fit(bootstrap_samples=0, ci_method='hc')
+
+    def fit_ridge():
+        RegressionFitter(processor).fit(regularization='ridge', alpha=1.0, bootstrap_samples=0, ci_method='hc')
+
+    def vif():
+        fitter._calculate_vif(design, processor.get_feature_names(), include_controls=True)
+
+    def bootstrap():
+        RegressionFitter(processor).fit(bootstrap_samples=bootstrap_samples, ci_method='pairs')
+
+    def simulate():
+        simulator.simulate({channels[0]: 10})
+
+    def simulate_batch():
+        simulator.simulate_batch(channels, changes)
+
+    def simulate_curves():
+        # Sin caché: se mide el cálculo, no la consulta
+        simulator._curves = None
+        simulator.response_curves()
+
+    return {name: func for name, func in locals().items() if name in STAGES}
+
+
+def _api_stages(csv: bytes, channels: List[str], controls: List[str],
+                bootstrap_samples: int, batch_scenarios: int) -> Dict[str, Callable[[], Any]]:
+    from fastapi.testclient import TestClient
+    from backend.app.main import app
+
+    # Una línea de log por request ensuciaría la salida del benchmark
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    client = TestClient(app)
+    form = {'date_column': 'Date', 'target_column': 'Sales',
+            'feature_columns': ','.join(channels), 'control_columns': ','.join(controls)}
+
+    def post(path: str, **kwargs) -> Dict[str, Any]:
+        response = client.post(path, **kwargs)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} respondió {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    dataset_id = post('/upload', files={'file': ('data.csv', csv, 'text/csv')}, data=form)['dataset_id']
+    fit_payload = {'dataset_id': dataset_id, 'bootstrap_samples': 0, 'ci_method': 'hc'}
+    model_id = post('/fit', json=fit_payload)['model_id']
+    changes = np.random.default_rng(0).uniform(-50, 50, (batch_scenarios, len(channels))).tolist()
+
+    def fresh_fit(**params):
+        # La caché de /fit serviría las repeticiones sin reajustar
+        app.state.fit_cache.clear()
+        return post('/fit', json={**fit_payload, **params})
+
+    def upload():
+        post('/upload', files={'file': ('data.csv', csv, 'text/csv')}, data=form)
+
+    def fit_ols():
+        fresh_fit()
+
+    def fit_ridge():
+        fresh_fit(regularization='ridge', alpha=1.0)
+
+    def vif():
+        fresh_fit(vif_include_controls=True)
+
+    def bootstrap():
+        fresh_fit(bootstrap_samples=bootstrap_samples, ci_method='pairs')
+
+    def simulate():
+        post('/simulate', json={'model_id': model_id, 'changes': {channels[0]: 10}})
+
+    def simulate_batch():
+        post('/simulate/batch', json={'model_id': model_id, 'features': channels, 'changes': changes})
+
+    def simulate_curves():
+        post('/simulate/curves', json={'model_id': model_id})
+
+    return {name: func for name, func in locals().items() if name in STAGES}
+
+
+def run_benchmarks(rows: List[int], channels: List[int], mode: str = 'library', repeat: int = 3,
+                   stages: Optional[List[str]] = None, n_controls: int = 1, seasonality: float = 0.2,
+                   collinearity: float = 0.0, bootstrap_samples: int = BOOTSTRAP_SAMPLES,
+                   batch_scenarios: int = BATCH_SCENARIOS, memory: bool = True, seed: int = 0,
+                   log: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    Ejecuta las etapas para cada combinación de filas y canales.
+
+    Returns:
+        Dict con `meta` (entorno y parámetros) y `results` (una entrada por
+        etapa y tamaño, con tiempos en segundos y memoria pico en bytes).
+    """
+    if mode not in ('library', 'api'):
+        raise ValueError("mode debe ser 'library' o 'api'")
+    stages = list(stages or STAGES)
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Etapas desconocidas: {sorted(unknown)}")
+
+    results = []
+    for n_rows in rows:
+        for n_channels in channels:
+            data = make_dataset(n_rows, n_channels, n_controls, seasonality, collinearity, seed=seed)
+            csv = data.to_csv(index=False).encode('utf-8')
+            channel_cols = [c for c in data.columns if c.startswith('Channel_')]
+            control_cols = [c for c in data.columns if c.startswith('Control_')]
+            if mode == 'library':
+                funcs = _library_stages(data, csv, channel_cols, control_cols, bootstrap_samples, batch_scenarios)
+            else:
+                funcs = _api_stages(csv, channel_cols, control_cols, bootstrap_samples, batch_scenarios)
+
+            for stage in stages:
+                entry = {'stage': stage, 'n_rows': n_rows, 'n_channels': n_channels,
+                         **measure(funcs[stage], repeat, memory)}
+                results.append(entry)
+                if log is not None:
+                    peak = f", pico {entry['peak_bytes'] / 2 ** 20:.1f} MiB" if memory else ""
+                    log(f"{stage:16s} n={n_rows:>9,} p={n_channels:>3}: "
+                        f"{entry['seconds_median'] * 1000:10.2f} ms{peak}")
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'mode': mode,
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'params': {'repeat': repeat, 'n_controls': n_controls, 'seasonality': seasonality,
+                       'collinearity': collinearity, 'bootstrap_samples': bootstrap_samples,
+                       'batch_scenarios': batch_scenarios, 'seed': seed},
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 1.25) -> List[Dict[str, Any]]:
+    """
+    Etapas cuya mediana empeoró más que `threshold` veces respecto a `baseline`.
+
+    Se comparan sólo las entradas con la misma etapa y tamaño en ambos archivos.
+    """
+    if current['meta']['mode'] != baseline['meta']['mode']:
+        raise ValueError("Sólo se pueden comparar ejecuciones del mismo modo (library/api)")
+    reference = {(r['stage'], r['n_rows'], r['n_channels']): r for r in baseline['results']}
+    regressions = []
+    for entry in current['results']:
+        previous = reference.get((entry['stage'], entry['n_rows'], entry['n_channels']))
+        if previous is None or previous['seconds_median'] <= 0:
+            continue
+        ratio = entry['seconds_median'] / previous['seconds_median']
+        if ratio > threshold:
+            regressions.append({'stage': entry['stage'], 'n_rows': entry['n_rows'],
+                                'n_channels': entry['n_channels'], 'ratio': ratio,
+                                'seconds_median': entry['seconds_median'],
+                                'baseline_seconds_median': previous['seconds_median']})
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--channels', type=int, nargs='+', default=[5, 20])
+    parser.add_argument('--controls', type=int, default=1)
+    parser.add_argument('--seasonality', type=float, default=0.2)
+    parser.add_argument('--collinearity', type=float, default=0.0)
+    parser.add_argument('--mode', choices=['library', 'api'], default='library')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--bootstrap-samples', type=int, default=BOOTSTRAP_SAMPLES)
+    parser.add_argument('--batch-scenarios', type=int, default=BATCH_SCENARIOS)
+    parser.add_argument('--no-memory', action='store_true', help="No medir memoria pico (más rápido)")
+    parser.add_argument('--output', help="Archivo JSON donde guardar los resultados")
+    parser.add_argument('--compare', help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Factor de empeoramiento de la mediana que cuenta como regresión")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.rows, args.channels, mode=args.mode, repeat=args.repeat, stages=args.stages,
+        n_controls=args.controls, seasonality=args.seasonality, collinearity=args.collinearity,
+        bootstrap_samples=args.bootstrap_samples, batch_scenarios=args.batch_scenarios,
+        memory=not args.no_memory, log=print,
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as fh:
+            regressions = compare(report, json.load(fh), args.threshold)
+        for r in regressions:
+            print(f"REGRESIÓN {r['stage']} n={r['n_rows']} p={r['n_channels']}: "
+                  f"{r['ratio']:.2f}x ({r['baseline_seconds_median'] * 1000:.2f} -> "
+                  f"{r['seconds_median'] * 1000:.2f} ms)")
+        if regressions:
+            return 1
+        print("Sin regresiones")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
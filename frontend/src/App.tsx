@@ -19,21 +19,7 @@ import DataUpload from './components/DataUpload'
 import ModelFit from './components/ModelFit'
 import RegressionResults from './components/RegressionResults'
 import ScenarioSimulator from './components/ScenarioSimulator'
-
-interface RegressionData {
-  coefficients: Record<string, number>
-  p_values: Record<string, number>
-  r_squared: number
-  adjusted_r_squared: number
-  vif_values: Record<string, number> | null
-  observations: number
-  fitted_values: number[]
-  residuals: number[]
-  aic: number
-  bic: number
-  f_statistic: number
-  f_pvalue: number
-}
+import type { RegressionData } from './api/client'
 
 interface TabPanelProps {
   children?: React.ReactNode
@@ -6,6 +6,60 @@ const api = axios.create({
   baseURL: API_BASE_URL,
 })
 
+// Diagnóstico de residuos de /fit y /metrics (null si no está definido,
+// p. ej. en modo estadísticos suficientes o sin varianza residual)
+export interface ResidualDiagnostics {
+  residuals_mean: number
+  residuals_std: number
+  fitted_mean: number
+  fitted_std: number
+  residuals_skew: number | null
+  residuals_kurtosis: number | null
+  durbin_watson: number | null
+  jarque_bera: number | null
+  jarque_bera_pvalue: number | null
+  standardized_residual_quantiles: Record<string, number> | null
+}
+
+// Respuesta de /fit. Los VIF infinitos (colinealidad exacta o variable
+// constante) y un número de condición infinito llegan como null.
+export interface RegressionData {
+  status: string
+  message: string
+  model_id: string
+  dataset_id: string
+  cached: boolean
+  coefficients: Record<string, number>
+  p_values: Record<string, number>
+  r_squared: number
+  adjusted_r_squared: number
+  vif_values: Record<string, number | null> | null
+  high_vif_alert: Record<string, number | null> | null
+  condition_number: number | null
+  observations: number
+  fitted_values: number[]
+  residuals: number[]
+  aic: number
+  bic: number
+  f_statistic: number
+  f_pvalue: number
+  residuals_mean: number
+  residuals_std: number
+  diagnostics: ResidualDiagnostics
+  confidence_intervals: Record<string, [number, number]>
+  /** @deprecated usar confidence_intervals */
+  bootstrap_ci: Record<string, [number, number]>
+  bootstrap_stale: boolean
+  bootstrap_replicates: number
+  ci_method: string
+  ci_params: Record<string, number>
+  transforms: Record<string, Record<string, unknown>> | null
+}
+
+// Handles de la sesión actual (retornados por /upload y /fit)
+let currentDatasetId: string | undefined
+let currentModelId: string | undefined
+
 export const uploadData = async (
   file: File,
   dateColumn: string,
@@ -22,37 +76,53 @@ export const uploadData = async (
     formData.append('control_columns', controlColumns.join(','))
   }
 
-  return api.post('/upload', formData, {
+  const response = await api.post('/upload', formData, {
     headers: {
       'Content-Type': 'multipart/form-data',
     },
   })
+  currentDatasetId = response.data.dataset_id
+  currentModelId = undefined
+  return response
 }
 
 export const fitModel = async (
   regularization?: string,
   alpha?: number,
-  bootstrapSamples?: number
+  bootstrapSamples?: number,
+  ciMethod?: string
 ) => {
-  return api.post('/fit', {
+  const response = await api.post<RegressionData>('/fit', {
+    dataset_id: currentDatasetId,
     regularization,
     alpha,
     bootstrap_samples: bootstrapSamples,
+    ci_method: ciMethod,
   })
+  currentModelId = response.data.model_id
+  return response
 }
 
 export const simulateScenario = async (changes: Record<string, number>) => {
   return api.post('/simulate', {
+    model_id: currentModelId,
     changes,
   })
 }
 
+export const simulateCurves = async (percentages?: number[]) => {
+  return api.post('/simulate/curves', {
+    model_id: currentModelId,
+    percentages,
+  })
+}
+
 export const getStatus = async () => {
-  return api.get('/status')
+  return api.get('/status', { params: { dataset_id: currentDatasetId } })
 }
 
 export const getMetrics = async () => {
-  return api.get('/metrics')
+  return api.post('/metrics', null, { params: { model_id: currentModelId } })
 }
 
 export default api
@@ -35,7 +35,7 @@ export default function DataUpload({ onSuccess }: DataUploadProps) {
   const [featureColumns, setFeatureColumns] = useState('')
   const [controlColumns, setControlColumns] = useState('')
   const [loading, setLoading] = useState(false)
-  const MAX_UPLOAD_BYTES = 5_000_000
+  const MAX_UPLOAD_BYTES = 500_000_000
 
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     if (e.target.files) {
@@ -43,7 +43,7 @@ export default function DataUpload({ onSuccess }: DataUploadProps) {
 
       if (f && f.size > MAX_UPLOAD_BYTES) {
         showErrorWithTips({
-          response: { data: { detail: 'Archivo demasiado grande. Tamaño máximo: 5 MB' } },
+          response: { data: { detail: 'Archivo demasiado grande. Tamaño máximo: 500 MB' } },
         })
         e.currentTarget.value = ''
         setFile(null)
@@ -59,7 +59,7 @@ export default function DataUpload({ onSuccess }: DataUploadProps) {
 
     if (!file) {
       showErrorWithTips({
-        response: { data: { detail: 'Por favor selecciona un archivo CSV' } },
+        response: { data: { detail: 'Por favor selecciona un archivo de datos' } },
       })
       return
     }
@@ -113,10 +113,10 @@ export default function DataUpload({ onSuccess }: DataUploadProps) {
   return (
     <Box sx={{ maxWidth: 700, mx: 'auto' }}>
       <Typography variant="h2" sx={{ mb: 1, fontWeight: 700 }}>
-        Cargar Datos CSV
+        Cargar Datos
       </Typography>
       <Typography variant="body1" color="textSecondary" sx={{ mb: 3 }}>
-        Sube un archivo CSV con datos de marketing (mínimo 10 observaciones)
+        Sube un archivo CSV, Parquet o Arrow/Feather con datos de marketing (mínimo 10 observaciones)
       </Typography>
 
       <form onSubmit={handleSubmit}>
@@ -138,16 +138,16 @@ export default function DataUpload({ onSuccess }: DataUploadProps) {
                 },
               }}
             >
-              Seleccionar Archivo CSV
+              Seleccionar Archivo
               <input
                 type="file"
                 hidden
-                accept=".csv"
+                accept=".csv,.parquet,.feather,.arrow"
                 onChange={handleFileChange}
               />
             </Button>
             <Typography variant="caption" color="textSecondary" sx={{ mt: 1, display: 'block' }}>
-              Tamaño máximo: 5 MB. Solo archivos .csv
+              Tamaño máximo: 500 MB. Formatos: .csv, .parquet, .feather o .arrow
             </Typography>
             {file && (
               <Chip
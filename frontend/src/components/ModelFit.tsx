@@ -16,20 +16,24 @@ import {
   AlertTitle,
   Card,
   CardContent,
+  MenuItem,
 } from '@mui/material'
 import SettingsIcon from '@mui/icons-material/Settings'
 import InfoIcon from '@mui/icons-material/Info'
 import { fitModel } from '../api/client'
+import type { RegressionData } from '../api/client'
 import { showErrorWithTips } from '../utils/errorHandler'
 
 interface ModelFitProps {
-  onSuccess: (results: any) => void
+  onSuccess: (results: RegressionData) => void
 }
 
 export default function ModelFit({ onSuccess }: ModelFitProps) {
   const [regularization, setRegularization] = useState<string>('none')
   const [alpha, setAlpha] = useState(1.0)
   const [bootstrapSamples, setBootstrapSamples] = useState(1000)
+  const [ciMethod, setCiMethod] = useState('hac')
+  const analyticCi = ciMethod === 'hac' || ciMethod === 'hc'
   const [loading, setLoading] = useState(false)
   const MAX_BOOTSTRAP = 5000
 
@@ -37,7 +41,7 @@ export default function ModelFit({ onSuccess }: ModelFitProps) {
     e.preventDefault()
     setLoading(true)
 
-    if (bootstrapSamples > MAX_BOOTSTRAP) {
+    if (!analyticCi && bootstrapSamples > MAX_BOOTSTRAP) {
       showErrorWithTips({
         response: {
           data: {
@@ -53,7 +57,8 @@ export default function ModelFit({ onSuccess }: ModelFitProps) {
       const response = await fitModel(
         regularization === 'none' ? undefined : regularization,
         alpha,
-        bootstrapSamples
+        bootstrapSamples,
+        ciMethod
       )
 
       onSuccess(response.data)
@@ -163,8 +168,36 @@ export default function ModelFit({ onSuccess }: ModelFitProps) {
             </Box>
           </Box>
 
-          {/* Bootstrap Samples */}
+          {/* Confidence Interval Method */}
           <Box>
+            <Typography variant="h6" sx={{ fontWeight: 600, mb: 2 }}>
+              Intervalos de Confianza
+            </Typography>
+            <TextField
+              select
+              value={ciMethod}
+              onChange={(e) => setCiMethod(e.target.value)}
+              fullWidth
+              variant="outlined"
+              helperText="HAC/HC son instantáneos; los métodos bootstrap usan las muestras de abajo"
+            >
+              <MenuItem value="hac">HAC Newey-West (analítico, recomendado)</MenuItem>
+              <MenuItem value="hc">HC3 robusto (analítico)</MenuItem>
+              <MenuItem value="pairs">Bootstrap de pares</MenuItem>
+              <MenuItem value="residual">Bootstrap de residuos</MenuItem>
+              <MenuItem value="wild">Wild bootstrap</MenuItem>
+              <MenuItem value="block">Bootstrap por bloques móviles</MenuItem>
+            </TextField>
+          </Box>
+
+          {/* Bootstrap Samples */}
+          <Box
+            sx={{
+              opacity: analyticCi ? 0.5 : 1,
+              pointerEvents: analyticCi ? 'none' : 'auto',
+              transition: 'opacity 0.3s',
+            }}
+          >
             <Typography variant="h6" sx={{ fontWeight: 600, mb: 2 }}>
               Muestras Bootstrap para Intervalos de Confianza
             </Typography>
@@ -28,21 +28,7 @@ import {
 } from '@mui/material'
 import AssessmentIcon from '@mui/icons-material/Assessment'
 import WarningIcon from '@mui/icons-material/Warning'
-
-interface RegressionData {
-  coefficients: Record<string, number>
-  p_values: Record<string, number>
-  r_squared: number
-  adjusted_r_squared: number
-  vif_values: Record<string, number> | null
-  observations: number
-  fitted_values: number[]
-  residuals: number[]
-  aic: number
-  bic: number
-  f_statistic: number
-  f_pvalue: number
-}
+import type { RegressionData } from '../api/client'
 
 interface RegressionResultsProps {
   data: RegressionData
@@ -65,15 +51,16 @@ export default function RegressionResults({ data }: RegressionResultsProps) {
       pvalue: parseFloat((data.p_values[name] || 0).toFixed(4)),
     }))
 
-  // Preparar datos para gráfico de VIF
+  // Preparar datos para gráfico de VIF (null = VIF infinito, sin barra)
   const vifData = data.vif_values
     ? Object.entries(data.vif_values).map(([name, value]) => ({
         name,
-        vif: parseFloat(value.toFixed(2)),
+        vif: value !== null && Number.isFinite(value) ? parseFloat(value.toFixed(2)) : null,
       }))
     : []
 
-  const significantVif = vifData.filter((v) => v.vif > 10)
+  const perfectCollinearity = vifData.filter((v) => v.vif === null)
+  const significantVif = vifData.filter((v) => v.vif === null || v.vif > 10)
   const residualMean = data.residuals.reduce((a, b) => a + b, 0) / data.residuals.length
   const residualStd = Math.sqrt(
     data.residuals.reduce((a, b) => a + b ** 2, 0) / data.residuals.length
@@ -277,6 +264,13 @@ export default function RegressionResults({ data }: RegressionResultsProps) {
               <AlertTitle>⚠️ Multicolinealidad Detectada</AlertTitle>
               Se detectó multicolinealidad en: <strong>{significantVif.map((v) => v.name).join(', ')}</strong>
               <br />
+              {perfectCollinearity.length > 0 && (
+                <>
+                  Colinealidad exacta (VIF = ∞) en:{' '}
+                  <strong>{perfectCollinearity.map((v) => v.name).join(', ')}</strong>
+                  <br />
+                </>
+              )}
               Considera usar Ridge Regression o eliminar variables altamente correlacionadas.
             </Alert>
           )}
@@ -1,5 +1,15 @@
 import { useState } from 'react'
 import toast from 'react-hot-toast'
+import {
+  LineChart,
+  Line,
+  XAxis,
+  YAxis,
+  CartesianGrid,
+  Tooltip,
+  Legend,
+  ResponsiveContainer,
+} from 'recharts'
 import {
   Box,
   Button,
@@ -26,7 +36,8 @@ import TrendingUpIcon from '@mui/icons-material/TrendingUp'
 import TrendingDownIcon from '@mui/icons-material/TrendingDown'
 import RestartAltIcon from '@mui/icons-material/RestartAlt'
 import LightbulbIcon from '@mui/icons-material/Lightbulb'
-import { simulateScenario } from '../api/client'
+import ShowChartIcon from '@mui/icons-material/ShowChart'
+import { simulateScenario, simulateCurves } from '../api/client'
 import { showErrorWithTips } from '../utils/errorHandler'
 
 interface ScenarioSimulatorProps {
@@ -39,6 +50,25 @@ interface SimulationResult {
   delta: number
   delta_percentage: number
   changes_applied: Record<string, number>
+  scenario_interval?: {
+    predicted_value: number
+    prediction_interval_lower: number
+    prediction_interval_upper: number
+  }
+}
+
+interface ResponseCurve {
+  prediction: number[]
+  confidence_lower: number[]
+  confidence_upper: number[]
+  prediction_lower: number[]
+  prediction_upper: number[]
+}
+
+interface CurvesResult {
+  percentages: number[]
+  level: number
+  curves: Record<string, ResponseCurve>
 }
 
 export default function ScenarioSimulator({ features }: ScenarioSimulatorProps) {
@@ -47,6 +77,8 @@ export default function ScenarioSimulator({ features }: ScenarioSimulatorProps)
   const [changes, setChanges] = useState<Record<string, number>>({})
   const [result, setResult] = useState<SimulationResult | null>(null)
   const [loading, setLoading] = useState(false)
+  const [curves, setCurves] = useState<CurvesResult | null>(null)
+  const [curvesLoading, setCurvesLoading] = useState(false)
 
   const handleChangeInput = (feature: string, value: string) => {
     const numValue = value === '' ? 0 : parseFloat(value)
@@ -88,6 +120,29 @@ export default function ScenarioSimulator({ features }: ScenarioSimulatorProps)
     }
   }
 
+  const handleCurves = async () => {
+    setCurvesLoading(true)
+
+    try {
+      const response = await simulateCurves()
+      setCurves(response.data)
+    } catch (error: any) {
+      showErrorWithTips(error)
+    } finally {
+      setCurvesLoading(false)
+    }
+  }
+
+  const curveData = (curve: ResponseCurve) =>
+    curves!.percentages.map((pct, i) => ({
+      cambio: pct,
+      prediccion: curve.prediction[i],
+      ic_inferior: curve.confidence_lower[i],
+      ic_superior: curve.confidence_upper[i],
+      ip_inferior: curve.prediction_lower[i],
+      ip_superior: curve.prediction_upper[i],
+    }))
+
   const hasActiveChanges = Object.values(changes).some((v) => v !== 0)
 
   return (
@@ -180,6 +235,17 @@ export default function ScenarioSimulator({ features }: ScenarioSimulatorProps)
                 Restablecer
               </Button>
             </Stack>
+
+            <Button
+              variant="text"
+              onClick={handleCurves}
+              disabled={curvesLoading}
+              fullWidth
+              sx={{ mt: 2 }}
+              startIcon={curvesLoading ? <CircularProgress size={20} /> : <ShowChartIcon />}
+            >
+              {curvesLoading ? 'Calculando curvas...' : 'Ver Curvas de Respuesta'}
+            </Button>
           </Paper>
         </Grid>
 
@@ -223,6 +289,12 @@ export default function ScenarioSimulator({ features }: ScenarioSimulatorProps)
                       <Typography variant="caption" color="textSecondary">
                         Con cambios aplicados
                       </Typography>
+                      {result.scenario_interval && (
+                        <Typography variant="caption" color="textSecondary" sx={{ display: 'block' }}>
+                          IP 95%: [{result.scenario_interval.prediction_interval_lower.toFixed(2)},{' '}
+                          {result.scenario_interval.prediction_interval_upper.toFixed(2)}]
+                        </Typography>
+                      )}
                     </CardContent>
                   </Card>
                 </Grid>
@@ -361,6 +433,44 @@ export default function ScenarioSimulator({ features }: ScenarioSimulatorProps)
           </Grid>
         )}
 
+        {/* Curvas de respuesta por canal */}
+        {curves && (
+          <Grid item xs={12}>
+            <Paper sx={{ p: 3 }}>
+              <Typography variant="h3" sx={{ fontWeight: 600, mb: 1 }}>
+                Curvas de Respuesta
+              </Typography>
+              <Typography variant="body2" color="textSecondary" sx={{ mb: 3 }}>
+                Predicción al variar cada canal por separado, con bandas de confianza y predicción al{' '}
+                {(curves.level * 100).toFixed(0)}%
+              </Typography>
+              <Grid container spacing={3}>
+                {Object.entries(curves.curves).map(([channel, curve]) => (
+                  <Grid item xs={12} md={6} key={channel}>
+                    <Typography variant="subtitle1" sx={{ fontWeight: 600, mb: 1 }}>
+                      {channel}
+                    </Typography>
+                    <ResponsiveContainer width="100%" height={280}>
+                      <LineChart data={curveData(curve)}>
+                        <CartesianGrid strokeDasharray="3 3" stroke="#e0e0e0" />
+                        <XAxis dataKey="cambio" unit="%" />
+                        <YAxis domain={['auto', 'auto']} />
+                        <Tooltip formatter={(value) => Number(value).toFixed(2)} />
+                        <Legend />
+                        <Line type="monotone" dataKey="prediccion" stroke="#667eea" strokeWidth={2} dot={false} />
+                        <Line type="monotone" dataKey="ic_inferior" stroke="#4caf50" strokeDasharray="4 4" dot={false} />
+                        <Line type="monotone" dataKey="ic_superior" stroke="#4caf50" strokeDasharray="4 4" dot={false} />
+                        <Line type="monotone" dataKey="ip_inferior" stroke="#bdbdbd" strokeDasharray="2 2" dot={false} />
+                        <Line type="monotone" dataKey="ip_superior" stroke="#bdbdbd" strokeDasharray="2 2" dot={false} />
+                      </LineChart>
+                    </ResponsiveContainer>
+                  </Grid>
+                ))}
+              </Grid>
+            </Paper>
+          </Grid>
+        )}
+
         {/* Empty state */}
         {!result && hasActiveChanges && (
           <Grid item xs={12} md={7}>
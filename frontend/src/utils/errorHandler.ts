@@ -9,16 +9,16 @@ interface ErrorTip {
 const ERROR_TIPS: Record<string, ErrorTip> = {
   'file_required': {
     title: 'Archivo requerido',
-    message: 'Por favor selecciona un archivo CSV',
+    message: 'Por favor selecciona un archivo de datos',
     tips: [
-      'Asegúrate de elegir un archivo con extensión .csv',
+      'Asegúrate de elegir un archivo .csv, .parquet, .feather o .arrow',
       'El archivo debe contener al menos los datos de ejemplo mostrados',
       'Verifica que el archivo no esté vacío',
     ],
   },
   'file_too_large': {
     title: 'Archivo demasiado grande',
-    message: 'El archivo excede el límite de 5 MB',
+    message: 'El archivo excede el límite de 500 MB',
     tips: [
       'Comprime o divide tu archivo en partes más pequeñas',
       'Reduce el número de filas si es posible',
@@ -1,5 +1,6 @@
 """Tests unitarios para utilidades de preprocesado y regresión."""
 
+import json
 import pytest
 import pandas as pd
 import numpy as np
@@ -108,6 +109,65 @@ class TestDataProcessor:
         
         assert X.shape == (12, 3)  # 2 features + 1 control
         assert y.shape == (12,)
+    
+    def test_lean_matrix_and_imputation_mask(self):
+        """Test que la matriz interna coincide con el preprocesado en pandas y registra lo imputado."""
+        rng = np.random.RandomState(7)
+        data = _make_marketing_frame(n=40, seed=7).sample(frac=1, random_state=1)
+        data.loc[rng.rand(40) < 0.2, 'Channel_A'] = np.nan
+        data.iloc[0, data.columns.get_loc('Sales')] = np.nan
+
+        processor = DataProcessor()
+        processor.load_data(data, 'Date', 'Sales', ['Channel_A', 'Channel_B'])
+
+        expected = data.sort_values('Date').reset_index(drop=True)
+        missing = expected[['Sales', 'Channel_A', 'Channel_B']].isna().values
+        expected = expected.interpolate(method='linear', limit_direction='both')
+        X, y = processor.get_regression_data()
+        np.testing.assert_allclose(X, expected[['Channel_A', 'Channel_B']].values)
+        np.testing.assert_allclose(y, expected['Sales'].values)
+        np.testing.assert_array_equal(processor.imputation_mask(), missing)
+        assert processor.imputed_counts() == {'Sales': 1, 'Channel_A': int(missing[:, 1].sum()), 'Channel_B': 0}
+
+        # X e y son vistas de sólo lectura sobre una única matriz contigua
+        matrix = processor.get_matrix()
+        assert matrix.flags.f_contiguous and not X.flags.writeable
+        assert np.shares_memory(X, matrix) and np.shares_memory(y, matrix)
+        assert np.shares_memory(processor.data['Channel_A'].values, matrix)
+        assert not hasattr(processor, 'original_data')
+
+        new_rows = _make_marketing_frame(n=45, seed=7).iloc[40:].copy()
+        new_rows.loc[new_rows.index[1], 'Channel_B'] = np.nan
+        processor.append_data(new_rows)
+        assert processor.n_observations() == 45
+        assert processor.imputation_mask()[41, 2]
+        assert processor.imputed_counts()['Channel_B'] == 1
+
+    def test_lttb_keeps_extremes(self):
+        """Test que LTTB conserva extremos y primer/último punto."""
+        from backend.app.utils import lttb_indices
+        
+        y = np.sin(np.linspace(0, 20, 5000))
+        y[2500] = 10
+        indices = lttb_indices(y, 100)
+        assert len(indices) == 100
+        assert indices[0] == 0 and indices[-1] == 4999
+        assert 2500 in indices
+        assert np.all(np.diff(indices) > 0)
+    
+    def test_read_mapped_file_csv_in_chunks(self, sample_data):
+        """Test lectura por bloques con proyección de columnas."""
+        import io
+        from backend.app.utils import read_mapped_file
+        
+        source = io.BytesIO(sample_data.to_csv(index=False).encode('utf-8'))
+        df, file_columns = read_mapped_file(source, 'Date', ['Sales', 'Channel_A'], 'csv', chunksize=5)
+        
+        assert file_columns == list(sample_data.columns)
+        assert list(df.columns) == ['Date', 'Sales', 'Channel_A']
+        assert len(df) == 12
+        assert df['Sales'].dtype == np.float64
+        assert pd.api.types.is_datetime64_any_dtype(df['Date'])
 
 
 class TestRegressionFitter:
@@ -160,17 +220,1275 @@ class TestRegressionFitter:
         r2 = fitted_model.model.rsquared
         assert 0 <= r2 <= 1
     
+    def test_optimize_budget_matches_linprog(self, fitted_model):
+        """Test que el reparto óptimo coincide con un LP genérico."""
+        from scipy.optimize import linprog
+        from backend.app.utils import Simulator
+        
+        simulator = Simulator(fitted_model)
+        bounds = {'Channel_A': (10.0, 40.0), 'Channel_B': (5.0, None)}
+        result = simulator.optimize_budget(total_budget=100.0, bounds=bounds)
+        
+        beta = np.asarray(fitted_model.model.params)[1:]
+        lp = linprog(-beta, A_eq=[[1, 1]], b_eq=[100.0], bounds=[(10, 40), (5, None)])
+        assert sum(result['allocation'].values()) == pytest.approx(100.0)
+        np.testing.assert_allclose(list(result['allocation'].values()), lp.x, atol=1e-6)
+        
+        with pytest.raises(ValueError, match="Presupuesto fuera de rango"):
+            simulator.optimize_budget(total_budget=10.0, bounds=bounds)
+    
+    def test_response_curves_match_get_prediction(self, fitted_model):
+        """Test que las curvas coinciden con /simulate y con las bandas de statsmodels."""
+        import statsmodels.api as sm
+        from backend.app.utils import Simulator
+        
+        simulator = Simulator(fitted_model)
+        curves = simulator.response_curves([-50, 0, 25])
+        assert simulator.response_curves([-50, 0, 25]) is curves
+        assert set(curves['curves']) == {'Channel_A', 'Channel_B'}
+        
+        X, y = fitted_model.processor.get_regression_data()
+        ols = sm.OLS(y, sm.add_constant(X)).fit()
+        x = np.r_[1.0, X.mean(axis=0)]
+        x[2] *= 1.25
+        frame = ols.get_prediction(x[None, :]).summary_frame(alpha=0.05)
+        curve = curves['curves']['Channel_B']
+        assert curve['prediction'][2] == pytest.approx(simulator.simulate({'Channel_B': 25})['scenario_prediction'])
+        assert curve['confidence_lower'][2] == pytest.approx(frame['mean_ci_lower'][0])
+        assert curve['prediction_upper'][2] == pytest.approx(frame['obs_ci_upper'][0])
+        assert curve['marginal_roi'] == pytest.approx([ols.params[2]] * 3)
+        
+        with pytest.raises(ValueError):
+            simulator.response_curves([-150])
+    
+    def test_simulation_intervals_match_get_prediction(self, fitted_model):
+        """Test que los intervalos de /simulate coinciden con get_prediction de statsmodels."""
+        import statsmodels.api as sm
+        from backend.app.utils import Simulator
+        
+        simulator = Simulator(fitted_model)
+        single = simulator.simulate({'Channel_A': 20, 'Channel_B': -10}, level=0.9)
+        
+        X, y = fitted_model.processor.get_regression_data()
+        x = np.r_[1.0, X.mean(axis=0) * [1.2, 0.9]]
+        frame = sm.OLS(y, sm.add_constant(X)).fit().get_prediction(x[None, :]).summary_frame(alpha=0.1)
+        interval = single['scenario_interval']
+        assert interval['confidence_interval_lower'] == pytest.approx(frame['mean_ci_lower'][0])
+        assert interval['confidence_interval_upper'] == pytest.approx(frame['mean_ci_upper'][0])
+        assert interval['prediction_interval_lower'] == pytest.approx(frame['obs_ci_lower'][0])
+        assert interval['prediction_interval_upper'] == pytest.approx(frame['obs_ci_upper'][0])
+        assert single['interval_source'] == 'analytic'
+        
+        batch = simulator.simulate_batch(['Channel_B', 'Channel_A'], [[-10, 20], [0, 0]], level=0.9)
+        assert batch['prediction_interval_upper'][0] == pytest.approx(frame['obs_ci_upper'][0])
+        assert batch['confidence_interval_lower'][1] < batch['scenario_prediction'][1]
+    
+    def test_ridge_intervals_reuse_bootstrap_draws(self, fitted_model):
+        """Test que en Ridge los intervalos usan la covarianza de las réplicas bootstrap."""
+        from backend.app.utils import Simulator
+        
+        fitted_model.fit(regularization='ridge', alpha=10.0, bootstrap_samples=300, ci_method='pairs')
+        covariance = fitted_model.coefficient_covariance()
+        assert covariance['source'] == 'bootstrap'
+        np.testing.assert_allclose(covariance['cov'], np.cov(fitted_model.bootstrap_draws, rowvar=False))
+        np.testing.assert_allclose(covariance['chol'] @ covariance['chol'].T, covariance['cov'], atol=1e-10)
+        assert Simulator(fitted_model).simulate({'Channel_A': 10})['interval_source'] == 'bootstrap'
+        
+        fitted_model.fit(regularization='ridge', alpha=10.0, bootstrap_samples=0)
+        assert fitted_model.coefficient_covariance()['source'] == 'analytic'
+    
     def test_vif_values_present(self, fitted_model):
         """Test que VIF está calculado."""
         assert fitted_model.vif_values is not None or len(fitted_model.vif_values) == 0
     
+    def test_vif_matches_auxiliary_regressions(self, fitted_model):
+        """Test que el VIF cerrado coincide con las regresiones auxiliares (con constante)."""
+        import statsmodels.api as sm
+        from statsmodels.stats.outliers_influence import variance_inflation_factor
+        
+        X, _ = fitted_model.processor.get_regression_data()
+        X = sm.add_constant(X)
+        for i, name in enumerate(fitted_model.processor.feature_columns, start=1):
+            assert fitted_model.vif_values[name] == pytest.approx(variance_inflation_factor(X, i))
+        assert np.isfinite(fitted_model.condition_number)
+    
+    def test_vif_perfect_collinearity(self, fitted_model):
+        """Test que la colinealidad exacta devuelve inf y número de condición infinito."""
+        import statsmodels.api as sm
+        
+        X, _ = fitted_model.processor.get_regression_data()
+        noise = np.random.RandomState(0).rand(len(X))
+        X = sm.add_constant(np.column_stack([X, 2 * X[:, 0] - X[:, 1], noise]))
+        names = ['Channel_A', 'Channel_B', 'Combo', 'Noise']
+        vif = fitted_model._calculate_vif(X, names, include_controls=True)
+        
+        assert np.isinf(vif['Channel_A']) and np.isinf(vif['Combo'])
+        assert np.isfinite(vif['Noise'])
+        assert fitted_model.condition_number == float('inf')
+    
     def test_residuals_shape(self, fitted_model):
         """Test forma de residuos."""
         assert len(fitted_model.residuals) == len(fitted_model.processor.data)
-    
+
+    def test_diagnostics_match_statsmodels(self, fitted_model):
+        """Durbin-Watson y Jarque-Bera coinciden con statsmodels y se calculan una vez."""
+        from statsmodels.stats.stattools import durbin_watson, jarque_bera
+
+        diagnostics = fitted_model.diagnostics()
+        residuals = np.asarray(fitted_model.residuals)
+        jb, jb_pvalue, skew, kurtosis = jarque_bera(residuals)
+
+        assert diagnostics['durbin_watson'] == pytest.approx(durbin_watson(residuals))
+        assert diagnostics['jarque_bera'] == pytest.approx(jb)
+        assert diagnostics['jarque_bera_pvalue'] == pytest.approx(jb_pvalue)
+        assert diagnostics['residuals_skew'] == pytest.approx(skew)
+        assert diagnostics['residuals_kurtosis'] == pytest.approx(kurtosis)
+        assert diagnostics['standardized_residual_quantiles']['50%'] == pytest.approx(
+            (np.median(residuals) - residuals.mean()) / residuals.std())
+        assert fitted_model.diagnostics() is diagnostics
+        assert fitted_model._get_results()['diagnostics'] is diagnostics
+
+    def test_diagnostics_without_residual_variance(self, fitted_model):
+        """Con residuos constantes los momentos estandarizados son None, no NaN."""
+        fitted_model.residuals = np.zeros(len(fitted_model.residuals))
+        fitted_model._diagnostics = None
+
+        diagnostics = fitted_model.diagnostics()
+        assert diagnostics['residuals_std'] == 0.0
+        for key in ('residuals_skew', 'residuals_kurtosis', 'durbin_watson',
+                    'jarque_bera', 'jarque_bera_pvalue'):
+            assert diagnostics[key] is None
+
     def test_bootstrap_ci(self, fitted_model):
         """Test intervalos de confianza bootstrap."""
         assert fitted_model.bootstrap_ci is not None
+    
+    def test_bootstrap_matches_per_sample_ols(self, fitted_model):
+        """Test que el bootstrap vectorizado reproduce el bucle OLS por réplica."""
+        import statsmodels.api as sm
+        
+        X, y = fitted_model.processor.get_regression_data()
+        X = sm.add_constant(X)
+        rng = np.random.RandomState(42)
+        expected = []
+        for _ in range(50):
+            idx = rng.choice(len(y), size=len(y), replace=True)
+            expected.append(sm.OLS(y[idx], X[idx]).fit().params)
+        
+        coef = np.vstack(list(fitted_model._iter_bootstrap_batches(X, y, 50)))
+        np.testing.assert_allclose(coef, np.array(expected), rtol=1e-8, atol=1e-8)
+    
+    def test_bootstrap_ridge_refits_ridge(self, fitted_model):
+        """Test que el bootstrap de Ridge reajusta Ridge y no OLS."""
+        import statsmodels.api as sm
+        from sklearn.linear_model import Ridge
+        
+        X, y = fitted_model.processor.get_regression_data()
+        X = sm.add_constant(X)
+        fitted_model.regularization = 'ridge'
+        fitted_model.alpha = 10.0
+        coef = np.vstack(list(fitted_model._iter_bootstrap_batches(X, y, 5)))
+        
+        rng = np.random.RandomState(42)
+        for row in coef:
+            idx = rng.choice(len(y), size=len(y), replace=True)
+            ridge = Ridge(alpha=10.0).fit(X[idx, 1:], y[idx])
+            np.testing.assert_allclose(row, np.r_[ridge.intercept_, ridge.coef_], rtol=1e-8, atol=1e-8)
+    
+    def test_bootstrap_progress_does_not_change_result(self, fitted_model):
+        """Test que el callback de progreso no altera las réplicas y llega al total."""
+        X = np.column_stack([np.ones(len(fitted_model.residuals)),
+                             fitted_model.processor.get_regression_data()[0]])
+        y = fitted_model.processor.data['Sales'].values
+        calls = []
+        fitted_model._bootstrap_ci(
+            X, y, 600, progress=lambda done, total, **info: calls.append((done, total, info['stage'])))
+        with_progress = fitted_model.bootstrap_draws
+        fitted_model._bootstrap_ci(X, y, 600)
+        np.testing.assert_allclose(with_progress, fitted_model.bootstrap_draws)
+        assert calls[0] == (0, 600, 'bootstrap')
+        assert calls[-1] == (600, 600, 'bootstrap')
+        assert len(calls) > 2
+    
+    def test_bootstrap_early_stopping(self, fitted_model):
+        """Test que el bootstrap progresivo para al converger y publica IC parciales."""
+        X = np.column_stack([np.ones(len(fitted_model.residuals)),
+                             fitted_model.processor.get_regression_data()[0]])
+        y = fitted_model.processor.data['Sales'].values
+        full = fitted_model._bootstrap_ci(X, y, 5000)
+        assert fitted_model.bootstrap_replicates == 5000
+        
+        updates = []
+        early = fitted_model._bootstrap_ci(X, y, 5000, tolerance=0.05,
+                                           progress=lambda done, total, **info: updates.append(info))
+        assert fitted_model.bootstrap_replicates < 5000
+        assert updates[-1]['max_shift'] <= 0.05
+        assert set(updates[-1]['ci']) == set(full)
+        for name, (lower, upper) in full.items():
+            width = upper - lower
+            assert early[name][0] == pytest.approx(lower, abs=0.25 * width)
+            assert early[name][1] == pytest.approx(upper, abs=0.25 * width)
+    
+    def test_parallel_bootstrap_independent_of_workers(self, fitted_model):
+        """Test que el bootstrap paralelo es reproducible con cualquier número de workers."""
+        import statsmodels.api as sm
+        
+        X, y = fitted_model.processor.get_regression_data()
+        X = sm.add_constant(X)
+        one = np.vstack(list(fitted_model._iter_bootstrap_batches(X, y, 600, n_jobs=1)))
+        many = np.vstack(list(fitted_model._iter_bootstrap_batches(X, y, 600, n_jobs=3)))
+        
+        assert one.shape == (600, X.shape[1])
+        np.testing.assert_array_equal(one, many)
+    
+    @pytest.mark.parametrize('ci_method, cov', [('hc', {'cov_type': 'HC3'}),
+                                                ('hac', {'cov_type': 'HAC', 'cov_kwds': {'maxlags': 3}})])
+    def test_analytic_ci_match_statsmodels(self, fitted_model, ci_method, cov):
+        """Test que los IC sandwich HC3/HAC coinciden con statsmodels sin bootstrap."""
+        import statsmodels.api as sm
+        
+        results = fitted_model.fit(ci_method=ci_method, hac_lags=3)
+        X, y = fitted_model.processor.get_regression_data()
+        expected = np.asarray(sm.OLS(y, sm.add_constant(X)).fit(**cov).conf_int())
+        np.testing.assert_allclose(np.array(list(results['bootstrap_ci'].values())), expected, rtol=1e-9)
+        assert results['bootstrap_replicates'] == 0
+        assert results['ci_params'] == ({'lags': 3} if ci_method == 'hac' else {})
+    
+    @pytest.mark.parametrize('ci_method', ['residual', 'wild', 'block'])
+    def test_residual_bootstrap_variants(self, fitted_model, ci_method):
+        """Test que los bootstrap de residuos reutilizan el ajuste y cubren los coeficientes."""
+        import statsmodels.api as sm
+        
+        fitted_model.fit(ci_method=ci_method, bootstrap_samples=0)
+        X, y = fitted_model.processor.get_regression_data()
+        X = sm.add_constant(X)
+        coef = np.vstack(list(fitted_model._iter_bootstrap_batches(X, y, 400)))
+        assert coef.shape == (400, X.shape[1])
+        np.testing.assert_array_equal(coef, np.vstack(list(fitted_model._iter_bootstrap_batches(X, y, 400))))
+        ols = sm.OLS(y, X).fit()
+        assert np.all(np.abs(coef.mean(axis=0) - ols.params) < 0.5 * ols.bse)
+        
+        results = fitted_model.fit(ci_method=ci_method, bootstrap_samples=200, block_length=4)
+        for name, value in results['coefficients'].items():
+            lower, upper = results['bootstrap_ci'][name]
+            assert lower < value < upper
+        assert results['ci_params'] == ({'block_length': 4} if ci_method == 'block' else {})
+        
+        with pytest.raises(ValueError):
+            fitted_model.fit(ci_method='jackknife')
+
+    @pytest.mark.parametrize('ci_method', ['hc', 'hac', 'pairs', 'residual', 'wild', 'block'])
+    @pytest.mark.parametrize('regularization', [None, 'ridge'])
+    def test_ci_contains_coefficients_with_collinear_design(self, ci_method, regularization):
+        """Test que con colinealidad exacta (B = 2A) los IC se centran en los coeficientes reportados."""
+        data = _make_marketing_frame(n=60, seed=11)
+        data['Channel_C'] = 2 * data['Channel_A']
+        processor = DataProcessor()
+        processor.load_data(data, 'Date', 'Sales', ['Channel_A', 'Channel_B', 'Channel_C'])
+
+        results = RegressionFitter(processor).fit(regularization=regularization, ci_method=ci_method,
+                                                  bootstrap_samples=200)
+        for name, value in results['coefficients'].items():
+            lower, upper = results['bootstrap_ci'][name]
+            assert lower <= value <= upper, name
+
+
+
+def _make_marketing_frame(n=60, seed=0):
+    """DataFrame sintético con dos canales y una relación conocida."""
+    rng = np.random.RandomState(seed)
+    data = pd.DataFrame({
+        'Date': pd.date_range('2022-01-01', periods=n, freq='D'),
+        'Channel_A': rng.rand(n) * 100,
+        'Channel_B': rng.rand(n) * 100,
+    })
+    data['Sales'] = 1000 + 2 * data['Channel_A'] + 3 * data['Channel_B'] + rng.randn(n) * 10
+    return data
+
+
+class TestSufficientStats:
+    """Tests para el modo de estadísticos suficientes."""
+    
+    @pytest.fixture
+    def data(self):
+        data = _make_marketing_frame(n=120, seed=4)
+        data['Control_1'] = np.random.RandomState(5).rand(120) * 10
+        return data
+    
+    def _processors(self, data):
+        cols = dict(date_col='Date', target_col='Sales', feature_cols=['Channel_A', 'Channel_B'],
+                    control_cols=['Control_1'])
+        full = DataProcessor()
+        full.load_data(data.copy(), **cols)
+        stats = DataProcessor()
+        stats.load_stats((data.iloc[i:i + 25] for i in range(0, len(data), 25)), **cols)
+        return full, stats
+    
+    def test_ols_matches_full_fit(self, data):
+        """Test que el ajuste OLS desde estadísticos coincide con statsmodels."""
+        full, stats = self._processors(data)
+        assert stats.data is None
+        assert stats.n_observations() == 120
+        
+        expected = RegressionFitter(full).fit(bootstrap_samples=0, vif_include_controls=True)
+        fitter = RegressionFitter(stats)
+        result = fitter.fit(bootstrap_samples=0, vif_include_controls=True)
+        
+        for key in ('r_squared', 'adjusted_r_squared', 'aic', 'bic', 'f_statistic',
+                    'residuals_mean', 'residuals_std'):
+            assert result[key] == pytest.approx(expected[key], rel=1e-6, abs=1e-8)
+        for name in expected['coefficients']:
+            assert result['coefficients'][name] == pytest.approx(expected['coefficients'][name], rel=1e-8)
+            assert result['p_values'][name] == pytest.approx(expected['p_values'][name], rel=1e-5, abs=1e-12)
+            assert result['vif_values'].get(name) == pytest.approx(expected['vif_values'].get(name))
+        assert result['residuals'] == []
+        
+        import statsmodels.api as sm
+        X, y = full.get_regression_data()
+        ols = sm.OLS(y, sm.add_constant(X)).fit()
+        np.testing.assert_allclose(fitter.model.bse.values, ols.bse, rtol=1e-6)
+    
+    @pytest.mark.parametrize('window', ['expanding', 'sliding'])
+    def test_backtest_matches_refit_per_fold(self, data, window):
+        """Test que los folds incrementales coinciden con reajustar cada fold desde cero."""
+        from sklearn.linear_model import Ridge
+        
+        full, stats = self._processors(data)
+        X, y = full.get_regression_data()
+        fitter = RegressionFitter(full)
+        result = fitter.backtest(n_folds=4, horizon=10, window=window, n_jobs=2)
+        ridge = fitter.backtest(n_folds=4, horizon=10, window=window, regularization='ridge', alpha=5.0)
+        
+        assert result['train_size'] == 80
+        errors = []
+        for fold, ridge_fold in zip(result['folds'], ridge['folds']):
+            origin = 80 + 10 * fold['fold']
+            start = origin - 80 if window == 'sliding' else 0
+            Z = np.column_stack([np.ones(origin - start), X[start:origin]])
+            coef = np.linalg.lstsq(Z, y[start:origin], rcond=None)[0]
+            forecast = coef[0] + X[origin:origin + 10] @ coef[1:]
+            np.testing.assert_allclose(fold['forecast'], forecast, rtol=1e-8)
+            np.testing.assert_allclose(fold['actual'], y[origin:origin + 10])
+            assert fold['train_size'] == origin - start
+            assert fold['rmse'] == pytest.approx(np.sqrt(np.mean((y[origin:origin + 10] - forecast) ** 2)))
+            errors.append(y[origin:origin + 10] - forecast)
+            
+            model = Ridge(alpha=5.0).fit(X[start:origin], y[start:origin])
+            np.testing.assert_allclose(ridge_fold['forecast'], model.predict(X[origin:origin + 10]), rtol=1e-8)
+        
+        errors = np.concatenate(errors)
+        assert result['rmse'] == pytest.approx(np.sqrt(np.mean(errors ** 2)))
+        assert result['mape'] == pytest.approx(np.mean(np.abs(errors / y[80:])) * 100)
+        
+        with pytest.raises(ValueError, match="dataset completo"):
+            RegressionFitter(stats).backtest()
+        with pytest.raises(ValueError, match="insuficientes"):
+            fitter.backtest(n_folds=10, horizon=12)
+
+    def test_backtest_hill_scale_ignores_later_rows(self, data):
+        """Test que la escala de la Hill de cada fold sólo usa su ventana de entrenamiento."""
+        from backend.app.utils import geometric_adstock, hill_saturation
+
+        transforms = {'Channel_A': {'adstock': 'geometric', 'decay': 0.3, 'saturation': 'hill'}}
+        full, _ = self._processors(data)
+        result = RegressionFitter(full).backtest(n_folds=4, horizon=10, transforms=transforms)
+
+        changed = data.copy()
+        changed.loc[90:, 'Channel_A'] *= 5
+        other, _ = self._processors(changed)
+        other_result = RegressionFitter(other).backtest(n_folds=4, horizon=10, transforms=transforms)
+        np.testing.assert_allclose(other_result['folds'][0]['forecast'], result['folds'][0]['forecast'], rtol=1e-10)
+
+        X, y = full.get_regression_data()
+        X = np.array(X)
+        adstocked = geometric_adstock(X[:, 0], 0.3)
+        X[:, 0] = hill_saturation(adstocked, adstocked[:80].mean(), 1.0)
+        Z = np.column_stack([np.ones(80), X[:80]])
+        coef = np.linalg.lstsq(Z, y[:80], rcond=None)[0]
+        np.testing.assert_allclose(result['folds'][0]['forecast'], coef[0] + X[80:90] @ coef[1:], rtol=1e-8)
+
+    def test_ridge_path_matches_individual_fits(self, data, monkeypatch):
+        """Test que el camino Ridge coincide con ajustes Ridge individuales y LOO explícito."""
+        from sklearn.linear_model import Ridge
+        from backend.app import utils
+        
+        full, stats = self._processors(data)
+        alphas = [0.1, 10.0, 1000.0]
+        path = RegressionFitter(full).ridge_path(alphas)
+        monkeypatch.setattr(utils, '_RIDGE_PATH_CHUNK_ELEMENTS', 20)
+        chunked = RegressionFitter(full).ridge_path(alphas)
+        np.testing.assert_allclose(chunked['loo_mse'], path['loo_mse'], rtol=1e-12)
+        stats_path = RegressionFitter(stats).ridge_path(alphas)
+        X, y = full.get_regression_data()
+        
+        for j, alpha in enumerate(alphas):
+            ridge = Ridge(alpha=alpha).fit(X, y)
+            assert path['coefficients']['const'][j] == pytest.approx(ridge.intercept_, rel=1e-8)
+            assert path['coefficients']['Channel_B'][j] == pytest.approx(ridge.coef_[1], rel=1e-8)
+            assert stats_path['coefficients']['Channel_B'][j] == pytest.approx(ridge.coef_[1], rel=1e-8)
+            assert stats_path['gcv'][j] == pytest.approx(path['gcv'][j], rel=1e-6)
+            assert path['rss'][j] == pytest.approx(np.sum((y - ridge.predict(X)) ** 2), rel=1e-8)
+        
+        errors = []
+        for i in range(len(y)):
+            mask = np.arange(len(y)) != i
+            model = Ridge(alpha=alphas[1]).fit(X[mask], y[mask])
+            errors.append(y[i] - model.predict(X[i:i + 1])[0])
+        assert path['loo_mse'][1] == pytest.approx(np.mean(np.square(errors)), rel=1e-8)
+        assert stats_path['loo_mse'] is None
+    
+    def test_append_updates_fit_incrementally(self, data):
+        """Test que append + update equivale a reajustar con todo el histórico."""
+        cols = dict(date_col='Date', target_col='Sales', feature_cols=['Channel_A', 'Channel_B'],
+                    control_cols=['Control_1'])
+        full = DataProcessor()
+        full.load_data(data.copy(), **cols)
+        expected = RegressionFitter(full).fit(bootstrap_samples=0)
+        
+        partial = DataProcessor()
+        partial.load_data(data.iloc[:100].copy(), **cols)
+        fitter = RegressionFitter(partial)
+        fitter.fit(bootstrap_samples=10, ci_method='pairs')
+        X_new, y_new = partial.append_data(data.iloc[100:].copy())
+        result = fitter.update(X_new, y_new)
+        
+        assert len(partial.data) == 120
+        assert result['observations'] == 120
+        assert fitter.bootstrap_stale
+        for key in ('r_squared', 'aic', 'bic', 'f_statistic'):
+            assert result[key] == pytest.approx(expected[key], rel=1e-8)
+        for name in expected['coefficients']:
+            assert result['coefficients'][name] == pytest.approx(expected['coefficients'][name], rel=1e-8)
+        np.testing.assert_allclose(result['residuals'], expected['residuals'], rtol=1e-6, atol=1e-6)
+        
+        fitter.refresh_bootstrap()
+        assert not fitter.bootstrap_stale
+        assert set(fitter.bootstrap_ci) == set(expected['coefficients'])
+    
+    def test_ridge_matches_full_fit(self, data):
+        """Test que el Ridge desde estadísticos coincide con scikit-learn."""
+        full, stats = self._processors(data)
+        expected = RegressionFitter(full).fit(regularization='ridge', alpha=50.0, bootstrap_samples=0)
+        result = RegressionFitter(stats).fit(regularization='ridge', alpha=50.0, bootstrap_samples=0)
+        
+        for name in expected['coefficients']:
+            assert result['coefficients'][name] == pytest.approx(expected['coefficients'][name], rel=1e-8)
+        assert result['r_squared'] == pytest.approx(expected['r_squared'], rel=1e-8)
+        assert result['aic'] == pytest.approx(expected['aic'], rel=1e-8)
+
+
+class TestTransforms:
+    """Tests para el pipeline de adstock/saturación."""
+    
+    @pytest.fixture
+    def processor(self):
+        processor = DataProcessor()
+        processor.load_data(_make_marketing_frame(n=80, seed=11), 'Date', 'Sales', ['Channel_A', 'Channel_B'])
+        return processor
+    
+    def test_adstock_and_hill_match_reference(self, processor):
+        """Test que los filtros vectorizados coinciden con la recursión explícita."""
+        from backend.app.utils import geometric_adstock, weibull_adstock, hill_saturation
+        
+        x = processor.data['Channel_A'].values
+        expected = np.zeros_like(x)
+        carry = 0.0
+        for t, value in enumerate(x):
+            carry = value + 0.6 * carry
+            expected[t] = carry
+        np.testing.assert_allclose(geometric_adstock(x, 0.6), expected)
+        
+        weights = np.exp(-(np.arange(4) / 2.0) ** 1.5)
+        expected = [sum(weights[l] * x[t - l] for l in range(4) if t - l >= 0) for t in range(len(x))]
+        np.testing.assert_allclose(weibull_adstock(x, 1.5, 2.0, 3), expected)
+        
+        assert hill_saturation(np.array([2.0]), 2.0, 3.0)[0] == pytest.approx(0.5)
+    
+    def test_transformed_matrix_is_cached(self, processor):
+        """Test que la matriz transformada se reutiliza por parámetros."""
+        spec = {'Channel_A': {'adstock': 'geometric', 'decay': 0.4, 'saturation': 'hill'}}
+        X1, _ = processor.get_regression_data(spec)
+        X2, _ = processor.get_regression_data({'Channel_A': {'saturation': 'hill', 'decay': 0.4,
+                                                             'adstock': 'geometric'}})
+        assert X1 is X2
+        assert not X1.flags.writeable
+        np.testing.assert_array_equal(X1[:, 1], processor.data['Channel_B'].values)
+        
+        other, _ = processor.get_regression_data({'Channel_A': {'adstock': 'geometric', 'decay': 0.5}})
+        assert other is not X1
+        
+        with pytest.raises(ValueError, match="decay"):
+            processor.get_regression_data({'Channel_A': {'adstock': 'geometric', 'decay': 1.5}})
+        with pytest.raises(ValueError, match="no válidos"):
+            processor.get_regression_data({'Channel_A': {'adstock': 'geometric', 'slope': 2}})
+    
+    def test_simulation_applies_transforms(self, processor):
+        """Test que el simulador escala la serie de gasto y la vuelve a transformar."""
+        from backend.app.utils import Simulator, normalize_transforms, geometric_adstock, hill_saturation
+        
+        spec = {'Channel_A': {'adstock': 'geometric', 'decay': 0.5, 'saturation': 'hill', 'slope': 2.0}}
+        fitter = RegressionFitter(processor)
+        fitter.fit(bootstrap_samples=0, transforms=spec)
+        simulator = Simulator(fitter)
+        result = simulator.simulate({'Channel_A': 30, 'Channel_B': -10})
+        
+        scaled = processor.data.copy()
+        scaled['Channel_A'] *= 1.3
+        scaled['Channel_B'] *= 0.9
+        canonical = normalize_transforms(spec, ['Channel_A', 'Channel_B'])
+        k = processor.get_transformed_column('Channel_A', canonical['Channel_A'])['half_saturation']
+        design = np.column_stack([
+            hill_saturation(geometric_adstock(scaled['Channel_A'].values, 0.5), k, 2.0),
+            scaled['Channel_B'].values,
+        ])
+        params = np.asarray(fitter.model.params)
+        expected = params[0] + design.mean(axis=0) @ params[1:]
+        assert result['scenario_prediction'] == pytest.approx(expected)
+        
+        batch = simulator.simulate_batch(['Channel_A', 'Channel_B'], [[30, -10], [0, 0]])
+        assert batch['scenario_prediction'][0] == pytest.approx(expected)
+        assert batch['delta'][1] == pytest.approx(0.0, abs=1e-9)
+    
+    def test_optimize_with_saturation_matches_slsqp(self, processor):
+        """Test que Frank-Wolfe alcanza el óptimo de un solver genérico con canales saturados."""
+        from scipy.optimize import minimize
+        from backend.app.utils import Simulator
+        
+        spec = {'Channel_A': {'saturation': 'hill', 'half_saturation': 0.5},
+                'Channel_B': {'adstock': 'geometric', 'decay': 0.3, 'saturation': 'hill'}}
+        fitter = RegressionFitter(processor)
+        fitter.fit(bootstrap_samples=0, transforms=spec)
+        simulator = Simulator(fitter)
+        result = simulator.optimize_budget(total_budget=150.0)
+        assert result['solver'] == 'frank-wolfe'
+        
+        current = np.array(list(result['current_allocation'].values()))
+        
+        def objective(x):
+            pct = (x / current - 1) * 100
+            return -simulator.simulate(dict(zip(['Channel_A', 'Channel_B'], pct)))['scenario_prediction']
+        
+        reference = minimize(objective, x0=[75.0, 75.0], bounds=[(0, None), (0, None)], method='SLSQP',
+                             constraints=[{'type': 'eq', 'fun': lambda x: x.sum() - 150.0}])
+        assert sum(result['allocation'].values()) == pytest.approx(150.0)
+        assert result['optimized_prediction'] >= -reference.fun - 1e-4
+        assert -objective(np.array(list(result['allocation'].values()))) == pytest.approx(
+            result['optimized_prediction'])
+
+    
+    def test_search_recovers_true_decay(self, processor):
+        """Test que la búsqueda encuentra el decay con el que se generaron los datos."""
+        from backend.app.utils import expand_transform_grid, search_transforms, geometric_adstock
+        
+        rng = np.random.RandomState(3)
+        data = processor.data.copy()
+        data['Sales'] = (500 + 4 * geometric_adstock(data['Channel_A'].values, 0.6)
+                         + 3 * data['Channel_B'] + rng.randn(80) * 5)
+        processor.load_data(data, 'Date', 'Sales', ['Channel_A', 'Channel_B'])
+        grid = {'Channel_A': {'adstock': 'geometric', 'decay': [0.0, 0.2, 0.4, 0.6, 0.8]}}
+        candidates = expand_transform_grid(grid)
+        assert len(candidates) == 5
+        
+        ranking = search_transforms(processor, candidates, criterion='bic')
+        assert ranking[0]['transforms']['Channel_A']['decay'] == 0.6
+        
+        fitter = RegressionFitter(processor)
+        fitter.fit(bootstrap_samples=0, transforms=ranking[0]['transforms'])
+        assert ranking[0]['aic'] == pytest.approx(fitter.model.aic)
+        
+        parallel = search_transforms(processor, candidates, criterion='bic', n_jobs=2)
+        assert [r['bic'] for r in parallel] == pytest.approx([r['bic'] for r in ranking])
+        
+        # Un único pool 'spawn' compartido entre búsquedas
+        from backend.app import utils
+        pool = utils._search_pool()
+        assert pool._mp_context.get_start_method() == 'spawn'
+        search_transforms(processor, candidates, criterion='aic', n_jobs=3)
+        assert utils._search_pool() is pool
+        
+        cv = search_transforms(processor, candidates, criterion='cv', cv_folds=3)
+        assert cv[0]['transforms']['Channel_A']['decay'] == 0.6
+    
+    def test_random_grid_sampling(self):
+        """Test que el muestreo aleatorio no enumera la rejilla y no repite candidatos."""
+        from backend.app.utils import expand_transform_grid
+        
+        grid = {f'C{i}': {'adstock': 'geometric', 'decay': list(np.linspace(0, 0.9, 10))} for i in range(12)}
+        candidates = expand_transform_grid(grid, n_random=50)
+        assert len(candidates) == 50
+        assert len({json.dumps(c, sort_keys=True) for c in candidates}) == 50
+        with pytest.raises(ValueError, match="Demasiados candidatos"):
+            expand_transform_grid(grid, max_candidates=1000)
+
+class TestApi:
+    """Tests de los endpoints HTTP."""
+    
+    @pytest.fixture
+    def client(self):
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        return TestClient(app)
+    
+    def _upload(self, client, data):
+        response = client.post(
+            '/upload',
+            files={'file': ('data.csv', data.to_csv(index=False), 'text/csv')},
+            data={'date_column': 'Date', 'target_column': 'Sales', 'feature_columns': 'Channel_A,Channel_B'}
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+    
+    def test_upload_keeps_only_mapped_columns(self, client):
+        """Test que la ingesta por bloques proyecta columnas y convierte tipos."""
+        data = _make_marketing_frame(n=50)
+        data['Unused'] = 'texto'
+        data.loc[5, 'Channel_A'] = 'n/a'
+        response = client.post(
+            '/upload',
+            files={'file': ('data.csv', data.to_csv(index=False), 'text/csv')},
+            data={'date_column': 'Date', 'target_column': 'Sales', 'feature_columns': 'Channel_A,Channel_B'}
+        )
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert body['shape'] == [50, 5]
+        assert 'Unused' in body['columns']
+        
+        _, processor = client.app.state.registry.get_dataset(body['dataset_id'])
+        assert 'Unused' not in processor.data.columns
+        assert processor.data['Channel_A'].dtype == np.float64
+        assert not processor.data['Channel_A'].isna().any()
+
+    @pytest.mark.parametrize('filename', ['data.parquet', 'data.feather'])
+    def test_upload_columnar_formats(self, client, filename):
+        """Test que Parquet y Arrow/Feather cargan igual que el CSV equivalente."""
+        import io
+        pytest.importorskip('pyarrow')
+
+        data = _make_marketing_frame(n=50, seed=4)
+        data['Unused'] = 'texto'
+        buffer = io.BytesIO()
+        if filename.endswith('.parquet'):
+            data.to_parquet(buffer, index=False)
+        else:
+            data.to_feather(buffer)
+        response = client.post(
+            '/upload',
+            files={'file': (filename, buffer.getvalue(), 'application/octet-stream')},
+            data={'date_column': 'Date', 'target_column': 'Sales', 'feature_columns': 'Channel_A,Channel_B'}
+        )
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert body['format'] == ('parquet' if filename.endswith('.parquet') else 'arrow')
+        assert body['shape'] == [50, 5]
+
+        reference = self._upload(client, data)
+        _, processor = client.app.state.registry.get_dataset(body['dataset_id'])
+        _, expected = client.app.state.registry.get_dataset(reference['dataset_id'])
+        assert 'Unused' not in processor.data.columns
+        pd.testing.assert_frame_equal(processor.data, expected.data)
+    
+    def test_sessions_do_not_overwrite_each_other(self, client):
+        """Test que cada upload/fit obtiene su propio handle."""
+        first = self._upload(client, _make_marketing_frame(seed=1))
+        second = self._upload(client, _make_marketing_frame(n=80, seed=2))
+        
+        fit_first = client.post('/fit', json={'dataset_id': first['dataset_id'], 'bootstrap_samples': 0}).json()
+        fit_second = client.post('/fit', json={'dataset_id': second['dataset_id'], 'bootstrap_samples': 0}).json()
+        assert fit_first['observations'] == 60
+        assert fit_second['observations'] == 80
+        
+        metrics = client.post('/metrics', params={'model_id': fit_first['model_id']}).json()
+        assert metrics['observations'] == 60
+        for key, value in fit_first['diagnostics'].items():
+            assert metrics[key] == value
+        
+        sim = client.post('/simulate', json={'model_id': fit_second['model_id'], 'changes': {'Channel_A': 10}})
+        assert sim.status_code == 200
+        assert sim.json()['model_id'] == fit_second['model_id']
+    
+    def test_repeated_fit_served_from_cache(self, client):
+        """Test que un /fit idéntico se sirve desde la caché y el modelo sigue siendo usable."""
+        dataset_id = self._upload(client, _make_marketing_frame(seed=3))['dataset_id']
+        params = {'dataset_id': dataset_id, 'ci_method': 'pairs', 'bootstrap_samples': 20}
+        
+        first = client.post('/fit', json=params).json()
+        second = client.post('/fit', json=params).json()
+        assert first['cached'] is False
+        assert second['cached'] is True
+        assert second['coefficients'] == first['coefficients']
+        assert second['model_id'] != first['model_id']
+        
+        sim = client.post('/simulate', json={'model_id': second['model_id'], 'changes': {'Channel_B': 5}})
+        assert sim.status_code == 200
+        
+        other = client.post('/fit', json={**params, 'bootstrap_samples': 30}).json()
+        assert other['cached'] is False
+
+    def test_cached_fit_behaves_like_fresh_fit(self, client):
+        """Test que un ajuste restaurado desde caché conserva réplicas bootstrap y estadísticos."""
+        data = _make_marketing_frame(n=80, seed=16)
+        dataset_id = self._upload(client, data.iloc[:60])['dataset_id']
+        params = {'dataset_id': dataset_id, 'regularization': 'ridge', 'alpha': 5.0,
+                  'ci_method': 'pairs', 'bootstrap_samples': 100}
+
+        fresh = client.post('/fit', json=params).json()
+        cached = client.post('/fit', json=params).json()
+        assert cached['cached'] is True
+
+        def outputs(model_id):
+            sim = client.post('/simulate', json={'model_id': model_id, 'changes': {'Channel_A': 10}}).json()
+            curves = client.post('/simulate/curves', json={'model_id': model_id}).json()
+            return {k: v for k, v in sim.items() if k != 'model_id'}, {k: v for k, v in curves.items() if k != 'model_id'}
+
+        assert outputs(cached['model_id']) == outputs(fresh['model_id'])
+        assert outputs(cached['model_id'])[1]['interval_source'] == 'bootstrap'
+
+        response = client.post(
+            '/append',
+            files={'file': ('new.csv', data.iloc[60:].to_csv(index=False), 'text/csv')},
+            data={'dataset_id': dataset_id}
+        )
+        models = response.json()['models']
+        assert models[cached['model_id']] == models[fresh['model_id']]
+
+    def test_stats_mode_upload_fit_and_simulate(self, client):
+        """Test el flujo completo en modo estadísticos suficientes."""
+        data = _make_marketing_frame(n=90, seed=6)
+        response = client.post(
+            '/upload',
+            files={'file': ('data.csv', data.to_csv(index=False), 'text/csv')},
+            data={'date_column': 'Date', 'target_column': 'Sales',
+                  'feature_columns': 'Channel_A,Channel_B', 'mode': 'stats'}
+        )
+        assert response.status_code == 200, response.text
+        dataset_id = response.json()['dataset_id']
+        assert client.get('/status', params={'dataset_id': dataset_id}).json()['mode'] == 'stats'
+        
+        fit = client.post('/fit', json={'dataset_id': dataset_id}).json()
+        assert fit['observations'] == 90
+        assert fit['residuals'] == []
+        assert fit['r_squared'] > 0.9
+        
+        metrics = client.post('/metrics', params={'model_id': fit['model_id']}).json()
+        assert metrics['residuals_mean'] == pytest.approx(0.0, abs=1e-6)
+        sim = client.post('/simulate', json={'model_id': fit['model_id'], 'changes': {'Channel_A': 10}})
+        assert sim.status_code == 200
+    
+    def test_append_endpoint(self, client):
+        """Test /append actualiza los modelos del dataset."""
+        data = _make_marketing_frame(n=80, seed=7)
+        dataset_id = self._upload(client, data.iloc[:60])['dataset_id']
+        fit = client.post('/fit', json={'dataset_id': dataset_id, 'ci_method': 'pairs', 'bootstrap_samples': 20}).json()
+        
+        response = client.post(
+            '/append',
+            files={'file': ('new.csv', data.iloc[60:].to_csv(index=False), 'text/csv')},
+            data={'dataset_id': dataset_id}
+        )
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert body['appended_rows'] == 20
+        model = body['models'][fit['model_id']]
+        assert model['observations'] == 80
+        assert model['bootstrap_stale'] is True
+        
+        refreshed = client.post(f"/models/{fit['model_id']}/bootstrap").json()
+        assert refreshed['bootstrap_stale'] is False
+        assert 'Channel_A' in refreshed['bootstrap_ci']
+    
+    def test_batch_simulation_matches_single(self, client):
+        """Test que /simulate/batch coincide con /simulate escenario a escenario."""
+        dataset_id = self._upload(client, _make_marketing_frame(seed=8))['dataset_id']
+        model_id = client.post('/fit', json={'dataset_id': dataset_id, 'bootstrap_samples': 0}).json()['model_id']
+        scenarios = [[10, 0], [-20, 5], [0, 0]]
+        
+        batch = client.post('/simulate/batch', json={
+            'model_id': model_id, 'features': ['Channel_A', 'Channel_B'], 'changes': scenarios
+        }).json()
+        assert batch['n_scenarios'] == 3
+        for i, (a, b) in enumerate(scenarios):
+            single = client.post('/simulate', json={
+                'model_id': model_id, 'changes': {'Channel_A': a, 'Channel_B': b}
+            }).json()
+            assert batch['scenario_prediction'][i] == pytest.approx(single['scenario_prediction'])
+            assert batch['delta_percentage'][i] == pytest.approx(single['delta_percentage'])
+            interval = single['scenario_interval']
+            assert batch['confidence_interval_lower'][i] == pytest.approx(interval['confidence_interval_lower'])
+            assert batch['prediction_interval_upper'][i] == pytest.approx(interval['prediction_interval_upper'])
+        
+        bad = client.post('/simulate/batch', json={'model_id': model_id, 'features': ['Nope'], 'changes': [[1]]})
+        assert bad.status_code == 400
+        
+        empty = client.post('/simulate/batch', json={'model_id': model_id, 'features': [], 'changes': [[]]})
+        assert empty.status_code == 400 and 'feature' in empty.json()['detail']
+        none = client.post('/simulate/batch', json={'model_id': model_id, 'features': ['Channel_A'], 'changes': []})
+        assert none.status_code == 400 and 'escenario' in none.json()['detail']
+    
+    def test_simulate_curves_endpoint(self, client):
+        """Test /simulate/curves retorna una curva por canal con bandas ordenadas."""
+        dataset_id = self._upload(client, _make_marketing_frame(seed=17))['dataset_id']
+        model_id = client.post('/fit', json={'dataset_id': dataset_id, 'bootstrap_samples': 0}).json()['model_id']
+        
+        response = client.post('/simulate/curves', json={'model_id': model_id, 'percentages': [-20, 0, 40]})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert body['percentages'] == [-20, 0, 40]
+        curve = body['curves']['Channel_A']
+        assert curve['prediction'][1] == pytest.approx(body['baseline_prediction'])
+        for lower, mid, upper, pi_upper in zip(curve['confidence_lower'], curve['prediction'],
+                                               curve['confidence_upper'], curve['prediction_upper']):
+            assert lower < mid < upper < pi_upper
+        
+        default = client.post('/simulate/curves', json={'model_id': model_id}).json()
+        assert len(default['percentages']) == 41
+        assert client.post('/simulate/curves', json={'model_id': model_id, 'level': 2}).status_code == 400
+    
+    def test_optimize_respects_budget_and_bounds(self, client):
+        """Test que /optimize reparte el presupuesto dentro de los límites."""
+        dataset_id = self._upload(client, _make_marketing_frame(seed=9))['dataset_id']
+        model_id = client.post('/fit', json={'dataset_id': dataset_id, 'bootstrap_samples': 0}).json()['model_id']
+        
+        response = client.post('/optimize', json={
+            'model_id': model_id, 'bounds': {'Channel_A': {'min': 20, 'max': 60}}
+        })
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert sum(body['allocation'].values()) == pytest.approx(sum(body['current_allocation'].values()))
+        assert 20 <= body['allocation']['Channel_A'] <= 60
+        assert body['optimized_prediction'] >= body['baseline_prediction'] - 1e-9
+        
+        bad = client.post('/optimize', json={'model_id': model_id, 'total_budget': -1})
+        assert bad.status_code == 400
+    
+    def test_fit_with_transforms(self, client):
+        """Test que /fit acepta transformaciones y las incluye en la clave de caché."""
+        dataset_id = self._upload(client, _make_marketing_frame(seed=10))['dataset_id']
+        payload = {'dataset_id': dataset_id, 'bootstrap_samples': 0,
+                   'transforms': {'Channel_A': {'adstock': 'geometric', 'decay': 0.5}}}
+        first = client.post('/fit', json=payload).json()
+        assert first['transforms']['Channel_A']['decay'] == 0.5
+        assert client.post('/fit', json=payload).json()['cached'] is True
+        
+        payload['transforms']['Channel_A']['decay'] = 0.7
+        other = client.post('/fit', json=payload).json()
+        assert other['cached'] is False
+        assert other['coefficients'] != first['coefficients']
+        
+        payload['transforms']['Channel_A']['adstock'] = 'exponential'
+        assert client.post('/fit', json=payload).status_code == 400
+    
+    def test_search_endpoint_fits_winner(self, client):
+        """Test que /fit/search ordena candidatos y ajusta el ganador."""
+        dataset_id = self._upload(client, _make_marketing_frame(seed=12))['dataset_id']
+        response = client.post('/fit/search', json={
+            'dataset_id': dataset_id, 'criterion': 'aic', 'top_k': 2, 'bootstrap_samples': 0,
+            'grid': {'Channel_A': {'adstock': 'geometric', 'decay': [0.0, 0.3, 0.6]},
+                     'Channel_B': {'saturation': 'hill', 'slope': [1, 2]}}
+        })
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert body['candidates_evaluated'] == 6
+        assert len(body['ranking']) == 2
+        assert body['ranking'][0]['aic'] <= body['ranking'][1]['aic']
+        assert body['fit']['transforms'] == body['best']['transforms']
+        assert body['fit']['aic'] == pytest.approx(body['best']['aic'])
+        
+        # Mismo método de IC por defecto que /fit; el ganador admite bootstrap
+        assert body['fit']['ci_method'] == 'hac'
+        boot = client.post('/fit/search', json={
+            'dataset_id': dataset_id, 'criterion': 'aic', 'bootstrap_samples': 50, 'ci_method': 'pairs',
+            'grid': {'Channel_A': {'adstock': 'geometric', 'decay': [0.0, 0.5]}}
+        }).json()
+        assert boot['fit']['ci_method'] == 'pairs'
+        assert boot['fit']['bootstrap_replicates'] > 0
+        
+        bad = client.post('/fit/search', json={'dataset_id': dataset_id, 'criterion': 'mape',
+                                               'grid': {'Channel_A': {'adstock': 'geometric'}}})
+        assert bad.status_code == 400
+    
+    def test_background_fit_job(self, client):
+        """Test que /fit en background retorna un job consultable y con eventos SSE."""
+        import time
+        dataset_id = self._upload(client, _make_marketing_frame(seed=13))['dataset_id']
+        response = client.post('/fit', json={'dataset_id': dataset_id, 'ci_method': 'pairs', 'bootstrap_samples': 300,
+                                             'background': True})
+        assert response.status_code == 202, response.text
+        job_id = response.json()['job_id']
+        
+        for _ in range(500):
+            job = client.get(f'/jobs/{job_id}').json()
+            if job['status'] not in ('queued', 'running'):
+                break
+            time.sleep(0.01)
+        assert job['status'] == 'succeeded', job
+        assert job['progress']['done'] == 300
+        assert len(job['result']['residuals']) == len(job['result']['fitted_values']) == 60
+        model_id = job['result']['model_id']
+        assert client.post('/simulate', json={'model_id': model_id, 'changes': {'Channel_A': 10}}).status_code == 200
+        
+        events = client.get(f'/jobs/{job_id}/events').text
+        assert 'event: succeeded' in events
+        assert client.get('/jobs/job_missing').status_code == 404
+        assert client.delete('/jobs/job_missing').status_code == 404
+    
+    def test_fit_default_analytic_ci(self, client):
+        """Test que /fit usa IC HAC analíticos por defecto y permite elegir el método."""
+        dataset_id = self._upload(client, _make_marketing_frame(seed=16))['dataset_id']
+        body = client.post('/fit', json={'dataset_id': dataset_id}).json()
+        assert body['ci_method'] == 'hac'
+        assert body['ci_params'] == {'lags': 3}
+        assert body['bootstrap_replicates'] == 0
+        assert set(body['confidence_intervals']) == {'const', 'Channel_A', 'Channel_B'}
+        assert body['bootstrap_ci'] == body['confidence_intervals']
+        
+        block = client.post('/fit', json={'dataset_id': dataset_id, 'ci_method': 'block',
+                                          'bootstrap_samples': 50, 'block_length': 5}).json()
+        assert block['ci_params'] == {'block_length': 5}
+        assert block['bootstrap_replicates'] == 50
+        assert client.post('/fit', json={'dataset_id': dataset_id, 'ci_method': 'x'}).status_code == 400
+    
+    def test_fit_bootstrap_tolerance(self, client):
+        """Test que /fit reporta las réplicas bootstrap usadas con tolerancia."""
+        dataset_id = self._upload(client, _make_marketing_frame(seed=14))['dataset_id']
+        body = client.post('/fit', json={'dataset_id': dataset_id, 'ci_method': 'pairs', 'bootstrap_samples': 5000,
+                                         'bootstrap_tolerance': 0.05}).json()
+        assert 0 < body['bootstrap_replicates'] < 5000
+        assert set(body['bootstrap_ci']) == {'const', 'Channel_A', 'Channel_B'}
+        
+        bad = client.post('/fit', json={'dataset_id': dataset_id, 'bootstrap_tolerance': 2})
+        assert bad.status_code == 400
+    
+    def test_binary_and_downsampled_series(self, client):
+        """Test de negociación de formato: binario, LTTB y paginado."""
+        from backend.app.formats import decode_binary
+        dataset_id = self._upload(client, _make_marketing_frame(n=300, seed=15))['dataset_id']
+        payload = {'dataset_id': dataset_id, 'bootstrap_samples': 0}
+        reference = client.post('/fit', json=payload).json()
+        
+        response = client.post('/fit', json=payload, headers={'Accept': 'application/octet-stream'})
+        assert response.headers['content-type'] == 'application/octet-stream'
+        summary, arrays = decode_binary(response.content)
+        assert summary['r_squared'] == pytest.approx(reference['r_squared'])
+        assert 'residuals' not in summary
+        np.testing.assert_allclose(arrays['residuals'], reference['residuals'])
+        np.testing.assert_array_equal(arrays['index'], np.arange(300))
+        model_id = summary['model_id']
+        
+        small = client.post('/fit', params={'series_points': 50}, json=payload).json()
+        assert len(small['series_index']) == 50
+        assert len(small['fitted_values']) == len(small['residuals']) == 50
+        assert small['series_index'][0] == 0 and small['series_index'][-1] == 299
+        assert small['residuals'][-1] == pytest.approx(reference['residuals'][-1])
+        
+        metrics = client.post('/metrics', params={'model_id': model_id},
+                              headers={'Accept': 'application/octet-stream'})
+        summary, arrays = decode_binary(metrics.content)
+        assert summary['observations'] == 300 and len(arrays['fitted_values']) == 300
+        
+        page = client.get(f'/models/{model_id}/series', params={'offset': 250, 'limit': 100}).json()
+        assert page['total'] == 300 and page['next_offset'] is None
+        assert page['index'][0] == 250 and len(page['residuals']) == 50
+        
+        arrow = client.get(f'/models/{model_id}/series',
+                           headers={'Accept': 'application/vnd.apache.arrow.stream'})
+        try:
+            import pyarrow as pa
+        except ImportError:
+            assert arrow.status_code == 406
+        else:
+            table = pa.ipc.open_stream(arrow.content).read_all()
+            assert table.num_rows == 300
+    
+    def test_backtest_endpoint(self, client):
+        """Test del endpoint de backtest con origen móvil."""
+        dataset_id = self._upload(client, _make_marketing_frame(n=80, seed=8))['dataset_id']
+        response = client.post('/fit/backtest', json={'dataset_id': dataset_id, 'n_folds': 4, 'window': 'sliding'})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert len(body['folds']) == 4
+        assert body['train_size'] + 4 * body['horizon'] == 80
+        assert body['folds'][0]['test_start'] > body['folds'][0]['train_end']
+        assert len(body['folds'][-1]['forecast']) == body['horizon']
+        assert body['mape'] < 5
+        
+        bad = client.post('/fit/backtest', json={'dataset_id': dataset_id, 'window': 'weekly'})
+        assert bad.status_code == 400
+    
+    def test_unknown_handle_returns_404(self, client):
+        """Test handle inexistente."""
+        response = client.post('/simulate', json={'model_id': 'mdl_missing', 'changes': {}})
+        assert response.status_code == 404
+
+
+class TestJobManager:
+    """Tests para la cola de jobs en background."""
+    
+    def _wait(self, manager, job_id, timeout=5.0):
+        import time
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = manager.get(job_id)
+            if job['status'] in ('succeeded', 'failed', 'cancelled'):
+                return job
+            time.sleep(0.01)
+        raise AssertionError(f"Job {job_id} no terminó")
+    
+    def test_progress_result_and_failure(self):
+        """Test que el job publica progreso, resultado y errores."""
+        from backend.app.jobs import JobManager
+        
+        manager = JobManager(max_workers=1, max_pending=4)
+        
+        def work(progress):
+            for done in range(1, 4):
+                progress(done, 3, stage='test')
+            return {'value': 42}
+        
+        job = self._wait(manager, manager.submit(work))
+        assert job['status'] == 'succeeded'
+        assert job['result'] == {'value': 42}
+        assert job['progress'] == {'done': 3, 'total': 3, 'stage': 'test'}
+        
+        def fail(progress):
+            raise ValueError("boom")
+        
+        job = self._wait(manager, manager.submit(fail))
+        assert job['status'] == 'failed' and job['error'] == 'boom'
+        manager.shutdown()
+    
+    def test_cancel_and_backpressure(self):
+        """Test de cancelación (en ejecución y en cola) y cola acotada."""
+        import threading
+        from backend.app.jobs import JobManager, QueueFull
+        
+        manager = JobManager(max_workers=1, max_pending=2)
+        started = threading.Event()
+        
+        def slow(progress):
+            started.set()
+            while True:
+                progress(0, 1)
+        
+        running = manager.submit(slow)
+        queued = manager.submit(lambda progress: 'never')
+        with pytest.raises(QueueFull):
+            manager.submit(lambda progress: None)
+        
+        started.wait(5)
+        assert manager.cancel(queued)['status'] == 'cancelled'
+        manager.cancel(running)
+        assert self._wait(manager, running)['status'] == 'cancelled'
+        assert manager.stats()['cancelled'] == 2
+        manager.shutdown()
+
+
+class TestSessionRegistry:
+    """Tests para el registro LRU de sesiones."""
+    
+    def test_lru_eviction_by_memory_budget(self):
+        """Test que se expulsa el dataset menos usado (y sus modelos) al superar el presupuesto."""
+        from backend.app.registry import SessionRegistry
+        
+        processors = []
+        for seed in range(3):
+            processor = DataProcessor()
+            processor.load_data(_make_marketing_frame(seed=seed), 'Date', 'Sales', ['Channel_A', 'Channel_B'])
+            processors.append(processor)
+        
+        registry = SessionRegistry(memory_budget=int(processors[0].memory_usage() * 2.5))
+        first = registry.add_dataset(processors[0])
+        second = registry.add_dataset(processors[1])
+        fitter = RegressionFitter(processors[0])
+        fitter.fit(bootstrap_samples=0)
+        model = registry.add_model(first, fitter, None)
+        registry.get_dataset(first)
+        registry.add_dataset(processors[2])
+        
+        with pytest.raises(KeyError):
+            registry.get_dataset(second)
+        assert registry.get_dataset(first)[1] is processors[0]
+        assert registry.get_model(model)[1][0] is fitter
+
+
+class TestDatasetStore:
+    """Tests para el almacén de datasets mapeados en memoria."""
+    
+    def test_roundtrip_is_zero_copy(self, tmp_path):
+        """Test que un dataset reabierto da los mismos datos como vistas sobre el memmap."""
+        from backend.app.storage import DatasetStore
+        
+        processor = DataProcessor()
+        processor.load_data(_make_marketing_frame(seed=5), 'Date', 'Sales', ['Channel_A', 'Channel_B'])
+        store = DatasetStore(str(tmp_path))
+        assert store.save('ds_test', processor)
+        
+        mapped = DatasetStore(str(tmp_path)).load('ds_test')
+        X, y = mapped.get_regression_data()
+        X_ref, y_ref = processor.get_regression_data()
+        np.testing.assert_array_equal(X, X_ref)
+        np.testing.assert_array_equal(y, y_ref)
+        assert isinstance(mapped._values, np.memmap)
+        assert np.shares_memory(X, mapped._values) and np.shares_memory(y, mapped._values)
+        assert not X.flags.writeable
+        assert mapped.date_range == processor.date_range
+        assert mapped.memory_usage() < processor.memory_usage()
+        
+        fitter = RegressionFitter(mapped)
+        fitter.fit(bootstrap_samples=0)
+        reference = RegressionFitter(processor)
+        reference.fit(bootstrap_samples=0)
+        np.testing.assert_allclose(fitter.model.params, reference.model.params)
+        
+        with pytest.raises(KeyError):
+            store.load('ds_missing')
+    
+    def test_api_reopens_persisted_dataset(self, tmp_path, monkeypatch):
+        """Test que otro worker (registro vacío) reabre el dataset desde el almacén."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.registry import SessionRegistry
+        from backend.app.storage import DatasetStore
+        
+        monkeypatch.setattr(app.state, 'store', DatasetStore(str(tmp_path)))
+        client = TestClient(app)
+        response = client.post(
+            '/upload',
+            files={'file': ('data.csv', _make_marketing_frame(seed=6).to_csv(index=False), 'text/csv')},
+            data={'date_column': 'Date', 'target_column': 'Sales', 'feature_columns': 'Channel_A,Channel_B'}
+        )
+        dataset_id = response.json()['dataset_id']
+        
+        monkeypatch.setattr(app.state, 'registry', SessionRegistry(10**9))
+        fit = client.post('/fit', json={'dataset_id': dataset_id, 'bootstrap_samples': 0})
+        assert fit.status_code == 200, fit.text
+        assert fit.json()['observations'] == 60
+        assert client.get('/status', params={'dataset_id': 'ds_missing'}).status_code == 404
+    
+    def test_generations_swap_atomically(self, tmp_path):
+        """Test que cada save publica una generación nueva sin dejar el dataset ausente."""
+        from backend.app.storage import DatasetStore
+        
+        data = _make_marketing_frame(n=80, seed=5)
+        processor = DataProcessor()
+        processor.load_data(data.iloc[:60], 'Date', 'Sales', ['Channel_A', 'Channel_B'])
+        store = DatasetStore(str(tmp_path))
+        store.save('ds_test', processor)
+        first = processor.store_generation
+        mapped = store.load('ds_test')
+        assert mapped.store_generation == first == store.generation('ds_test')
+        
+        processor.append_data(data.iloc[60:])
+        store.save('ds_test', processor)
+        assert store.generation('ds_test') != first
+        assert sorted(p.name for p in (tmp_path / 'ds_test').iterdir()) == sorted(
+            ['CURRENT', store.generation('ds_test')])
+        # El mapeo abierto sobre la generación anterior sigue siendo legible
+        assert mapped.n_observations() == 60
+        assert float(mapped.get_regression_data()[1].sum()) == pytest.approx(data['Sales'][:60].sum())
+        assert store.load('ds_test').n_observations() == 80
+    
+    def test_api_revalidates_registry_against_store(self, tmp_path, monkeypatch):
+        """Test que un worker deja de servir su copia cuando otro publica una generación nueva."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.storage import DatasetStore
+        
+        monkeypatch.setattr(app.state, 'store', DatasetStore(str(tmp_path)))
+        client = TestClient(app)
+        data = _make_marketing_frame(n=80, seed=6)
+        dataset_id = client.post(
+            '/upload',
+            files={'file': ('data.csv', data.iloc[:60].to_csv(index=False), 'text/csv')},
+            data={'date_column': 'Date', 'target_column': 'Sales', 'feature_columns': 'Channel_A,Channel_B'}
+        ).json()['dataset_id']
+        stale = client.post('/fit', json={'dataset_id': dataset_id, 'bootstrap_samples': 0}).json()
+        
+        # Otro worker (otra instancia del almacén) agrega filas y publica
+        other = DatasetStore(str(tmp_path))
+        processor = other.load(dataset_id)
+        processor.append_data(data.iloc[60:70])
+        other.save(dataset_id, processor)
+        
+        # /append recarga la generación vigente y no toca el modelo ajustado sobre la anterior
+        body = client.post(
+            '/append',
+            files={'file': ('new.csv', data.iloc[70:].to_csv(index=False), 'text/csv')},
+            data={'dataset_id': dataset_id}
+        ).json()
+        assert body['observations'] == 80
+        assert body['models'][stale['model_id']]['status'] == 'stale'
+        metrics = client.post('/metrics', params={'model_id': stale['model_id'], 'series_points': 1000}).json()
+        assert metrics['observations'] == len(metrics['fitted_values']) == 60
+        
+        fit = client.post('/fit', json={'dataset_id': dataset_id, 'bootstrap_samples': 0}).json()
+        assert fit['observations'] == 80
+
+
+
+class TestFitCache:
+    """Tests para la caché de resultados de ajuste."""
+    
+    def test_ttl_and_counters(self, monkeypatch):
+        """Test expiración por TTL y contadores de aciertos/fallos."""
+        from backend.app import cache as cache_module
+        
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+        fit_cache = cache_module.FitCache(max_entries=2, ttl_seconds=10)
+        fit_cache.put('a', {'r_squared': 0.5})
+        
+        assert fit_cache.get('a') == {'r_squared': 0.5}
+        now[0] += 11
+        assert fit_cache.get('a') is None
+        assert fit_cache.stats()['hits'] == 1
+        assert fit_cache.stats()['misses'] == 1
+    
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Test que la caché en disco sobrevive a una nueva instancia."""
+        from backend.app.cache import FitCache, fit_cache_key
+        
+        X = np.arange(12.0).reshape(6, 2)
+        y = np.arange(6.0)
+        key = fit_cache_key(X, y, [['a'], ['b']], {'alpha': 1.0})
+        assert key != fit_cache_key(X, y, [['a'], ['b']], {'alpha': 2.0})
+        
+        FitCache(disk_dir=str(tmp_path)).put(key, {'coefficients': {'const': 1.0}})
+        assert FitCache(disk_dir=str(tmp_path)).get(key) == {'coefficients': {'const': 1.0}}
+
+
+class TestBenchmarks:
+    """Tests del generador sintético y del runner de benchmarks."""
+    
+    def test_make_dataset_knobs(self):
+        from benchmarks.benchmark import make_dataset
+        
+        data = make_dataset(2000, 4, n_controls=2, collinearity=0.8, seed=1)
+        assert list(data.columns) == ['Date', 'Channel_1', 'Channel_2', 'Channel_3', 'Channel_4',
+                                      'Control_1', 'Control_2', 'Sales']
+        assert (data.filter(like='Channel_') > 0).all().all()
+        corr = np.corrcoef(np.log(data.filter(like='Channel_').values), rowvar=False)
+        assert corr[np.triu_indices(4, 1)].min() > 0.6
+        
+        independent = make_dataset(2000, 4, collinearity=0.0, seed=1)
+        corr = np.corrcoef(np.log(independent.filter(like='Channel_').values), rowvar=False)
+        assert np.abs(corr[np.triu_indices(4, 1)]).max() < 0.2
+    
+    @pytest.mark.parametrize('mode', ['library', 'api'])
+    def test_run_and_compare(self, mode):
+        from benchmarks.benchmark import STAGES, compare, run_benchmarks
+        
+        report = run_benchmarks([300], [3], mode=mode, repeat=1, memory=(mode == 'library'),
+                                bootstrap_samples=10, batch_scenarios=20)
+        assert report['meta']['mode'] == mode
+        assert [r['stage'] for r in report['results']] == list(STAGES)
+        assert all(r['seconds_median'] > 0 for r in report['results'])
+        if mode == 'library':
+            assert all(r['peak_bytes'] > 0 for r in report['results'])
+        
+        assert compare(report, report) == []
+        faster = {**report, 'results': [{**r, 'seconds_median': r['seconds_median'] / 2}
+                                        for r in report['results']]}
+        assert len(compare(report, faster, threshold=1.5)) == len(STAGES)
 
 
 if __name__ == "__main__":